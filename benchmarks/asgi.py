@@ -0,0 +1,82 @@
+import json
+import uuid
+from typing import Any
+
+from starlette.types import ASGIApp, Message
+
+BODY_CHUNK_SIZE = 64 * 1024
+
+
+class ASGIClient:
+    """Calls the ASGI app in-process, without sockets or an HTTP client library"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: bytes = b"",
+        headers: dict[str, str] | None = None
+    ) -> tuple[int, bytes]:
+        raw_headers = [(b"host", b"bench"), (b"content-length", str(len(body)).encode())]
+        raw_headers += [
+            (key.lower().encode(), value.encode()) for key, value in (headers or {}).items()
+        ]
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 0),
+            "server": ("bench", 80),
+        }
+        offset = 0
+        status = 500
+        response = bytearray()
+
+        async def receive() -> Message:
+            nonlocal offset
+            chunk = body[offset:offset + BODY_CHUNK_SIZE]
+            offset += len(chunk)
+            return {"type": "http.request", "body": chunk, "more_body": offset < len(body)}
+
+        async def send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response.extend(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, bytes(response)
+
+    async def request_json(
+        self, method: str, path: str, payload: Any = None
+    ) -> tuple[int, Any]:
+        body = json.dumps(payload).encode() if payload is not None else b""
+        status, response = await self.request(
+            method, path, body, headers={"content-type": "application/json"}
+        )
+        return status, json.loads(response) if response else None
+
+
+def multipart_body(fields: dict[str, str], filename: str, content: bytes) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = [
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    ]
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+        f'filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n'.encode()
+    )
+    body = b"".join(parts) + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
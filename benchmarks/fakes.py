@@ -0,0 +1,246 @@
+import uuid
+import hashlib
+from typing import Any, AsyncIterator, BinaryIO, Iterable, Optional, Sequence
+from datetime import datetime, timedelta, timezone
+
+from models.blob import Blob
+from models.file import File, FileStatus
+from repositories.repository import Repository
+from storage.storage import S3Storage, StoredObject
+
+
+class FakeS3Storage(S3Storage):
+    """Keeps only object sizes, but consumes upload streams like the real client"""
+
+    def __init__(self, part_size: int = 10 * 1024 * 1024) -> None:
+        self.part_size = part_size
+        self.objects: dict[tuple[str, str], StoredObject] = {}
+        self.multipart_uploads: dict[str, dict[int, int]] = {}
+
+    async def ensure_buckets(self, bucket_names: Iterable[str]) -> None:
+        pass
+
+    async def ping(self) -> bool:
+        return True
+
+    async def upload_file(
+        self, file: str | BinaryIO, bucket_name: str, object_name: str, file_size: int
+    ) -> bool:
+        if isinstance(file, str):
+            with open(file, "rb") as f:
+                return await self.upload_file(f, bucket_name, object_name, file_size)
+
+        size = 0
+        while part := file.read(self.part_size):
+            size += len(part)
+        self.objects[(bucket_name, object_name)] = StoredObject(
+            size=size,
+            etag=hashlib.md5(object_name.encode()).hexdigest(),
+            last_modified=datetime.now(timezone.utc)
+        )
+        return True
+
+    async def create_multipart_upload(self, bucket_name: str, object_name: str) -> str | None:
+        upload_id = str(uuid.uuid4())
+        self.multipart_uploads[upload_id] = {}
+        return upload_id
+
+    async def upload_part(
+        self, bucket_name: str, object_name: str, upload_id: str, part_number: int, data: bytes
+    ) -> str | None:
+        self.multipart_uploads[upload_id][part_number] = len(data)
+        return hashlib.md5(data).hexdigest()
+
+    async def complete_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str, parts: Sequence[tuple[int, str]]
+    ) -> bool:
+        sizes = self.multipart_uploads.pop(upload_id)
+        self.objects[(bucket_name, object_name)] = StoredObject(
+            size=sum(sizes[part_number] for part_number, _ in parts),
+            etag=hashlib.md5(upload_id.encode()).hexdigest(),
+            last_modified=datetime.now(timezone.utc)
+        )
+        return True
+
+    async def abort_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str
+    ) -> bool:
+        self.multipart_uploads.pop(upload_id, None)
+        return True
+
+    async def get_file_link(
+        self, bucket_name: str, object_name: str, ttl: timedelta
+    ) -> str | None:
+        return f"http://fake/{bucket_name}/{object_name}?expires={int(ttl.total_seconds())}"
+
+    async def get_file_links(
+        self, bucket_name: str, object_names: Sequence[str], ttl: timedelta
+    ) -> dict[str, str]:
+        return {
+            object_name: f"http://fake/{bucket_name}/{object_name}"
+            for object_name in object_names
+        }
+
+    def upload_url(self, bucket_name: str) -> str:
+        return f"http://fake/{bucket_name}"
+
+    async def get_upload_form(
+        self,
+        bucket_name: str,
+        object_name: str,
+        ttl: timedelta,
+        max_size: int,
+        content_type: Optional[str],
+        metadata: dict[str, str]
+    ) -> dict[str, str] | None:
+        return {"key": object_name}
+
+    async def stat_file(self, bucket_name: str, object_name: str) -> StoredObject | None:
+        return self.objects.get((bucket_name, object_name))
+
+    async def get_file_stream(
+        self, bucket_name: str, object_name: str, offset: int = 0, length: int = 0
+    ) -> AsyncIterator[bytes] | None:
+        stored_object = self.objects.get((bucket_name, object_name))
+        if stored_object is None:
+            return None
+        remaining = (length or stored_object.size - offset)
+        return self._zeros(remaining)
+
+    async def _zeros(self, remaining: int) -> AsyncIterator[bytes]:
+        while remaining > 0:
+            chunk = min(remaining, self.part_size)
+            remaining -= chunk
+            yield bytes(chunk)
+
+    async def iter_objects(
+        self, bucket_name: str, batch_size: int = 1000
+    ) -> AsyncIterator[tuple[str, StoredObject]]:
+        for (bucket, object_name), stored_object in sorted(self.objects.items()):
+            if bucket == bucket_name:
+                yield object_name, stored_object
+
+    async def delete_file(self, bucket_name: str, object_name: str) -> bool:
+        self.objects.pop((bucket_name, object_name), None)
+        return True
+
+    async def delete_files(self, bucket_name: str, object_names: Sequence[str]) -> set[str]:
+        for object_name in object_names:
+            self.objects.pop((bucket_name, object_name), None)
+        return set()
+
+
+class FakeRepository[T](Repository):
+    """Rows kept in a list, filters are matched by attribute equality"""
+
+    def __init__(self) -> None:
+        self.rows: list[T] = []
+
+    @staticmethod
+    def _matches(obj: T, filters: dict) -> bool:
+        return all(getattr(obj, key) == value for key, value in filters.items())
+
+    async def add_one(self, obj: T) -> str | None:
+        if getattr(obj, "id", None) is None:
+            obj.id = str(uuid.uuid4())
+        self.rows.append(obj)
+        return obj.id
+
+    async def fetch_one(self, **filters) -> T | None:
+        return next((obj for obj in self.rows if self._matches(obj, filters)), None)
+
+    async def fetch_in(self, field: str, values: Sequence, **filters) -> list[T]:
+        wanted = set(values)
+        return [
+            obj for obj in self.rows
+            if getattr(obj, field) in wanted and self._matches(obj, filters)
+        ]
+
+    async def fetch_many(
+        self,
+        order_by: Sequence[str],
+        limit: int,
+        after: Sequence[Any] | None = None,
+        **filters
+    ) -> list[T]:
+        def key(obj: T) -> tuple:
+            return tuple(getattr(obj, field) for field in order_by)
+
+        objs = [
+            obj for obj in self.rows
+            if self._matches(obj, filters) and (after is None or key(obj) < tuple(after))
+        ]
+        return sorted(objs, key=key, reverse=True)[:limit]
+
+    async def delete_one(self, obj: T) -> bool:
+        self.rows.remove(obj)
+        return True
+
+    async def delete_many(self, objs: Sequence[T]) -> bool:
+        for obj in objs:
+            self.rows.remove(obj)
+        return True
+
+
+class FakeBlobRepository(FakeRepository[Blob]):
+    async def acquire(self, bucket_name: str, sha256: str) -> Blob | None:
+        blob = await self.fetch_one(bucket_name=bucket_name, sha256=sha256)
+        if blob is None or blob.ref_count <= 0:
+            return None
+        blob.ref_count += 1
+        return blob
+
+    async def release(self, blob_id: str) -> Blob | None:
+        blob = await self.fetch_one(id=blob_id)
+        if blob is None:
+            return None
+        blob.ref_count -= 1
+        if blob.ref_count > 0:
+            return None
+        self.rows.remove(blob)
+        return blob
+
+
+class FakeFileRepository(FakeRepository[File]):
+    def __init__(self, blob_repository: FakeBlobRepository) -> None:
+        super().__init__()
+        self.blob_repository = blob_repository
+
+    async def add_one(self, obj: File) -> str | None:
+        if obj.upload_at is None:
+            obj.upload_at = datetime.now(timezone.utc)
+        return await super().add_one(obj)
+
+    async def commit_file(self, file_obj: File, blob: Blob | None = None) -> bool:
+        if blob is not None:
+            if blob not in self.blob_repository.rows:
+                if await self.blob_repository.fetch_one(
+                    bucket_name=blob.bucket_name, sha256=blob.sha256
+                ):
+                    return False
+                await self.blob_repository.add_one(blob)
+            file_obj.blob_id = blob.id
+            file_obj.object_name = blob.object_name
+        file_obj.status = FileStatus.COMMITTED
+        return True
+
+    async def update_status(self, file_ids: Sequence[str], status: FileStatus) -> bool:
+        wanted = set(file_ids)
+        for obj in self.rows:
+            if obj.id in wanted:
+                obj.status = status
+        return True
+
+    async def fetch_removable(self, pending_before: datetime, limit: int) -> list[File]:
+        return [
+            obj for obj in self.rows
+            if obj.status == FileStatus.DELETING
+            or (obj.status == FileStatus.PENDING and obj.upload_at < pending_before)
+        ][:limit]
+
+    async def stream_by_object_name(
+        self, bucket_name: str, batch_size: int = 1000
+    ) -> AsyncIterator[File]:
+        for obj in sorted(self.rows, key=lambda obj: obj.object_name):
+            if obj.bucket_name == bucket_name:
+                yield obj
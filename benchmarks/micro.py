@@ -0,0 +1,144 @@
+"""Micro-benchmarks of per-request hot paths, results are printed as JSON.
+
+    python benchmarks/micro.py --output micro.json
+    python benchmarks/micro.py --baseline micro.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from datetime import timedelta
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fstorage"))
+
+for key, value in {
+    "minio_host": "localhost", "minio_port": "9000",
+    "minio_access_key": "bench", "minio_secret_key": "bench-secret",
+    "db_host": "localhost", "db_port": "5432", "db_name": "postgres",
+    "db_user": "postgres", "db_passwd": "postgres", "object_id_key": "bench-id-key",
+}.items():
+    os.environ.setdefault(key, value)
+
+from minio import Minio  # noqa: E402
+
+from api.file import validate_upload  # noqa: E402
+from metrics import stage_duration  # noqa: E402
+from cache.link_cache import MemoryLinkCache  # noqa: E402
+from storage.presign import SigV4Presigner  # noqa: E402
+from storage.executor import StorageExecutor  # noqa: E402
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+@benchmark("validate_upload")
+async def bench_validate_upload(n: int) -> None:
+    for _ in range(n):
+        validate_upload("avatar", "photo.png", 1024)
+
+
+@benchmark("link_cache_hit")
+async def bench_link_cache_hit(n: int) -> None:
+    cache = MemoryLinkCache(min_validity=60, max_size=1000)
+    await cache.set("avatar", "object", "link", time.time() + 3600)
+    for _ in range(n):
+        await cache.get("avatar", "object")
+
+
+@benchmark("histogram_observe")
+async def bench_histogram_observe(n: int) -> None:
+    for _ in range(n):
+        stage_duration.observe(0.003, stage="bench")
+
+
+@benchmark("storage_executor_roundtrip")
+async def bench_storage_executor(n: int) -> None:
+    executor = StorageExecutor(max_workers=4, max_queue_size=16)
+    for _ in range(n):
+        await executor.run(int)
+    executor.shutdown()
+
+
+@benchmark("minio_presign")
+async def bench_minio_presign(n: int) -> None:
+    # region is set, so signing never touches the network
+    client = Minio("localhost:9000", "bench", "bench-secret", secure=False, region="us-east-1")
+    for _ in range(n):
+        client.presigned_get_object("avatar", "object.png", expires=timedelta(hours=12))
+
+
+@benchmark("sigv4_presign")
+async def bench_sigv4_presign(n: int) -> None:
+    # single threaded, so ops_per_s is the links per second one core signs
+    presigner = SigV4Presigner("http://localhost:9000", "bench", "bench-secret", "us-east-1")
+    for _ in range(n):
+        presigner.presign_get("avatar", "object.png", timedelta(hours=12))
+
+
+def run(names: list[str], iterations: int) -> dict:
+    results = []
+    for name in names:
+        func = BENCHMARKS[name]
+        asyncio.run(func(min(iterations, 100)))  # warm up
+        start = time.perf_counter()
+        asyncio.run(func(iterations))
+        elapsed = time.perf_counter() - start
+        results.append({
+            "scenario": name,
+            "iterations": iterations,
+            "us_per_op": round(elapsed / iterations * 1e6, 3),
+            "ops_per_s": round(iterations / elapsed, 2),
+        })
+    return {"results": results}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--output", type=Path, help="write results JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="compare against this results JSON")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed throughput drop, 0.2 = 20%%"
+    )
+    args = parser.parse_args()
+
+    current = run(args.only, args.iterations)
+    output = json.dumps(current, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        baseline = {
+            result["scenario"]: result
+            for result in json.loads(args.baseline.read_text())["results"]
+        }
+        threshold = 1 - args.tolerance
+        regressions = [
+            result for result in current["results"]
+            if result["scenario"] in baseline
+            and result["ops_per_s"] < baseline[result["scenario"]]["ops_per_s"] * threshold
+        ]
+        for result in regressions:
+            print(
+                f"REGRESSION {result['scenario']}: "
+                f"{baseline[result['scenario']]['ops_per_s']} -> {result['ops_per_s']} ops/s",
+                file=sys.stderr
+            )
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
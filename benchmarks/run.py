@@ -0,0 +1,256 @@
+"""Load benchmarks for the upload, link and delete endpoints.
+
+Drives the real FastAPI app in-process against fake storage and repository,
+or against the storage backend/Postgres from the config with --real-storage/--real-db
+(e.g. `docker compose up db minio-server`). Results are printed as JSON and
+can be compared against a stored baseline:
+
+    python benchmarks/run.py --output baseline.json
+    python benchmarks/run.py --baseline baseline.json
+"""
+import os
+import sys
+import json
+import logging
+import time
+import random
+import asyncio
+import argparse
+import platform
+from pathlib import Path
+from statistics import median
+from datetime import datetime, timezone
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fstorage"))
+
+# Fake runs are hermetic, connection settings only need to be present
+for key, value in {
+    "minio_host": "localhost", "minio_port": "9000",
+    "minio_access_key": "bench", "minio_secret_key": "bench-secret",
+    "db_host": "localhost", "db_port": "5432", "db_name": "postgres",
+    "db_user": "postgres", "db_passwd": "postgres", "object_id_key": "bench-id-key",
+}.items():
+    os.environ.setdefault(key, value)
+
+from fastapi import Request  # noqa: E402
+
+from main import app  # noqa: E402
+from config import settings, db_helper, buckets  # noqa: E402
+from services.file import FileService  # noqa: E402
+from repositories.file import FileRepository  # noqa: E402
+from repositories.blob import BlobRepository  # noqa: E402
+from dependencies.file import DBSessionDependency, create_link_cache  # noqa: E402
+from dependencies.file import file_service  # noqa: E402
+
+from asgi import ASGIClient, multipart_body  # noqa: E402
+from fakes import FakeS3Storage, FakeFileRepository, FakeBlobRepository  # noqa: E402
+
+DEFAULT_SIZES = {
+    "avatar": [64 * 1024, 1024 * 1024, 4 * 1024 * 1024],
+    "video": [10 * 1024 * 1024, 50 * 1024 * 1024],
+}
+FORMATS = {"avatar": ".png", "video": ".mp4"}
+
+
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def configure_app(real_storage: bool, real_db: bool) -> None:
+    storage = FakeS3Storage(part_size=settings.minio.upload_part_size)
+    blob_repository = FakeBlobRepository()
+    repository = FakeFileRepository(blob_repository)
+
+    def bench_file_service(session: DBSessionDependency, request: Request) -> FileService:
+        return FileService(
+            FileRepository(session) if real_db else repository,
+            BlobRepository(session) if real_db else blob_repository,
+            request.app.state.storage if real_storage else storage,
+            request.app.state.link_cache
+        )
+
+    app.dependency_overrides[file_service] = bench_file_service
+    if not real_storage:
+        app.state.link_cache = create_link_cache()
+
+
+def percentile(latencies: list[float], q: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)] if ordered else 0.0
+
+
+async def run_case(requests: int, concurrency: int, call) -> dict:
+    """Run `requests` calls of call(i) with at most `concurrency` in flight"""
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            ok = await call(i)
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "ops_per_s": round(requests / elapsed, 2),
+        "p50_ms": round(median(latencies) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+async def bench_bucket(
+    client: ASGIClient, bucket: str, size: int, concurrency: int, requests: int
+) -> list[dict]:
+    content = random.randbytes(size)
+    object_ids: list[str] = []
+
+    async def upload(i: int) -> bool:
+        body, content_type = multipart_body(
+            {"user_id": f"user-{i % 100}"}, f"bench{FORMATS[bucket]}", content
+        )
+        status, response = await client.request(
+            "POST", f"/files/{bucket}/upload", body, headers={"content-type": content_type}
+        )
+        if status == 200:
+            object_ids.append(json.loads(response)["object_id"])
+        return status == 200
+
+    async def link(i: int) -> bool:
+        status, _ = await client.request_json(
+            "GET", f"/files/{bucket}/{object_ids[i % len(object_ids)]}"
+        )
+        return status == 200
+
+    async def delete(i: int) -> bool:
+        status, _ = await client.request_json(
+            "DELETE", f"/files/{bucket}/{object_ids[i]}", {"user_id": f"user-{i % 100}"}
+        )
+        return status == 200
+
+    case = {"bucket": bucket, "size": size, "concurrency": concurrency}
+    upload_result = await run_case(requests, concurrency, upload)
+    upload_result["mb_per_s"] = round(
+        size * (requests - upload_result["errors"]) / upload_result["seconds"] / 2**20, 2
+    )
+    results = [{"scenario": "upload", **case, **upload_result}]
+    if object_ids:
+        results.append({"scenario": "link", **case, **await run_case(
+            requests, concurrency, link
+        )})
+        results.append({"scenario": "delete", **case, **await run_case(
+            len(object_ids), concurrency, delete
+        )})
+    return results
+
+
+async def run(args: argparse.Namespace) -> dict:
+    configure_app(args.real_storage, args.real_db)
+    policies = settings.app.file_upload_validation_settings
+    for bucket in args.buckets:
+        policies[bucket]["deduplicate"] = args.deduplicate
+    buckets.load(policies)
+    client = ASGIClient(app)
+    results = []
+
+    async def run_matrix() -> None:
+        for bucket in args.buckets:
+            for size in args.sizes or DEFAULT_SIZES[bucket]:
+                for concurrency in args.concurrency:
+                    requests = max(args.requests * DEFAULT_SIZES["avatar"][0] // size, 10) \
+                        if args.scale_requests else args.requests
+                    results.extend(await bench_bucket(client, bucket, size, concurrency, requests))
+                    print(f"done {bucket} size={size} concurrency={concurrency}", file=sys.stderr)
+
+    if args.real_storage:
+        async with app.router.lifespan_context(app):
+            await run_matrix()
+    else:
+        await run_matrix()
+        if args.real_db:
+            await db_helper.dispose()
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "real_storage": args.real_storage,
+            "real_db": args.real_db,
+            "deduplicate": args.deduplicate,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Cases whose throughput dropped more than `tolerance` below the baseline"""
+
+    def key(result: dict) -> tuple:
+        return result["scenario"], result["bucket"], result["size"], result["concurrency"]
+
+    baseline_results = {key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        previous = baseline_results.get(key(result))
+        if previous and result["ops_per_s"] < previous["ops_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{'/'.join(map(str, key(result)))}: "
+                f"{previous['ops_per_s']} -> {result['ops_per_s']} ops/s"
+            )
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buckets", nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--sizes", nargs="+", type=int, help="file sizes in bytes")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per case")
+    parser.add_argument(
+        "--scale-requests", action="store_true",
+        help="scale the request count down for large files"
+    )
+    parser.add_argument(
+        "--real-storage", action="store_true", help="use the STORAGE_BACKEND from config"
+    )
+    parser.add_argument("--real-db", action="store_true", help="use Postgres from config")
+    parser.add_argument(
+        "--deduplicate", action="store_true",
+        help="enable deduplication, every upload in a case has the same content"
+    )
+    parser.add_argument("--output", type=Path, help="write results JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="compare against this results JSON")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.1, help="allowed throughput drop, 0.1 = 10%%"
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    current = asyncio.run(run(args))
+
+    output = json.dumps(current, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        regressions = compare(current, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,4 +13,4 @@ check_db
 
 # Выполняем миграции и запускаем приложение
 poetry run alembic upgrade head
-poetry run python fstorage/main.py
+poetry run python fstorage/server.py
@@ -1,7 +1,17 @@
 from fastapi import APIRouter
 
 from .file import router as files_api
+from .upload import router as uploads_api
+from .stats import router as stats_api
+from .metrics import router as metrics_api
+from .health import router as health_api
+from .storage import router as storage_api
 
 router = APIRouter()
 
 router.include_router(files_api, prefix="/files", tags=["Files"])
+router.include_router(uploads_api, prefix="/files", tags=["Uploads"])
+router.include_router(stats_api, prefix="/stats", tags=["Stats"])
+router.include_router(metrics_api, tags=["Stats"])
+router.include_router(health_api, prefix="/health", tags=["Health"])
+router.include_router(storage_api, prefix="/storage", tags=["Storage"])
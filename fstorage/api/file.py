@@ -1,23 +1,66 @@
 import os
-import io
-import uuid
 import logging
-from datetime import timedelta
+from datetime import timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 
-from fastapi import APIRouter, File, Body, UploadFile, status
+from fastapi import APIRouter, File, Body, Header, Query, UploadFile, status
 from fastapi.exceptions import HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
-from config import settings
+from config import settings, buckets, object_ids
+from config.buckets import BucketPolicy
 from dependencies.file import FileDependency
-from schemas.file import ResponseUploadSchema, ResponseDeleteSchema, ResponseLinkSchema
+from schemas.file import ResponseUploadSchema, ResponseDeleteSchema, ResponseLinkSchema, \
+                            ResponseUploadFormSchema, ResponseBatchLinkSchema, \
+                            ResponseBatchDeleteSchema, ResponseFileListSchema
 from exceptions.exceptions import APIException, IncorrectBucketName, IncorrectFileSize, \
                                     IncorrectFileFormat, FileNotUploaded, FileNotFound, \
-                                    FileNotDeleted, FailedLinkGeneration
+                                    FileNotDeleted, FailedLinkGeneration, IncorrectBatchSize, \
+                                    RangeNotSatisfiable, IncorrectCursor, IncorrectVariant
+from storage.storage import StoredObject
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# leading bytes of each allowed format, checked instead of trusting the file extension
+FILE_SIGNATURES: dict[str, tuple[tuple[int, bytes], ...]] = {
+    ".png": ((0, b"\x89PNG\r\n\x1a\n"),),
+    ".jpg": ((0, b"\xff\xd8\xff"),),
+    ".mp4": ((4, b"ftyp"),),
+    ".mov": ((4, b"ftyp"), (4, b"moov"), (4, b"wide"), (4, b"mdat")),
+    ".mkv": ((0, b"\x1a\x45\xdf\xa3"),),
+    ".avi": ((8, b"AVI "),),
+}
+
+
+def sniff_format(head: bytes, file_format: str) -> bool:
+    """Check the first bytes of the content against the claimed file format"""
+    signatures = FILE_SIGNATURES.get(file_format)
+    if signatures is None:
+        return True
+    return any(head[offset:offset + len(magic)] == magic for offset, magic in signatures)
+
+
+def validate_upload(bucket_name: str, filename: str, file_size: int) -> tuple[BucketPolicy, str]:
+    """Check upload against the bucket policy, returns the policy and file format"""
+    policy = buckets.get(bucket_name)
+
+    # check bucket name
+    if policy is None:
+        raise IncorrectBucketName
+
+    # check file size
+    if policy.max_length < file_size:
+        raise IncorrectFileSize
+
+    # check file format
+    _, file_format = os.path.splitext(filename)
+    if file_format not in policy.allowed_formats:
+        raise IncorrectFileFormat
+
+    return policy, file_format
+
 
 @router.post(
     path="/{bucket_name}/upload",
@@ -77,33 +120,22 @@ async def upload_file(
     user_id: str = Body(embed=True),
     file: UploadFile = File(...)
 ) -> ResponseUploadSchema:
-    bucket_settings = settings.app.file_upload_validation_settings.get(bucket_name)
-
-    # check bucket name
-    if bucket_settings is None:
-        raise IncorrectBucketName
-
-    # check file size
-    max_length = bucket_settings.get("max_length", 0)
-    if not isinstance(max_length, int):
-        raise ValueError(f"Incorrect type for max_length {type(max_length)}")
     file_size = file.size if file.size else 0
-    if max_length < file_size:
-        raise IncorrectFileSize
+    policy, file_format = validate_upload(bucket_name, str(file.filename), file_size)
 
-    # check file format
-    _, file_format = os.path.splitext(str(file.filename))
-    allowed_formats = bucket_settings.get("allowed_formats")
-    if not isinstance(allowed_formats, list):
-        raise ValueError(f"Incorrect type for allowed_formats {type(allowed_formats)}")
-    if allowed_formats is not None and file_format not in allowed_formats:
-        raise IncorrectFileFormat
+    if settings.app.sniff_file_format:
+        await file.seek(0)
+        if not sniff_format(await file.read(16), file_format):
+            raise IncorrectFileFormat
 
     try:
-        filename = str(uuid.uuid4()) + str(file_format)
-        file_bytes = io.BytesIO(await file.read())
+        # a deduplicated file may end up on another object, so its name can not be in the id
+        filename = object_ids.new_object_name(
+            bucket_name, file_format, signed=not policy.deduplicate
+        )
+        await file.seek(0)
         return await file_service.upload_file(
-            file=file_bytes,
+            file=file.file,
             user_id=user_id,
             bucket_name=bucket_name,
             object_name=filename,
@@ -119,6 +151,386 @@ async def upload_file(
         )
 
 
+@router.post(
+    path="/{bucket_name}/upload-form",
+    responses={
+        400: {
+            "description": "Bad Request",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                            }
+                        }
+                    },
+                    "examples": {
+                        "IncorrectBucketName": {
+                            "value": {"detail": IncorrectBucketName.detail}
+                        },
+                        "IncorrectFileSize": {
+                            "value": {"detail": IncorrectFileSize.detail}
+                        },
+                        "IncorrectFileFormat": {
+                            "value": {"detail": IncorrectFileFormat.detail}
+                        }
+                    }
+                }
+            }
+        },
+        500: {
+            "description": "Internal Server Error",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                                "example": "An unexpected error occurred. Failed generation form"
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    },
+    summary="Get presigned POST form for direct upload to S3 Storage",
+    response_description="Upload url, form fields and object name for completion"
+)
+async def get_upload_form(
+    bucket_name: str,
+    file_service: FileDependency,
+    user_id: str = Body(embed=True),
+    filename: str = Body(embed=True),
+    file_size: int = Body(embed=True)
+) -> ResponseUploadFormSchema:
+    policy, file_format = validate_upload(bucket_name, filename, file_size)
+
+    try:
+        return await file_service.get_upload_form(
+            user_id=user_id,
+            bucket_name=bucket_name,
+            object_name=object_ids.new_object_name(bucket_name, file_format),
+            max_size=policy.max_length,
+            ttl=timedelta(minutes=settings.app.upload_form_ttl)
+        )
+    except APIException as e:
+        raise e
+    except Exception as e:
+        logger.error("Failed generation upload form | error > %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred. Failed generation form"
+        )
+
+
+@router.post(
+    path="/{bucket_name}/upload-complete",
+    responses={
+        400: {
+            "description": "Bad Request",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                            }
+                        }
+                    },
+                    "examples": {
+                        "IncorrectBucketName": {
+                            "value": {"detail": IncorrectBucketName.detail}
+                        },
+                        "IncorrectFileSize": {
+                            "value": {"detail": IncorrectFileSize.detail}
+                        },
+                        "IncorrectFileFormat": {
+                            "value": {"detail": IncorrectFileFormat.detail}
+                        },
+                        "FileNotUploaded": {
+                            "value": {"detail": FileNotUploaded.detail}
+                        }
+                    }
+                }
+            }
+        },
+        500: {
+            "description": "Internal Server Error",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                                "example": "An unexpected error occurred. File not uploaded"
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    },
+    summary="Register file uploaded directly to S3 Storage",
+    response_description="Object ID and Permanent link (if bucket is public)"
+)
+async def complete_upload(
+    bucket_name: str,
+    file_service: FileDependency,
+    user_id: str = Body(embed=True),
+    object_name: str = Body(embed=True)
+) -> ResponseUploadSchema:
+    policy, _ = validate_upload(bucket_name, object_name, 0)
+
+    # only object names issued by upload-form are accepted
+    if not object_ids.is_issued(bucket_name, object_name):
+        raise FileNotUploaded
+
+    try:
+        return await file_service.complete_upload(
+            user_id=user_id,
+            bucket_name=bucket_name,
+            object_name=object_name,
+            max_size=policy.max_length
+        )
+    except APIException as e:
+        raise e
+    except Exception as e:
+        logger.error("File not uploaded | error > %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred. File not uploaded"
+        )
+
+
+def validate_batch(bucket_name: str, object_ids: list[str]) -> BucketPolicy:
+    policy = buckets.get(bucket_name)
+    if policy is None:
+        raise IncorrectBucketName
+
+    if len(object_ids) > settings.app.batch_max_size:
+        raise IncorrectBatchSize
+
+    return policy
+
+
+@router.post(
+    path="/{bucket_name}/links",
+    responses={
+        400: {
+            "description": "Bad Request",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                            }
+                        }
+                    },
+                    "examples": {
+                        "IncorrectBucketName": {
+                            "value": {"detail": IncorrectBucketName.detail}
+                        },
+                        "IncorrectBatchSize": {
+                            "value": {"detail": IncorrectBatchSize.detail}
+                        }
+                    }
+                }
+            }
+        },
+        500: {
+            "description": "Internal Server Error",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                                "example": "An unexpected error occurred. Failed generation links"
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    },
+    summary="Generate temporary links for several files",
+    response_description="Temporary link or error detail for every object"
+)
+async def get_file_links(
+    bucket_name: str,
+    file_service: FileDependency,
+    object_ids: list[str] = Body(embed=True)
+) -> ResponseBatchLinkSchema:
+    policy = validate_batch(bucket_name, object_ids)
+
+    try:
+        items = await file_service.get_file_links(
+            bucket_name,
+            object_ids,
+            ttl=policy.temporary_link_ttl
+        )
+        return ResponseBatchLinkSchema(items=items)
+    except APIException as e:
+        raise e
+    except Exception as e:
+        logger.error("Failed generation links | error > %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred. Failed generation links"
+        )
+
+
+@router.post(
+    path="/{bucket_name}/delete",
+    responses={
+        400: {
+            "description": "Bad Request",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                            }
+                        }
+                    },
+                    "examples": {
+                        "IncorrectBucketName": {
+                            "value": {"detail": IncorrectBucketName.detail}
+                        },
+                        "IncorrectBatchSize": {
+                            "value": {"detail": IncorrectBatchSize.detail}
+                        }
+                    }
+                }
+            }
+        },
+        500: {
+            "description": "Internal Server Error",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                                "example": "An unexpected error occurred. Files not deleted"
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    },
+    summary="Delete several files from S3 Storage",
+    response_description="Operation status for every object"
+)
+async def delete_files(
+    bucket_name: str,
+    file_service: FileDependency,
+    user_id: str = Body(embed=True),
+    object_ids: list[str] = Body(embed=True)
+) -> ResponseBatchDeleteSchema:
+    validate_batch(bucket_name, object_ids)
+
+    try:
+        items = await file_service.delete_files(user_id, bucket_name, object_ids)
+        return ResponseBatchDeleteSchema(items=items)
+    except APIException as e:
+        raise e
+    except Exception as e:
+        logger.error("Files not deleted | error > %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred. Files not deleted"
+        )
+
+
+@router.get(
+    path="/{bucket_name}",
+    responses={
+        400: {
+            "description": "Bad Request",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                            }
+                        }
+                    },
+                    "examples": {
+                        "IncorrectBucketName": {
+                            "value": {"detail": IncorrectBucketName.detail}
+                        },
+                        "IncorrectBatchSize": {
+                            "value": {"detail": IncorrectBatchSize.detail}
+                        },
+                        "IncorrectCursor": {
+                            "value": {"detail": IncorrectCursor.detail}
+                        },
+                    }
+                }
+            }
+        },
+        500: {
+            "description": "Internal Server Error",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                                "example": "An unexpected error occurred. Failed listing files"
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    },
+    summary="List user files",
+    response_description="Page of files, newest first, and the cursor of the next page"
+)
+async def list_files(
+    bucket_name: str,
+    file_service: FileDependency,
+    user_id: str = Query(),
+    limit: int = Query(default=settings.app.list_page_size, ge=1),
+    cursor: str | None = Query(default=None)
+) -> ResponseFileListSchema:
+    # check bucket name
+    if bucket_name not in buckets:
+        raise IncorrectBucketName
+
+    if limit > settings.app.batch_max_size:
+        raise IncorrectBatchSize
+
+    try:
+        return await file_service.list_files(user_id, bucket_name, limit, cursor)
+    except APIException as e:
+        raise e
+    except Exception as e:
+        logger.error("Failed listing files | error > %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred. Failed listing files"
+        )
+
+
 @router.get(
     path="/{bucket_name}/{object_id}",
     responses={
@@ -144,6 +556,9 @@ async def upload_file(
                         "FileNotFound": {
                             "value": {"detail": FileNotFound.detail}
                         },
+                        "IncorrectVariant": {
+                            "value": {"detail": IncorrectVariant.detail}
+                        },
                     }
                 }
             }
@@ -171,19 +586,21 @@ async def upload_file(
 async def get_file_link(
     bucket_name: str,
     object_id: str,
-    file_service: FileDependency
+    file_service: FileDependency,
+    variant: str | None = Query(default=None)
 ) -> ResponseLinkSchema:
-    bucket_settings = settings.app.file_upload_validation_settings.get(bucket_name)
+    policy = buckets.get(bucket_name)
 
     # check bucket name
-    if bucket_settings is None:
+    if policy is None:
         raise IncorrectBucketName
 
     try:
         link = await file_service.get_file_link(
             bucket_name,
             object_id,
-            ttl=timedelta(hours=settings.app.temporary_link_ttl)
+            ttl=policy.temporary_link_ttl,
+            variant=variant
         )
         return ResponseLinkSchema(link=link)
     except APIException as e:
@@ -196,6 +613,177 @@ async def get_file_link(
         )
 
 
+def parse_range(range_header: str, size: int) -> tuple[int, int] | None:
+    """Resolve a single bytes range to (offset, length), None means the whole object"""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            # suffix range: the last N bytes
+            length = min(int(last), size)
+            if length <= 0:
+                raise RangeNotSatisfiable
+            return size - length, length
+
+        offset = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+
+    if offset >= size:
+        raise RangeNotSatisfiable
+    if end < offset:
+        return None
+    return offset, end - offset + 1
+
+
+def is_not_modified(
+    stored_object: StoredObject,
+    if_none_match: str | None,
+    if_modified_since: str | None
+) -> bool:
+    # If-Modified-Since is ignored when If-None-Match is sent
+    if if_none_match is not None:
+        etags = {etag.strip().removeprefix("W/").strip('"') for etag in if_none_match.split(",")}
+        return "*" in etags or stored_object.etag in etags
+
+    if if_modified_since is not None and stored_object.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return stored_object.last_modified.replace(microsecond=0) <= since
+    return False
+
+
+@router.get(
+    path="/{bucket_name}/{object_id}/content",
+    responses={
+        200: {"description": "Object content"},
+        206: {"description": "Requested range of the object content"},
+        304: {"description": "Not Modified"},
+        400: {
+            "description": "Bad Request",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                            }
+                        }
+                    },
+                    "examples": {
+                        "IncorrectBucketName": {
+                            "value": {"detail": IncorrectBucketName.detail}
+                        },
+                        "FileNotFound": {
+                            "value": {"detail": FileNotFound.detail}
+                        },
+                    }
+                }
+            }
+        },
+        416: {
+            "description": "Range Not Satisfiable",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                                "example": RangeNotSatisfiable.detail
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        500: {
+            "description": "Internal Server Error",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                                "example": "An unexpected error occurred. Failed getting file"
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    },
+    summary="Download file",
+    response_description="File content streamed from the storage"
+)
+async def get_file_content(
+    bucket_name: str,
+    object_id: str,
+    file_service: FileDependency,
+    range_header: str | None = Header(default=None, alias="Range"),
+    if_none_match: str | None = Header(default=None),
+    if_modified_since: str | None = Header(default=None)
+) -> Response:
+    # check bucket name
+    if bucket_name not in buckets:
+        raise IncorrectBucketName
+
+    try:
+        object_name, stored_object = await file_service.stat_file(bucket_name, object_id)
+
+        headers = {"ETag": f'"{stored_object.etag}"', "Accept-Ranges": "bytes"}
+        if stored_object.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(stored_object.last_modified, usegmt=True)
+
+        if is_not_modified(stored_object, if_none_match, if_modified_since):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        status_code = status.HTTP_200_OK
+        offset, length = 0, stored_object.size
+        if range_header is not None:
+            try:
+                byte_range = parse_range(range_header, stored_object.size)
+            except RangeNotSatisfiable as e:
+                return JSONResponse(
+                    status_code=e.status_code,
+                    content={"detail": e.detail},
+                    headers={"Content-Range": f"bytes */{stored_object.size}"}
+                )
+            if byte_range is not None:
+                offset, length = byte_range
+                status_code = status.HTTP_206_PARTIAL_CONTENT
+                headers["Content-Range"] = (
+                    f"bytes {offset}-{offset + length - 1}/{stored_object.size}"
+                )
+
+        headers["Content-Length"] = str(length)
+        stream = await file_service.get_file_stream(bucket_name, object_name, offset, length)
+        return StreamingResponse(
+            stream,
+            status_code=status_code,
+            headers=headers,
+            media_type=stored_object.content_type or "application/octet-stream"
+        )
+    except APIException as e:
+        raise e
+    except Exception as e:
+        logger.error("Failed getting file | error > %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred. Failed getting file"
+        )
+
+
 @router.delete(
     path="/{bucket_name}/{object_id}",
     responses={
@@ -249,6 +837,10 @@ async def delete_file(
     file_service: FileDependency,
     user_id: str = Body(embed=True)
 ) -> ResponseDeleteSchema:
+    # check bucket name
+    if bucket_name not in buckets:
+        raise IncorrectBucketName
+
     try:
         delete_status = await file_service.delete_file(user_id, bucket_name, object_id)
         return ResponseDeleteSchema(status=delete_status)
@@ -0,0 +1,48 @@
+import asyncio
+
+from fastapi import APIRouter, Request, Response, status
+
+from config import settings, db_helper
+from schemas.health import HealthSchema, ReadinessSchema
+
+router = APIRouter()
+
+
+async def check(coro) -> bool:
+    try:
+        return await asyncio.wait_for(coro, timeout=settings.server.readiness_timeout)
+    except Exception:
+        return False
+
+
+@router.get(
+    path="/live",
+    summary="Liveness probe",
+    response_description="The process is serving requests"
+)
+async def get_liveness() -> HealthSchema:
+    return HealthSchema(status="ok")
+
+
+@router.get(
+    path="/ready",
+    responses={
+        503: {"model": ReadinessSchema, "description": "Database or storage is not available"}
+    },
+    summary="Readiness probe",
+    response_description="Database and storage pools can serve requests"
+)
+async def get_readiness(request: Request, response: Response) -> ReadinessSchema:
+    # a saturated pool fails the check by timing out, like an unreachable server
+    database, storage = await asyncio.gather(
+        check(db_helper.ping()),
+        check(request.app.state.storage.ping())
+    )
+    ready = database and storage
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return ReadinessSchema(
+        status="ready" if ready else "unavailable",
+        database=database,
+        storage=storage
+    )
@@ -0,0 +1,24 @@
+import asyncio
+
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+from metrics import registry
+from metrics.state import collect_state
+
+router = APIRouter()
+
+
+@router.get(
+    path="/metrics",
+    summary="Metrics in Prometheus text format",
+    response_class=PlainTextResponse
+)
+async def get_metrics(request: Request) -> PlainTextResponse:
+    collect_state(request.app)
+    shared_metrics = request.app.state.shared_metrics
+    if shared_metrics is None:
+        return PlainTextResponse(registry.render(), media_type=registry.content_type)
+    # with several workers any of them answers for all, from the files they share
+    content = await asyncio.to_thread(shared_metrics.render)
+    return PlainTextResponse(content, media_type=registry.content_type)
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Request
+
+from config import db_helper
+from schemas.stats import StorageExecutorStatsSchema, LinkCacheStatsSchema, \
+                            RowCacheStatsSchema, DatabasePoolStatsSchema, ReplicaStatsSchema
+
+router = APIRouter()
+
+
+@router.get(
+    path="/storage",
+    summary="Storage executor load",
+    response_description="Running, queued and waiting storage calls"
+)
+async def get_storage_stats(request: Request) -> StorageExecutorStatsSchema:
+    return StorageExecutorStatsSchema(**request.app.state.storage_executor.stats())
+
+
+@router.get(
+    path="/links",
+    summary="Temporary link cache efficiency",
+    response_description="Cache hits, misses and size"
+)
+async def get_link_cache_stats(request: Request) -> LinkCacheStatsSchema:
+    return LinkCacheStatsSchema(**request.app.state.link_cache.stats())
+
+
+@router.get(
+    path="/rows",
+    summary="File row cache efficiency",
+    response_description="Cache hits, lookups answered as missing, misses, size and memory"
+)
+async def get_row_cache_stats(request: Request) -> RowCacheStatsSchema:
+    row_cache = request.app.state.row_cache
+    if row_cache is None:
+        return RowCacheStatsSchema(enabled=False)
+    return RowCacheStatsSchema(enabled=True, **row_cache.stats())
+
+
+@router.get(
+    path="/db",
+    summary="Database connection pool saturation",
+    response_description="Pool usage and connection wait times"
+)
+async def get_db_pool_stats() -> DatabasePoolStatsSchema:
+    return DatabasePoolStatsSchema(**db_helper.pool_stats())
+
+
+@router.get(
+    path="/replicas",
+    summary="Read replica health",
+    response_description="Replicas in and out of the read rotation, their lag and usage"
+)
+async def get_replica_stats() -> list[ReplicaStatsSchema]:
+    return [ReplicaStatsSchema(**stats) for stats in db_helper.replica_stats()]
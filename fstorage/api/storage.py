@@ -0,0 +1,95 @@
+import os
+
+import anyio
+from fastapi import APIRouter, File, Form, Query, Request, UploadFile, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from dependencies.file import StorageDependency
+from storage.signed import SignedStorage
+from exceptions.exceptions import FileNotFound, FileNotUploaded, InvalidSignature
+
+router = APIRouter()
+
+
+class LocalFileResponse(FileResponse):
+    """Hands whole-file responses to the server for sendfile when it offers pathsend"""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request = Request(scope)
+        if (
+            "http.response.pathsend" not in scope.get("extensions", {})
+            or "range" in request.headers
+        ):
+            await super().__call__(scope, receive, send)
+            return
+
+        self.set_stat_headers(await anyio.to_thread.run_sync(os.stat, self.path))
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers
+        })
+        await send({"type": "http.response.pathsend", "path": self.path})
+
+
+def signed_storage(storage: StorageDependency) -> SignedStorage:
+    # the routes only exist for backends served by this application
+    if not isinstance(storage, SignedStorage):
+        raise FileNotFound
+    return storage
+
+
+@router.get(
+    path="/{bucket_name}/{object_name}",
+    summary="Download by temporary link of the local and memory storage backends",
+    response_description="File content"
+)
+async def get_object(
+    bucket_name: str,
+    object_name: str,
+    storage: StorageDependency,
+    expires: int = Query(),
+    signature: str = Query()
+) -> Response:
+    storage = signed_storage(storage)
+    if not storage.verify_link(bucket_name, object_name, expires, signature):
+        raise InvalidSignature
+
+    stored_object = await storage.stat_file(bucket_name, object_name)
+    if stored_object is None:
+        raise FileNotFound
+
+    headers = {"ETag": f'"{stored_object.etag}"'}
+    media_type = stored_object.content_type or "application/octet-stream"
+    path = storage.local_path(bucket_name, object_name)
+    if path is not None:
+        return LocalFileResponse(path, headers=headers, media_type=media_type)
+
+    stream = await storage.get_file_stream(bucket_name, object_name)
+    if stream is None:
+        raise FileNotFound
+    headers["Content-Length"] = str(stored_object.size)
+    return StreamingResponse(stream, headers=headers, media_type=media_type)
+
+
+@router.post(
+    path="/{bucket_name}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Upload form target of the local and memory storage backends"
+)
+async def post_object(
+    bucket_name: str,
+    storage: StorageDependency,
+    policy: str = Form(),
+    signature: str = Form(),
+    file: UploadFile = File(...)
+) -> Response:
+    storage = signed_storage(storage)
+    conditions = storage.verify_form(bucket_name, policy, signature, file.size or 0)
+    if conditions is None:
+        raise InvalidSignature
+
+    if not await storage.store_form(conditions, file.file):
+        raise FileNotUploaded
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,306 @@
+import logging
+
+from fastapi import APIRouter, Body, Query, Request, status
+from fastapi.exceptions import HTTPException
+
+from config import settings, object_ids
+from dependencies.upload import UploadDependency
+from .file import validate_upload
+from schemas.file import ResponseUploadSchema, ResponseUploadSessionSchema, UploadPartSchema
+from exceptions.exceptions import APIException, IncorrectBucketName, IncorrectFileSize, \
+                                    IncorrectFileFormat, FileNotUploaded, UploadNotFound, \
+                                    IncorrectPart, UploadNotCompleted
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.post(
+    path="/{bucket_name}/uploads",
+    responses={
+        400: {
+            "description": "Bad Request",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                            }
+                        }
+                    },
+                    "examples": {
+                        "IncorrectBucketName": {
+                            "value": {"detail": IncorrectBucketName.detail}
+                        },
+                        "IncorrectFileSize": {
+                            "value": {"detail": IncorrectFileSize.detail}
+                        },
+                        "IncorrectFileFormat": {
+                            "value": {"detail": IncorrectFileFormat.detail}
+                        },
+                        "FileNotUploaded": {
+                            "value": {"detail": FileNotUploaded.detail}
+                        }
+                    }
+                }
+            }
+        },
+        500: {
+            "description": "Internal Server Error",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                                "example": "An unexpected error occurred. Upload not started"
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    },
+    summary="Start resumable upload",
+    response_description="Upload ID and the parts to send"
+)
+async def create_upload(
+    bucket_name: str,
+    upload_service: UploadDependency,
+    user_id: str = Body(embed=True),
+    filename: str = Body(embed=True),
+    file_size: int = Body(embed=True)
+) -> ResponseUploadSessionSchema:
+    _, file_format = validate_upload(bucket_name, filename, file_size)
+    if file_size <= 0:
+        raise IncorrectFileSize
+
+    try:
+        return await upload_service.create_upload(
+            user_id=user_id,
+            bucket_name=bucket_name,
+            object_name=object_ids.new_object_name(bucket_name, file_format),
+            file_size=file_size,
+            part_size=settings.minio.upload_part_size
+        )
+    except APIException as e:
+        raise e
+    except Exception as e:
+        logger.error("Upload not started | error > %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred. Upload not started"
+        )
+
+
+@router.get(
+    path="/{bucket_name}/uploads/{upload_id}",
+    responses={
+        400: {
+            "description": "Bad Request",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                            }
+                        }
+                    },
+                    "examples": {
+                        "UploadNotFound": {
+                            "value": {"detail": UploadNotFound.detail}
+                        }
+                    }
+                }
+            }
+        },
+        500: {
+            "description": "Internal Server Error",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                                "example": "An unexpected error occurred. Failed getting upload"
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    },
+    summary="Get resumable upload state",
+    response_description="Received and missing parts"
+)
+async def get_upload(
+    bucket_name: str,
+    upload_id: str,
+    upload_service: UploadDependency,
+    user_id: str = Query()
+) -> ResponseUploadSessionSchema:
+    try:
+        return await upload_service.get_upload(user_id, bucket_name, upload_id)
+    except APIException as e:
+        raise e
+    except Exception as e:
+        logger.error("Failed getting upload | error > %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred. Failed getting upload"
+        )
+
+
+@router.put(
+    path="/{bucket_name}/uploads/{upload_id}/parts/{part_number}",
+    responses={
+        400: {
+            "description": "Bad Request",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                            }
+                        }
+                    },
+                    "examples": {
+                        "UploadNotFound": {
+                            "value": {"detail": UploadNotFound.detail}
+                        },
+                        "IncorrectPart": {
+                            "value": {"detail": IncorrectPart.detail}
+                        },
+                        "FileNotUploaded": {
+                            "value": {"detail": FileNotUploaded.detail}
+                        }
+                    }
+                }
+            }
+        },
+        500: {
+            "description": "Internal Server Error",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                                "example": "An unexpected error occurred. Part not uploaded"
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    },
+    summary="Upload one part of resumable upload as raw request body",
+    response_description="Received part"
+)
+async def upload_part(
+    bucket_name: str,
+    upload_id: str,
+    part_number: int,
+    request: Request,
+    upload_service: UploadDependency,
+    user_id: str = Query()
+) -> UploadPartSchema:
+    # A part never exceeds part_size, stop reading as soon as the body is larger
+    part_size = settings.minio.upload_part_size
+    if int(request.headers.get("content-length", 0)) > part_size:
+        raise IncorrectPart
+    data = bytearray()
+    async for chunk in request.stream():
+        data.extend(chunk)
+        if len(data) > part_size:
+            raise IncorrectPart
+
+    try:
+        return await upload_service.upload_part(
+            user_id, bucket_name, upload_id, part_number, bytes(data)
+        )
+    except APIException as e:
+        raise e
+    except Exception as e:
+        logger.error("Part not uploaded | error > %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred. Part not uploaded"
+        )
+
+
+@router.post(
+    path="/{bucket_name}/uploads/{upload_id}/complete",
+    responses={
+        400: {
+            "description": "Bad Request",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                            }
+                        }
+                    },
+                    "examples": {
+                        "UploadNotFound": {
+                            "value": {"detail": UploadNotFound.detail}
+                        },
+                        "UploadNotCompleted": {
+                            "value": {"detail": UploadNotCompleted.detail}
+                        },
+                        "FileNotUploaded": {
+                            "value": {"detail": FileNotUploaded.detail}
+                        }
+                    }
+                }
+            }
+        },
+        500: {
+            "description": "Internal Server Error",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "detail": {
+                                "type": "string",
+                                "example": "An unexpected error occurred. File not uploaded"
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    },
+    summary="Complete resumable upload",
+    response_description="Object ID and Permanent link (if bucket is public)"
+)
+async def complete_upload(
+    bucket_name: str,
+    upload_id: str,
+    upload_service: UploadDependency,
+    user_id: str = Body(embed=True)
+) -> ResponseUploadSchema:
+    try:
+        return await upload_service.complete_upload(user_id, bucket_name, upload_id)
+    except APIException as e:
+        raise e
+    except Exception as e:
+        logger.error("File not uploaded | error > %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred. File not uploaded"
+        )
@@ -0,0 +1,141 @@
+import time
+import logging
+from abc import ABC, abstractmethod
+from typing import cast
+from collections import OrderedDict
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:  # optional dependency, only needed for a shared cache
+    aioredis = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+
+class LinkCache(ABC):
+    """Cache of issued temporary links keyed by (bucket_name, object_id).
+
+    A link is handed out again only while it stays valid for at least
+    min_validity seconds, so clients never receive an almost expired link.
+    """
+
+    def __init__(self, min_validity: float) -> None:
+        self.min_validity = min_validity
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    async def get(self, bucket_name: str, object_id: str) -> str | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, bucket_name: str, object_id: str, link: str, expires_at: float) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def invalidate(self, bucket_name: str, object_id: str) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+    def _count(self, link: str | None) -> str | None:
+        if link is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return link
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class MemoryLinkCache(LinkCache):
+    """Process-local LRU cache bounded by max_size entries.
+
+    Invalidations stay in this process, so it is only correct for a single
+    worker: other workers would keep linking to deleted files. max_size=0
+    turns caching off.
+    """
+
+    def __init__(self, min_validity: float, max_size: int) -> None:
+        super().__init__(min_validity)
+        self.max_size = max_size
+        self._links: OrderedDict[tuple[str, str], tuple[str, float]] = OrderedDict()
+
+    async def get(self, bucket_name: str, object_id: str) -> str | None:
+        key = (bucket_name, object_id)
+        entry = self._links.get(key)
+        if entry is None:
+            return self._count(None)
+
+        link, expires_at = entry
+        if expires_at - time.time() < self.min_validity:
+            del self._links[key]
+            return self._count(None)
+
+        self._links.move_to_end(key)
+        return self._count(link)
+
+    async def set(self, bucket_name: str, object_id: str, link: str, expires_at: float) -> None:
+        if not self.max_size:
+            return
+        key = (bucket_name, object_id)
+        self._links[key] = (link, expires_at)
+        self._links.move_to_end(key)
+        while len(self._links) > self.max_size:
+            self._links.popitem(last=False)
+
+    async def invalidate(self, bucket_name: str, object_id: str) -> None:
+        self._links.pop((bucket_name, object_id), None)
+
+    def stats(self) -> dict[str, int]:
+        return {**super().stats(), "size": len(self._links), "max_size": self.max_size}
+
+
+class RedisLinkCache(LinkCache):
+    """Cache shared by all workers through a Redis-protocol compatible server.
+
+    Keys expire on the server once the remaining validity drops below
+    min_validity, eviction of cold keys is left to the server maxmemory policy.
+    """
+
+    key_prefix = "fstorage:link"
+
+    def __init__(self, min_validity: float, url: str) -> None:
+        if aioredis is None:
+            raise RuntimeError("Shared link cache requires the 'redis' package")
+        super().__init__(min_validity)
+        self.client = aioredis.from_url(url, decode_responses=True)
+
+    def _key(self, bucket_name: str, object_id: str) -> str:
+        return f"{self.key_prefix}:{bucket_name}:{object_id}"
+
+    async def get(self, bucket_name: str, object_id: str) -> str | None:
+        try:
+            # decode_responses makes the client return str
+            link = cast(str | None, await self.client.get(self._key(bucket_name, object_id)))
+        except Exception as e:
+            logger.warning("Link cache is unavailable > %s", e)
+            link = None
+        return self._count(link)
+
+    async def set(self, bucket_name: str, object_id: str, link: str, expires_at: float) -> None:
+        stale_at = expires_at - self.min_validity
+        if stale_at <= time.time():
+            return
+        try:
+            await self.client.set(
+                self._key(bucket_name, object_id), link, pxat=int(stale_at * 1000)
+            )
+        except Exception as e:
+            logger.warning("Link cache is unavailable > %s", e)
+
+    async def invalidate(self, bucket_name: str, object_id: str) -> None:
+        try:
+            await self.client.delete(self._key(bucket_name, object_id))
+        except Exception as e:
+            logger.warning("Link cache is unavailable > %s", e)
+
+    async def close(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,171 @@
+import sys
+import math
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Any, Iterable
+
+
+class BloomFilter:
+    """Fixed size set membership with false positives at about error_rate, never negatives"""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # double hashing, k positions out of one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key)
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class RowCache:
+    """Process-local read-through cache of rows, as plain column dicts.
+
+    Found rows are kept in an LRU bounded by max_size entries for ttl seconds.
+    Keys known to be missing go into a bloom filter instead, so probes for bogus
+    or deleted keys cost a few bits each; the filter is split in two generations
+    swapped every negative_ttl / 2 seconds, or once the newer one is full, so a
+    key is known missing for at most negative_ttl seconds. A false positive turns
+    an existing row into a 404, so error_rate is kept tiny. A key added after it
+    was found missing is masked until both generations rotated. Other workers only
+    see a change once their entries expire: a row inserted through another worker
+    stays a 404 here for up to negative_ttl seconds, which is why it is kept short.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        negative_ttl: float,
+        negative_capacity: int,
+        error_rate: float = 1e-6
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.negative_capacity = negative_capacity
+        self.error_rate = error_rate
+        self._rows: OrderedDict[str, tuple[dict[str, Any], float, int]] = OrderedDict()
+        self._keys_by_id: dict[str, str] = {}
+        self._row_bytes = 0
+        self._missing = [self._new_filter(), self._new_filter()]
+        self._cleared: list[set[str]] = [set(), set()]
+        self._rotated_at = time.monotonic()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def _new_filter(self) -> BloomFilter:
+        return BloomFilter(self.negative_capacity, self.error_rate)
+
+    def _rotate(self) -> None:
+        now = time.monotonic()
+        if (
+            now - self._rotated_at < self.negative_ttl / 2
+            and self._missing[0].count < self.negative_capacity
+        ):
+            return
+        self._rotated_at = now
+        self._missing = [self._new_filter(), self._missing[0]]
+        self._cleared = [set(), self._cleared[0]]
+
+    def _is_missing(self, key: str) -> bool:
+        if key in self._cleared[0] or key in self._cleared[1]:
+            return False
+        return key in self._missing[0] or key in self._missing[1]
+
+    def lookup(self, key: str) -> tuple[bool, dict[str, Any] | None]:
+        """(True, row) on a hit, (True, None) for a key known to be missing, (False, None) else"""
+        self._rotate()
+        entry = self._rows.get(key)
+        if entry is not None:
+            row, expires_at, _ = entry
+            if expires_at > time.monotonic():
+                self._rows.move_to_end(key)
+                self.hits += 1
+                return True, row
+            self._drop(key)
+
+        if self._is_missing(key):
+            self.negative_hits += 1
+            return True, None
+
+        self.misses += 1
+        return False, None
+
+    def put(self, key: str, row: dict[str, Any]) -> None:
+        self._drop(key)
+        size = sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+        self._rows[key] = (row, time.monotonic() + self.ttl, size)
+        self._row_bytes += size
+        if "id" in row:
+            self._keys_by_id[row["id"]] = key
+        while len(self._rows) > self.max_size:
+            self._drop(next(iter(self._rows)))
+
+    def put_missing(self, key: str) -> None:
+        self._drop(key)
+        self._rotate()
+        self._missing[0].add(key)
+        self._unmask(key)
+
+    def _unmask(self, key: str) -> None:
+        self._cleared[0].discard(key)
+        self._cleared[1].discard(key)
+
+    def _drop(self, key: str) -> None:
+        entry = self._rows.pop(key, None)
+        if entry is None:
+            return
+        row, _, size = entry
+        self._row_bytes -= size
+        if "id" in row:
+            self._keys_by_id.pop(row["id"], None)
+
+    def invalidate(self, key: str) -> None:
+        """Forget the key, including a missing mark, so the next lookup reads the database"""
+        self._drop(key)
+        if self._is_missing(key):
+            self._cleared[0].add(key)
+
+    def invalidate_ids(self, row_ids: Iterable[str]) -> None:
+        for row_id in row_ids:
+            key = self._keys_by_id.get(row_id)
+            if key is not None:
+                self._drop(key)
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            "size": len(self._rows),
+            "max_size": self.max_size,
+            # row dicts and their values, the lru links and the filters, not exact
+            "memory_bytes": (
+                self._row_bytes
+                + sys.getsizeof(self._rows) + sys.getsizeof(self._keys_by_id)
+                + sum(bloom.nbytes for bloom in self._missing)
+            )
+        }
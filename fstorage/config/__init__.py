@@ -1,8 +1,28 @@
-from .config import Config
+from .config import Config, AppConfig, ENV_FILE
+from .buckets import BucketRegistry
+from .object_ids import ObjectIdScheme
 from .db.db_helper import DatabaseHelper
 
 settings = Config()
+# every worker process opens its own pools, the configured sizes are totals for all of them
 db_helper = DatabaseHelper(
     url=settings.db.db_url,
-    echo=settings.db.echo
+    echo=settings.db.echo,
+    pool_size=max(settings.db.pool_size // settings.server.process_count, 1),
+    max_overflow=settings.db.max_overflow // settings.server.process_count,
+    pool_timeout=settings.db.pool_timeout,
+    pool_recycle=settings.db.pool_recycle,
+    pool_pre_ping=settings.db.pool_pre_ping,
+    statement_cache_size=settings.db.statement_cache_size,
+    replica_urls=settings.db.replica_urls
 )
+# fails the import, and so the startup, when a bucket policy is invalid
+buckets = BucketRegistry(
+    load_settings=lambda: AppConfig().file_upload_validation_settings,
+    default_link_ttl=settings.app.temporary_link_ttl,
+    default_permalink_host=settings.minio.minio_url,
+    policy_file=settings.app.bucket_policy_file,
+    watched_file=ENV_FILE
+)
+# the key is shared by every worker, ids issued by one are resolved by all of them
+object_ids = ObjectIdScheme(settings.app.object_id_key)
@@ -0,0 +1,145 @@
+import os
+import re
+import json
+import logging
+from pathlib import Path
+from datetime import timedelta
+from typing import Any, Iterator, Literal, Mapping, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, PositiveInt, field_validator
+
+logger = logging.getLogger(__name__)
+
+
+VARIANT_NAME = re.compile(r"[a-z0-9_]{1,16}")
+
+
+class VariantSpec(BaseModel):
+    """A pre-sized derivative generated for every image uploaded to the bucket"""
+
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    width: PositiveInt
+    height: PositiveInt
+    format: Literal["webp", "jpeg", "png"] = "webp"
+    quality: int = Field(default=80, ge=1, le=100)
+    crop: bool = True  # fill the box and cut the overflow, otherwise fit inside it
+
+
+class BucketPolicy(BaseModel):
+    """Validated upload and link rules of one bucket, immutable once compiled"""
+
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    name: str
+    max_length: PositiveInt
+    allowed_formats: frozenset[str]
+    is_public: bool = False
+    deduplicate: bool = False
+    link_ttl: PositiveInt  # hours a temporary link stays valid
+    permalink_prefix: str
+    variants: dict[str, VariantSpec] = {}
+
+    @field_validator("allowed_formats")
+    @classmethod
+    def check_formats(cls, formats: frozenset[str]) -> frozenset[str]:
+        for file_format in formats:
+            if not file_format.startswith("."):
+                raise ValueError(f"file format {file_format!r} must start with a dot")
+        return formats
+
+    @field_validator("variants")
+    @classmethod
+    def check_variants(cls, variants: dict[str, VariantSpec]) -> dict[str, VariantSpec]:
+        # the name ends up in object names and query strings
+        for name in variants:
+            if not VARIANT_NAME.fullmatch(name):
+                raise ValueError(f"variant name {name!r} must match {VARIANT_NAME.pattern}")
+        return variants
+
+    @property
+    def temporary_link_ttl(self) -> timedelta:
+        return timedelta(hours=self.link_ttl)
+
+    def permalink(self, object_name: str) -> str:
+        return f"{self.permalink_prefix}/{object_name}"
+
+
+class BucketRegistry:
+    """Compiled bucket policies, swapped as a whole when the source changes.
+
+    Policies come from policy_file (JSON) when it is set, otherwise from the
+    file_upload_validation_settings of AppConfig, which is read from the env and
+    the .env file. A bad config fails at startup; a bad reload is logged and the
+    current policies stay in place.
+    """
+
+    def __init__(
+        self,
+        load_settings,
+        default_link_ttl: int,
+        default_permalink_host: str,
+        policy_file: Optional[str] = None,
+        watched_file: Optional[Path] = None
+    ) -> None:
+        self._load_settings = load_settings
+        self._default_link_ttl = default_link_ttl
+        self._default_permalink_host = default_permalink_host
+        self._policy_file = Path(policy_file) if policy_file else None
+        self._watched_file = self._policy_file or watched_file
+        self._mtime = self._source_mtime()
+        self._policies: dict[str, BucketPolicy] = self.compile(self._read_source())
+
+    def compile(self, raw: Mapping[str, Mapping[str, Any]]) -> dict[str, BucketPolicy]:
+        if not raw:
+            raise ValueError("no buckets configured")
+        return {
+            name: BucketPolicy(
+                name=name,
+                link_ttl=rules.get("link_ttl", self._default_link_ttl),
+                permalink_prefix=rules.get(
+                    "permalink_prefix", f"{self._default_permalink_host}/{name}"
+                ),
+                **{
+                    key: value for key, value in rules.items()
+                    if key not in ("link_ttl", "permalink_prefix")
+                }
+            )
+            for name, rules in raw.items()
+        }
+
+    def load(self, raw: Mapping[str, Mapping[str, Any]]) -> None:
+        self._policies = self.compile(raw)
+
+    def _read_source(self) -> Mapping[str, Mapping[str, Any]]:
+        if self._policy_file is not None:
+            return json.loads(self._policy_file.read_text())
+        return self._load_settings()
+
+    def _source_mtime(self) -> float | None:
+        try:
+            return os.stat(self._watched_file).st_mtime if self._watched_file else None
+        except OSError:
+            return None
+
+    def reload_if_changed(self) -> bool:
+        mtime = self._source_mtime()
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            self.load(self._read_source())
+        except Exception as e:
+            logger.error("Bucket policies not reloaded, keeping the current ones > %s", e)
+            return False
+        logger.info("Bucket policies reloaded > %s", ", ".join(self._policies))
+        return True
+
+    def get(self, bucket_name: str) -> BucketPolicy | None:
+        return self._policies.get(bucket_name)
+
+    def __contains__(self, bucket_name: object) -> bool:
+        return bucket_name in self._policies
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._policies))
@@ -1,5 +1,7 @@
+import os
 import logging
-from typing import Union
+from importlib.util import find_spec
+from typing import Any, Literal, Optional
 from pathlib import Path
 
 from pydantic import Field
@@ -8,6 +10,8 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 BASE_DIR = Path(__file__).parent.parent
 ENV_FILE = BASE_DIR / "config" / ".env"
+# the images extra, without it buckets get no variants unless configured explicitly
+PILLOW_INSTALLED = find_spec("PIL") is not None
 
 
 class BaseConfig(BaseSettings):
@@ -25,6 +29,20 @@ class DatabaseConfig(BaseConfig):
     user: str
     passwd: str
     echo: bool = False
+    # connections to each database server for the whole launcher, split between the workers:
+    # keep pool_size + max_overflow well under the server max_connections (100 by default)
+    pool_size: int = 20
+    max_overflow: int = 20
+    pool_timeout: float = 10  # seconds to wait for a free connection
+    pool_recycle: int = 1800  # seconds, -1 keeps connections forever
+    pool_pre_ping: bool = True
+    statement_cache_size: int = 100  # asyncpg prepared statements per connection, 0 for pgbouncer
+    # postgresql+asyncpg:// urls of read replicas as a JSON list, their user needs pg_monitor
+    replica_urls: list[str] = []
+    replica_max_lag: float = 5.0  # seconds behind the primary before a replica is dropped
+    replica_check_interval: int = 5  # seconds between replica health and lag checks
+    replica_check_timeout: float = 2.0  # seconds, a slower check counts as unhealthy
+    leader_check_interval: int = 10  # seconds between tries for the background task lock
 
     @property
     def db_url(self) -> str:
@@ -39,27 +57,110 @@ class MinioConfig(BaseConfig):
     access_key: str
     secret_key: str
     secure: bool = False
+    region: str = "us-east-1"  # set explicitly, so no request ever looks up a bucket location
+    upload_part_size: int = 10 * 1024 * 1024  # 10 MB, S3 requires at least 5 MB per part
+    download_chunk_size: int = 1024 * 1024  # 1 MB read per chunk when proxying downloads
+    executor_max_workers: int = 16  # concurrent blocking calls to MinIO
+    executor_max_queue_size: int = 64  # calls waiting for a free worker
+    pool_maxsize: int = 16  # keep-alive connections, should cover executor_max_workers
+    connect_timeout: float = 5.0  # seconds
+    read_timeout: float = 60.0  # seconds
+    max_retries: int = 3
+    retry_backoff: float = 0.2  # seconds, doubled on every retry
 
     @property
     def minio_url(self) -> str:
         return f"{self.host}:{self.port}"
 
 
-class AppConfig(BaseSettings):
-    file_upload_validation_settings: dict[str, dict[str, Union[int, list[str], bool]]] = {
+class StorageConfig(BaseConfig):
+    model_config = SettingsConfigDict(env_prefix="storage_")
+
+    backend: Literal["minio", "local", "memory"] = "minio"
+    local_root: str = "/var/lib/fstorage"  # bucket directories of the local backend
+    public_url: str = "http://localhost:3001"  # base of the links of the local and memory backends
+    signing_key: str = ""  # HMAC key of those links, shared by every worker
+
+
+class ServerConfig(BaseConfig):
+    model_config = SettingsConfigDict(env_prefix="server_")
+
+    host: str = "0.0.0.0"
+    port: int = 3001
+    workers: Optional[int] = None  # processes, the number of CPUs when unset
+    dev: bool = False  # single process with the code reloader
+    loop: Literal["none", "auto", "asyncio", "uvloop"] = "auto"  # uvloop when installed
+    http: Literal["auto", "h11", "httptools"] = "auto"  # httptools when installed
+    backlog: int = 2048  # pending connections queued by the kernel
+    keep_alive_timeout: int = 75  # seconds, keep above the load balancer idle timeout
+    graceful_shutdown_timeout: int = 120  # seconds in-flight requests get to finish on stop
+    limit_concurrency: Optional[int] = None  # connections per worker before 503 responses
+    readiness_timeout: float = 2.0  # seconds each readiness check may take
+
+    @property
+    def process_count(self) -> int:
+        return 1 if self.dev else self.workers or os.cpu_count() or 1
+
+
+class AppConfig(BaseConfig):
+    # compiled and validated into config.buckets, see BucketPolicy for the accepted keys
+    file_upload_validation_settings: dict[str, dict[str, Any]] = {
         "avatar": {
             "max_length": 5 * 1024 * 1024,  # 5 MB
             "allowed_formats": [".jpg", ".png"],
-            "is_public": True  # Affects permalink generation, not affect container settings
+            "is_public": True,  # Affects permalink generation, not affect container settings
+            "deduplicate": False,  # Store identical content once, shared by reference count
+            # pre-sized derivatives served by ?variant=, off unless Pillow is installed
+            "variants": {
+                "small": {"width": 64, "height": 64, "format": "webp"},
+                "medium": {"width": 256, "height": 256, "format": "webp"}
+            } if PILLOW_INSTALLED else {}
         },
         "video": {
             "max_length": 100 * 1024 * 1024,  # 100 MB
             "allowed_formats": [".mp4", ".mkv", ".mov", ".avi"],
-            "is_public": False  # Affects permalink generation, not affect container settings
+            "is_public": False,  # Affects permalink generation, not affect container settings
+            "deduplicate": False  # Store identical content once, shared by reference count
         }
     }
 
-    temporary_link_ttl: int = 12  # hours
+    bucket_policy_file: Optional[str] = None  # JSON file overriding the buckets above
+    bucket_policy_reload_interval: int = 30  # seconds between checks for changed bucket policies
+    sniff_file_format: bool = False  # check uploaded content signature, not only the extension
+    temporary_link_ttl: int = 12  # hours, default of buckets without their own link_ttl
+    upload_form_ttl: int = 15  # minutes a direct upload form stays usable
+    batch_max_size: int = 200  # object ids accepted by batch endpoints
+    list_page_size: int = 50  # files per page when listing, capped by batch_max_size
+    upload_session_ttl: int = 24  # hours without new parts before a resumable upload is dropped
+    file_drain_interval: int = 10  # seconds between drains of deleted files
+    pending_file_ttl: int = 60  # minutes a file may stay pending before it counts as abandoned
+    reconcile_interval: Optional[int] = None  # hours between reconciliation runs, off when unset
+    reconcile_grace: int = 24  # hours, younger objects and rows are never reported
+    reconcile_repair: bool = False  # periodic runs only report unless enabled
+    upload_gc_interval: int = 10  # minutes between abandoned upload collections
+    link_cache_size: int = 100_000  # links kept in memory, used only with a single worker
+    link_cache_min_validity: int = 60  # minutes a cached link must stay valid to be reused
+    # redis://host:port/db, required for link caching with several workers: a delete only
+    # clears the cache of the worker that served it
+    link_cache_url: Optional[str] = None
+    row_cache_size: int = 100_000  # file rows kept per worker, 0 turns the row cache off
+    row_cache_ttl: int = 30  # seconds a cached row is trusted, bounds staleness across workers
+    # seconds an object id stays known as missing, also how long a file uploaded through
+    # another worker can still be a 404 here
+    row_cache_negative_ttl: int = 5
+    row_cache_negative_size: int = 200_000  # missing object ids per filter generation
+    derivative_workers: int = 2  # processes generating image variants, 0 turns them off
+    derivative_interval: int = 2  # seconds between looks for files without variants
+    derivative_batch_size: int = 16  # files claimed and rendered per batch
+    derivative_claim_timeout: int = 300  # seconds before an unfinished claim is retried
+    derivative_max_attempts: int = 5  # claims before a file whose original fails is given up
+    # HMAC key of self-describing object ids, shared by every worker; uuid4 ids when unset
+    object_id_key: Optional[str] = None
+    # directory the workers exchange metrics through, so any of them serves /metrics for
+    # all; server.py creates one when starting several workers, each worker reports only
+    # its own metrics when unset
+    metrics_dir: Optional[str] = None
+    metrics_write_interval: int = 5  # seconds between writes of a worker's metrics
 
 
 class LoggingConfig(BaseSettings):
@@ -76,5 +177,7 @@ class LoggingConfig(BaseSettings):
 class Config(BaseSettings):
     app: AppConfig = AppConfig()
     logger: LoggingConfig = LoggingConfig()
+    server: ServerConfig = ServerConfig()
+    storage: StorageConfig = StorageConfig()
     minio: MinioConfig = Field(default_factory=MinioConfig)
     db: DatabaseConfig = Field(default_factory=DatabaseConfig)
@@ -1,18 +1,96 @@
-from typing import AsyncIterator
+import asyncio
+from itertools import count
+from typing import AsyncIterator, Sequence
 
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, \
+                                   AsyncSession
+
+from .pool import InstrumentedQueuePool, instrumented_pool
+from .replica import Replica
+from .leader import LeaderLock
 
 
 class DatabaseHelper:
-    def __init__(self, url: str, echo: bool) -> None:
-        self.engine = create_async_engine(url=url, echo=echo)
+    def __init__(
+        self,
+        url: str,
+        echo: bool,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        statement_cache_size: int = 100,
+        replica_urls: Sequence[str] = ()
+    ) -> None:
+        self._engine_options = {
+            "echo": echo,
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+            "pool_pre_ping": pool_pre_ping,
+            "connect_args": {"statement_cache_size": statement_cache_size}
+        }
+        self.engine = self._create_engine(url)
         self.session_factory = async_sessionmaker(
             bind=self.engine,
             autoflush=False,
             autocommit=False,
             expire_on_commit=False
         )
+        self.leader = LeaderLock(self.engine)
+        self.replicas = [Replica(self._create_engine(url)) for url in replica_urls]
+        self._turn = count()
+
+    def _create_engine(self, url: str) -> AsyncEngine:
+        return create_async_engine(url=url, **self._engine_options)
+
+    def replica_session_factory(self) -> async_sessionmaker[AsyncSession] | None:
+        """Session factory of the least busy healthy replica, None when reads go to the primary"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        # rotating the start spreads ties, min keeps the first of the least busy
+        start = next(self._turn) % len(healthy)
+        healthy = healthy[start:] + healthy[:start]
+        return min(healthy, key=lambda replica: replica.checked_out()).session_factory
+
+    async def check_replicas(self, max_lag: float, timeout: float) -> None:
+        await asyncio.gather(*(replica.check(max_lag, timeout) for replica in self.replicas))
+
+    def pool_stats(self) -> dict[str, int | float]:
+        return instrumented_pool(self.engine).stats()
+
+    def replica_stats(self) -> list[dict]:
+        return [replica.stats() for replica in self.replicas]
+
+    async def ping(self) -> bool:
+        try:
+            async with self.engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            return False
+
+    async def dispose(self) -> None:
+        # another worker takes the lead on its next refresh instead of waiting for a disconnect
+        await self.leader.release()
+        await self.engine.dispose()
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def get_read_session_dependency(self) -> AsyncIterator[AsyncSession | None]:
+        """Session on a replica for the reads of a request, None without a healthy one"""
+        session_factory = self.replica_session_factory()
+        if session_factory is None:
+            yield None
+            return
+        async with session_factory() as session:
+            yield session
 
     async def get_session_dependency(self) -> AsyncIterator[AsyncSession]:
         async with self.session_factory() as session:
@@ -0,0 +1,75 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# any constant works, it only has to be the same in every worker sharing the database
+LEADER_LOCK_KEY = 0x6673746F
+
+TRY_LOCK_QUERY = text("SELECT pg_try_advisory_lock(:key)")
+UNLOCK_QUERY = text("SELECT pg_advisory_unlock(:key)")
+
+
+class LeaderLock:
+    """Session advisory lock electing the one worker that runs the background passes.
+
+    The lock lasts as long as the connection holding it, which is kept out of the pool
+    between checks. A crashed leader frees it and another worker takes it over on its
+    next refresh.
+    """
+
+    def __init__(self, engine: AsyncEngine, key: int = LEADER_LOCK_KEY) -> None:
+        self.engine = engine
+        self.key = key
+        self._connection: AsyncConnection | None = None
+
+    @property
+    def held(self) -> bool:
+        return self._connection is not None
+
+    async def refresh(self) -> bool:
+        """Check a held lock still has its connection, or try to take a free one"""
+        if self._connection is not None:
+            try:
+                await self._connection.execute(text("SELECT 1"))
+                await self._connection.commit()
+                return True
+            except Exception as e:
+                logger.warning("Lost the leader lock > %r", e)
+                await self._discard()
+
+        connection = await self.engine.connect()
+        try:
+            acquired = (await connection.execute(TRY_LOCK_QUERY, {"key": self.key})).scalar()
+            # the lock belongs to the session, committing only ends the transaction
+            await connection.commit()
+        except Exception:
+            await connection.close()
+            raise
+        if not acquired:
+            await connection.close()
+            return False
+        logger.info("Took the leader lock, background passes run in this worker")
+        self._connection = connection
+        return True
+
+    async def release(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            await self._connection.execute(UNLOCK_QUERY, {"key": self.key})
+            await self._connection.commit()
+            await self._connection.close()
+            self._connection = None
+        except Exception as e:
+            logger.warning("Failed releasing the leader lock > %r", e)
+            await self._discard()
+
+    async def _discard(self) -> None:
+        # a pooled connection must never keep the lock, the server frees it on disconnect
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.invalidate()
+            await connection.close()
@@ -0,0 +1,69 @@
+import time
+from typing import Optional
+
+from sqlalchemy import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+from sqlalchemy.util.queue import AsyncAdaptedQueue
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class WaitTimedQueue(AsyncAdaptedQueue):
+    """Idle connections of the pool, adds up how long checkouts block on an empty queue"""
+
+    def __init__(self, maxsize: int = 0, use_lifo: bool = False) -> None:
+        super().__init__(maxsize, use_lifo)
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> ConnectionPoolEntry:
+        # only a full pool blocks here, opening an overflow connection happens outside
+        start = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            wait_time = time.perf_counter() - start
+            self.wait_time_total += wait_time
+            self.wait_time_max = max(self.wait_time_max, wait_time)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a free connection"""
+
+    _queue_class = WaitTimedQueue
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.checkouts += 1
+
+    def stats(self) -> dict[str, int | float]:
+        queue = self._pool
+        assert isinstance(queue, WaitTimedQueue)
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_time_avg": queue.wait_time_total / self.checkouts if self.checkouts else 0.0,
+            "wait_time_max": queue.wait_time_max
+        }
+
+
+def instrumented_pool(engine: AsyncEngine | Engine) -> InstrumentedQueuePool:
+    pool = engine.pool
+    # every engine of DatabaseHelper is created with this pool class
+    assert isinstance(pool, InstrumentedQueuePool)
+    return pool
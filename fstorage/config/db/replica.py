@@ -0,0 +1,67 @@
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from .pool import instrumented_pool
+
+logger = logging.getLogger(__name__)
+
+# seconds the replica is behind, 0 when it replayed everything it received, NULL when
+# it is not streaming from the primary: a standby cut off from it has nothing left to
+# receive and would look caught up, a server that is no standby has no WAL receiver.
+# The status column needs pg_read_all_stats (or pg_monitor) on the replica.
+LAG_QUERY = text(
+    "SELECT CASE "
+    "WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class Replica:
+    """A read-only standby with its own pool, taken out of rotation while unhealthy"""
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        self.session_factory = async_sessionmaker(
+            bind=engine,
+            autoflush=False,
+            autocommit=False,
+            expire_on_commit=False
+        )
+        self.name = engine.url.render_as_string(hide_password=True)
+        # unhealthy until the first check, a replica is never used before its lag is known
+        self.healthy = False
+        self.lag: float | None = None
+
+    async def check(self, max_lag: float, timeout: float) -> bool:
+        try:
+            async with asyncio.timeout(timeout), self.engine.connect() as connection:
+                lag = (await connection.execute(LAG_QUERY)).scalar()
+            self.lag = None if lag is None else float(lag)
+            healthy = self.lag is not None and self.lag <= max_lag
+        except Exception as e:
+            logger.warning("Replica %s failed health check > %r", self.name, e)
+            self.lag = None
+            healthy = False
+
+        if healthy != self.healthy:
+            logger.warning(
+                "Replica %s %s rotation | lag > %s",
+                self.name, "back in" if healthy else "out of", self.lag
+            )
+        self.healthy = healthy
+        return healthy
+
+    def checked_out(self) -> int:
+        return instrumented_pool(self.engine).checkedout()
+
+    def stats(self) -> dict[str, str | bool | float | int | None]:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag": self.lag,
+            "checked_out": self.checked_out()
+        }
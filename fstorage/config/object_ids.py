@@ -0,0 +1,87 @@
+import os
+import re
+import hmac
+import uuid
+import base64
+import hashlib
+import secrets
+from typing import Optional
+
+# lowercase base32 keeps ids safe in urls and object names, without dots or slashes
+EXTENSION = re.compile(r"[a-z0-9]{1,4}")
+BODY = re.compile(r"[a-z2-7]{29}")
+NONCE_BYTES = 10  # 16 characters
+TAG_BYTES = 8  # 13 characters
+NONCE_LENGTH = 16
+TAG_LENGTH = 13
+# the value shown in .env.example, public and so never accepted as a key
+PLACEHOLDER_KEY = "change-me"
+
+
+def _b32(data: bytes) -> str:
+    return base64.b32encode(data).decode().rstrip("=").lower()
+
+
+class ObjectIdScheme:
+    """Object ids that carry their own object name: `<extension>-<nonce><tag>`.
+
+    The tag is an HMAC over the bucket, the extension and the nonce, so an id that
+    verifies for a bucket could only have been issued for it, and its object name
+    is the id plus the extension; upload completion tells the names issued here from
+    any other without a lookup. Links still check the files row for the file status.
+    Without a key, and for extensions that do not fit the 36 characters of an
+    object_id, plain uuid4 ids are issued and resolved through the database.
+    """
+
+    def __init__(self, key: Optional[str]) -> None:
+        # checked here, so the startup fails instead of signing ids with a published key
+        if key == PLACEHOLDER_KEY:
+            raise ValueError("object id key is the placeholder of .env.example, set a secret")
+        self._key = key.encode() if key else None
+
+    @staticmethod
+    def _tag(key: bytes, bucket_name: str, extension: str, nonce: str) -> str:
+        message = f"{bucket_name}\n{extension}\n{nonce}".encode()
+        return _b32(hmac.new(key, message, hashlib.sha256).digest()[:TAG_BYTES])
+
+    def new_object_name(self, bucket_name: str, file_format: str, signed: bool = True) -> str:
+        extension = file_format.removeprefix(".")
+        if not signed or self._key is None or not EXTENSION.fullmatch(extension):
+            return str(uuid.uuid4()) + file_format
+        nonce = _b32(secrets.token_bytes(NONCE_BYTES))
+        tag = self._tag(self._key, bucket_name, extension, nonce)
+        return f"{extension}-{nonce}{tag}{file_format}"
+
+    def object_name(self, bucket_name: str, object_id: str) -> str | None:
+        """Object name of a signed id, None for legacy ids and ids that do not verify"""
+        if self._key is None:
+            return None
+        extension, _, body = object_id.partition("-")
+        if len(body) != NONCE_LENGTH + TAG_LENGTH or not EXTENSION.fullmatch(extension):
+            return None
+        nonce, tag = body[:NONCE_LENGTH], body[NONCE_LENGTH:]
+        if not hmac.compare_digest(self._tag(self._key, bucket_name, extension, nonce), tag):
+            return None
+        return f"{object_id}.{extension}"
+
+    def is_well_formed(self, object_id: str) -> bool:
+        """Whether the id has the shape of an issued one, whatever key signed it"""
+        extension, _, body = object_id.partition("-")
+        if EXTENSION.fullmatch(extension) and BODY.fullmatch(body):
+            return True
+        try:
+            uuid.UUID(object_id)
+            return True
+        except ValueError:
+            return False
+
+    def is_issued(self, bucket_name: str, object_name: str) -> bool:
+        """Whether the object name was generated here, as a signed or a uuid4 id"""
+        object_id, _ = os.path.splitext(object_name)
+        if self.object_name(bucket_name, object_id) == object_name:
+            return True
+        try:
+            uuid.UUID(object_id)
+            return True
+        except ValueError:
+            return False
@@ -1,30 +1,179 @@
+import os
+import logging
+import secrets
 from typing import Annotated
 
+import certifi
+import urllib3
 from minio import Minio
-from fastapi import Depends
+from fastapi import Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from config import settings, db_helper
+from config import settings, db_helper, buckets
 from services.file import FileService
 from repositories.file import FileRepository
+from repositories.blob import BlobRepository
+from storage.storage import S3Storage
 from storage.minio import MinioS3Storage
+from storage.presign import SigV4Presigner
+from storage.local import LocalStorage
+from storage.memory import MemoryStorage
+from storage.executor import StorageExecutor
+from cache.link_cache import LinkCache, MemoryLinkCache, RedisLinkCache
+from cache.row_cache import RowCache
+from services.derivatives import derivatives_supported
 
+logger = logging.getLogger(__name__)
 
-def get_minio_client() -> Minio:
+
+def create_http_client() -> urllib3.PoolManager:
+    return urllib3.PoolManager(
+        maxsize=settings.minio.pool_maxsize,
+        timeout=urllib3.Timeout(
+            connect=settings.minio.connect_timeout,
+            read=settings.minio.read_timeout
+        ),
+        cert_reqs="CERT_REQUIRED",
+        ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+        retries=urllib3.Retry(
+            total=settings.minio.max_retries,
+            backoff_factor=settings.minio.retry_backoff,
+            status_forcelist=[500, 502, 503, 504]
+        )
+    )
+
+
+def create_minio_client(http_client: urllib3.PoolManager) -> Minio:
     return Minio(
         endpoint=settings.minio.minio_url,
         access_key=settings.minio.access_key,
         secret_key=settings.minio.secret_key,
-        secure=settings.minio.secure
+        secure=settings.minio.secure,
+        region=settings.minio.region,
+        http_client=http_client
+    )
+
+
+def create_storage_executor() -> StorageExecutor:
+    return StorageExecutor(
+        max_workers=settings.minio.executor_max_workers,
+        max_queue_size=settings.minio.executor_max_queue_size
     )
 
 
+def create_storage(http_client: urllib3.PoolManager, executor: StorageExecutor) -> S3Storage:
+    backend = settings.storage.backend
+    if backend == "local":
+        # links are checked by whichever worker gets them, so the key can not be per process
+        if not settings.storage.signing_key:
+            raise ValueError("STORAGE_SIGNING_KEY is required by the local storage backend")
+        return LocalStorage(
+            settings.storage.local_root,
+            executor,
+            base_url=settings.storage.public_url,
+            signing_key=settings.storage.signing_key,
+            chunk_size=settings.minio.download_chunk_size
+        )
+    if backend == "memory":
+        return MemoryStorage(
+            base_url=settings.storage.public_url,
+            signing_key=settings.storage.signing_key or secrets.token_hex(32),
+            chunk_size=settings.minio.download_chunk_size
+        )
+
+    scheme = "https" if settings.minio.secure else "http"
+    endpoint_url = f"{scheme}://{settings.minio.minio_url}"
+    return MinioS3Storage(
+        create_minio_client(http_client),
+        executor,
+        part_size=settings.minio.upload_part_size,
+        download_chunk_size=settings.minio.download_chunk_size,
+        endpoint_url=endpoint_url,
+        presigner=SigV4Presigner(
+            endpoint_url,
+            settings.minio.access_key,
+            settings.minio.secret_key,
+            settings.minio.region
+        )
+    )
+
+
+def create_link_cache() -> LinkCache:
+    min_validity = settings.app.link_cache_min_validity * 60
+    if settings.app.link_cache_url:
+        return RedisLinkCache(min_validity, url=settings.app.link_cache_url)
+    if settings.server.process_count > 1:
+        # a worker cannot invalidate the memory cache of the others
+        logger.warning("Link cache is off, several workers need link_cache_url to share one")
+        return MemoryLinkCache(min_validity, max_size=0)
+    return MemoryLinkCache(min_validity, max_size=settings.app.link_cache_size)
+
+
+def create_row_cache() -> RowCache | None:
+    if not settings.app.row_cache_size:
+        return None
+    return RowCache(
+        max_size=settings.app.row_cache_size,
+        ttl=settings.app.row_cache_ttl,
+        negative_ttl=settings.app.row_cache_negative_ttl,
+        negative_capacity=settings.app.row_cache_negative_size
+    )
+
+
+def derivatives_enabled() -> bool:
+    if not settings.app.derivative_workers:
+        return False
+    if not derivatives_supported():
+        configured = [
+            name for name in buckets
+            if (policy := buckets.get(name)) is not None and policy.variants
+        ]
+        if configured:
+            # a missing extra must not look like a working deployment
+            logger.error(
+                "Pillow is not installed, install the images extra: variants of %s are never "
+                "rendered and their links fall back to the original files", ", ".join(configured)
+            )
+        else:
+            logger.warning("Pillow is not installed, variant links fall back to the original files")
+        return False
+    return True
+
+
+def get_storage(request: Request) -> S3Storage:
+    return request.app.state.storage
+
+
+def get_link_cache(request: Request) -> LinkCache:
+    return request.app.state.link_cache
+
+
+def get_row_cache(request: Request) -> RowCache | None:
+    return request.app.state.row_cache
+
+
 DBSessionDependency = Annotated[AsyncSession, Depends(db_helper.get_session_dependency)]
-MinioDependecy = Annotated[Minio, Depends(get_minio_client)]
+ReadSessionDependency = Annotated[
+    AsyncSession | None, Depends(db_helper.get_read_session_dependency)
+]
+StorageDependency = Annotated[S3Storage, Depends(get_storage)]
+LinkCacheDependency = Annotated[LinkCache, Depends(get_link_cache)]
+RowCacheDependency = Annotated[RowCache | None, Depends(get_row_cache)]
 
 
-def file_service(session: DBSessionDependency, minio: MinioDependecy) -> FileService:
-    return FileService(FileRepository(session), MinioS3Storage(minio))
+def file_service(
+    session: DBSessionDependency,
+    read_session: ReadSessionDependency,
+    storage: StorageDependency,
+    link_cache: LinkCacheDependency,
+    row_cache: RowCacheDependency
+) -> FileService:
+    return FileService(
+        FileRepository(session, row_cache, read_session),
+        BlobRepository(session),
+        storage,
+        link_cache
+    )
 
 
 FileDependency = Annotated[FileService, Depends(file_service)]
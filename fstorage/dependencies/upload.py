@@ -0,0 +1,14 @@
+from typing import Annotated
+
+from fastapi import Depends
+
+from services.upload import UploadService
+from repositories.upload import UploadRepository, UploadPartRepository
+from .file import DBSessionDependency, FileDependency
+
+
+def upload_service(session: DBSessionDependency, file_service: FileDependency) -> UploadService:
+    return UploadService(UploadRepository(session), UploadPartRepository(session), file_service)
+
+
+UploadDependency = Annotated[UploadService, Depends(upload_service)]
@@ -44,3 +44,48 @@ class FileNotFound(APIException):
 class FailedLinkGeneration(APIException):
     status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
     detail = "Failed link generation"
+
+
+class IncorrectBatchSize(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    detail = "Too many objects in one request"
+
+
+class UploadNotFound(APIException):
+    status_code = status.HTTP_404_NOT_FOUND
+    detail = "Upload not found"
+
+
+class IncorrectPart(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    detail = "Incorrect part number or part size"
+
+
+class UploadNotCompleted(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    detail = "Not all parts are uploaded"
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    detail = "Request body exceeds the maximum upload size"
+
+
+class RangeNotSatisfiable(APIException):
+    status_code = status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    detail = "Requested range not satisfiable"
+
+
+class IncorrectCursor(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    detail = "Incorrect pagination cursor"
+
+
+class IncorrectVariant(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    detail = "Incorrect variant"
+
+
+class InvalidSignature(APIException):
+    status_code = status.HTTP_403_FORBIDDEN
+    detail = "Signature is invalid or expired"
@@ -1,14 +1,94 @@
-import uvicorn
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 
 from api import router as api_router
 from exceptions.exceptions import APIException
-from config import settings
+from config import settings, db_helper, buckets
+from dependencies.file import create_http_client, create_storage_executor, create_storage, \
+                              create_link_cache, create_row_cache, derivatives_enabled
+from metrics import registry
+from metrics.shared import SharedMetrics
+from metrics.middleware import MetricsMiddleware
+from middlewares.upload_limit import UploadLimitMiddleware
+from tasks.uploads import collect_abandoned_uploads
+from tasks.files import drain_deleted_files
+from tasks.reconcile import reconcile_buckets
+from tasks.buckets import reload_bucket_policies
+from tasks.replicas import check_replicas
+from tasks.derivatives import derive_variants
+from tasks.leader import hold_leadership
+from tasks.metrics import share_metrics
+from server import run
 
 settings.logger.configure_logging()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One client per process, so the urllib3 connection pool survives between requests
+    http_client = create_http_client()
+    storage_executor = create_storage_executor()
+    app.state.storage_executor = storage_executor
+    app.state.storage = create_storage(http_client, storage_executor)
+    await app.state.storage.ensure_buckets(buckets)
+    app.state.link_cache = create_link_cache()
+    app.state.row_cache = create_row_cache()
+    app.state.shared_metrics = None
+    metrics_sharer = None
+    if settings.app.metrics_dir:
+        # gauges of a worker that stopped writing are dropped after a few intervals
+        app.state.shared_metrics = SharedMetrics(
+            settings.app.metrics_dir, registry, max_age=3 * settings.app.metrics_write_interval
+        )
+        metrics_sharer = asyncio.create_task(share_metrics(app))
+    # upload collection, reconciliation and variants only run in the worker holding the lock
+    leadership = asyncio.create_task(hold_leadership(app))
+    upload_collector = asyncio.create_task(collect_abandoned_uploads(app))
+    file_drain = asyncio.create_task(drain_deleted_files(app))
+    policy_reloader = asyncio.create_task(reload_bucket_policies(app))
+    reconciler = None
+    if settings.app.reconcile_interval:
+        reconciler = asyncio.create_task(
+            reconcile_buckets(app, settings.app.reconcile_interval)
+        )
+    replica_checker = None
+    if db_helper.replicas:
+        # replicas serve reads only once their lag is known
+        await db_helper.check_replicas(
+            settings.db.replica_max_lag, settings.db.replica_check_timeout
+        )
+        replica_checker = asyncio.create_task(check_replicas(app))
+    # without it variant links keep pointing at the original files
+    deriver = None
+    if derivatives_enabled():
+        deriver = asyncio.create_task(derive_variants(app))
+
+    yield
+
+    upload_collector.cancel()
+    file_drain.cancel()
+    policy_reloader.cancel()
+    if reconciler is not None:
+        reconciler.cancel()
+    if replica_checker is not None:
+        replica_checker.cancel()
+    if deriver is not None:
+        deriver.cancel()
+    leadership.cancel()
+    if metrics_sharer is not None:
+        metrics_sharer.cancel()
+    await app.state.link_cache.close()
+    storage_executor.shutdown()
+    http_client.clear()
+    await db_helper.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(UploadLimitMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 @app.exception_handler(APIException)
@@ -22,4 +102,4 @@ async def custom_exception_handler(request: Request, exc: APIException):
 app.include_router(api_router)
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=3001, reload=True)
+    run()
@@ -0,0 +1,65 @@
+import time
+import functools
+from typing import Any, Callable, Coroutine, ParamSpec, TypeVar
+
+from .metrics import Registry, Counter, Gauge, Histogram
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+registry = Registry()
+
+request_duration = registry.register(Histogram(
+    "fstorage_http_request_duration_seconds",
+    "HTTP request latency by route template and bucket",
+    labelnames=("method", "route", "bucket", "status")
+))
+stage_duration = registry.register(Histogram(
+    "fstorage_stage_duration_seconds",
+    "Latency of service, storage and repository calls",
+    labelnames=("stage",)
+))
+uploaded_bytes = registry.register(Counter(
+    "fstorage_uploaded_bytes_total",
+    "Bytes of uploaded files",
+    labelnames=("bucket",)
+))
+storage_executor_state = registry.register(Gauge(
+    "fstorage_storage_executor",
+    "Storage executor workers and queued calls at scrape time",
+    labelnames=("state",)
+))
+db_pool_state = registry.register(Gauge(
+    "fstorage_db_pool",
+    "Database connection pool usage at scrape time",
+    labelnames=("state",)
+))
+link_cache_state = registry.register(Gauge(
+    "fstorage_link_cache",
+    "Temporary link cache counters at scrape time",
+    labelnames=("state",)
+))
+row_cache_state = registry.register(Gauge(
+    "fstorage_row_cache",
+    "File row cache counters and estimated memory at scrape time",
+    labelnames=("state",)
+))
+
+
+def timed(
+    stage: str
+) -> Callable[[Callable[P, Coroutine[Any, Any, R]]], Callable[P, Coroutine[Any, Any, R]]]:
+    """Record the duration of a coroutine function as a pipeline stage"""
+
+    def decorator(func: Callable[P, Coroutine[Any, Any, R]]) -> Callable[P, Coroutine[Any, Any, R]]:
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                stage_duration.observe(time.perf_counter() - start, stage=stage)
+
+        return wrapper
+
+    return decorator
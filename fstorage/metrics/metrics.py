@@ -0,0 +1,182 @@
+import math
+from bisect import bisect_left
+from typing import Any, Iterable, NamedTuple
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple[str, ...], **extra: str) -> str:
+    pairs = list(zip(labelnames, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class WorkerDump(NamedTuple):
+    """Metric values written by one worker process, see Registry.dump"""
+    pid: str
+    live: bool  # written recently, gauges of exited workers are left out
+    values: dict[str, list[list[Any]]]
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], Any] = {}
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def dump(self) -> list[list[Any]]:
+        """Values per label set as JSON, label tuples become lists"""
+        return [[list(key), value] for key, value in list(self._values.items())]
+
+    def merge(self, dumps: Iterable[WorkerDump]) -> Iterable[str]:
+        """Samples of the values of every worker"""
+        raise NotImplementedError
+
+    def samples(self) -> Iterable[str]:
+        return self._samples(self.labelnames, self._values)
+
+    def _samples(
+        self, labelnames: tuple[str, ...], values: dict[tuple[str, ...], Any]
+    ) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self, samples: Iterable[str] | None = None) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        samples = self.samples() if samples is None else samples
+        return header + "".join(f"{sample}\n" for sample in samples)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def merge(self, dumps: Iterable[WorkerDump]) -> Iterable[str]:
+        # exited workers still count, or the total would go backwards
+        values: dict[tuple[str, ...], float] = {}
+        for dump in dumps:
+            for key, value in dump.values.get(self.name, []):
+                values[tuple(key)] = values.get(tuple(key), 0) + value
+        return self._samples(self.labelnames, values)
+
+    def _samples(
+        self, labelnames: tuple[str, ...], values: dict[tuple[str, ...], float]
+    ) -> Iterable[str]:
+        for key, value in list(values.items()):
+            labels = _format_labels(labelnames, key)
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def merge(self, dumps: Iterable[WorkerDump]) -> Iterable[str]:
+        # a gauge describes one worker, adding them up would mix pools and caches
+        values = {
+            tuple(key) + (dump.pid,): value
+            for dump in dumps if dump.live
+            for key, value in dump.values.get(self.name, [])
+        }
+        return self._samples(self.labelnames + ("pid",), values)
+
+    def _samples(
+        self, labelnames: tuple[str, ...], values: dict[tuple[str, ...], float]
+    ) -> Iterable[str]:
+        for key, value in list(values.items()):
+            labels = _format_labels(labelnames, key)
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    DEFAULT_BUCKETS = (
+        0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+    )
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # _values per label set: non-cumulative bucket counts (+Inf last), then the sum
+        # of observations
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts = self._values.get(key)
+        if counts is None:
+            counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def merge(self, dumps: Iterable[WorkerDump]) -> Iterable[str]:
+        values: dict[tuple[str, ...], list[float]] = {}
+        for dump in dumps:
+            for key, counts in dump.values.get(self.name, []):
+                total = values.get(tuple(key))
+                if total is None:
+                    values[tuple(key)] = list(counts)
+                else:
+                    values[tuple(key)] = [a + b for a, b in zip(total, counts)]
+        return self._samples(self.labelnames, values)
+
+    def _samples(
+        self, labelnames: tuple[str, ...], values: dict[tuple[str, ...], list[float]]
+    ) -> Iterable[str]:
+        for key, counts in list(values.items()):
+            cumulative: float = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(labelnames, key, le=_format_value(float(bound)))
+                yield f"{self.name}_bucket{labels} {_format_value(cumulative)}"
+            labels = _format_labels(labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(counts[-1])}"
+            yield f"{self.name}_count{labels} {_format_value(cumulative)}"
+
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text exposition format"""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self) -> None:
+        self._metrics: list[Metric] = []
+
+    def register[M: Metric](self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def dump(self) -> dict[str, list[list[Any]]]:
+        """Values of this process, for the scrapes served by the other workers"""
+        return {metric.name: metric.dump() for metric in self._metrics}
+
+    def render(self, dumps: list[WorkerDump] | None = None) -> str:
+        """Metrics of this process, or of every worker when their dumps are given"""
+        if dumps is None:
+            return "".join(metric.render() for metric in self._metrics)
+        return "".join(metric.render(metric.merge(dumps)) for metric in self._metrics)
@@ -0,0 +1,55 @@
+import os
+import json
+import time
+import logging
+
+from .metrics import Registry, WorkerDump
+
+logger = logging.getLogger(__name__)
+
+
+class SharedMetrics:
+    """Metrics of every worker process, exchanged through files in a shared directory.
+
+    Each worker rewrites <pid>.json with its own values; a scrape served by any of them
+    adds up the counters and histograms of all files, those of exited workers included so
+    totals never go backwards, and reports the gauges of recently written files by pid.
+    """
+
+    def __init__(
+        self, directory: str, registry: Registry, max_age: float, pid: int | None = None
+    ) -> None:
+        self.directory = directory
+        self.registry = registry
+        self.max_age = max_age
+        self.pid = str(os.getpid() if pid is None else pid)
+
+    def write(self) -> None:
+        path = os.path.join(self.directory, f"{self.pid}.json")
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.registry.dump(), f)
+        # readers see the previous or the new file, never half of one
+        os.replace(temporary, path)
+
+    def read(self) -> list[WorkerDump]:
+        dumps = []
+        now = time.time()
+        for name in os.listdir(self.directory):
+            pid, extension = os.path.splitext(name)
+            if extension != ".json":
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as f:
+                    values = json.load(f)
+                live = now - os.path.getmtime(path) <= self.max_age
+            except (OSError, ValueError) as e:
+                logger.warning("Skipped metrics of worker %s > %r", pid, e)
+                continue
+            dumps.append(WorkerDump(pid, live, values))
+        return dumps
+
+    def render(self) -> str:
+        self.write()
+        return self.registry.render(self.read())
@@ -0,0 +1,17 @@
+from fastapi import FastAPI
+
+from config import db_helper
+from . import storage_executor_state, db_pool_state, link_cache_state, row_cache_state
+
+
+def collect_state(app: FastAPI) -> None:
+    """Set the pool and cache gauges of this worker"""
+    row_cache = app.state.row_cache
+    for gauge, stats in (
+        (storage_executor_state, app.state.storage_executor.stats()),
+        (db_pool_state, db_helper.pool_stats()),
+        (link_cache_state, app.state.link_cache.stats()),
+        (row_cache_state, row_cache.stats() if row_cache is not None else {})
+    ):
+        for state, value in stats.items():
+            gauge.set(value, state=state)
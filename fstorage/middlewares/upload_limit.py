@@ -0,0 +1,104 @@
+import json
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings, buckets
+from exceptions.exceptions import UploadTooLarge
+
+# multipart boundaries, part headers and the user_id field around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class BodyLimitExceeded(Exception):
+    pass
+
+
+class UploadLimitMiddleware:
+    """Reject upload bodies over the bucket limit before they are parsed or spooled.
+
+    Content-Length is checked before reading anything, then the received bytes are
+    counted, so chunked bodies are cut off with 413 as soon as they cross the limit.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    @staticmethod
+    def body_limit(method: str, path: str) -> int | None:
+        parts = path.strip("/").split("/")
+        if len(parts) < 3 or parts[0] != "files":
+            return None
+
+        policy = buckets.get(parts[1])
+        if policy is None:
+            return None
+
+        # POST /files/{bucket}/upload
+        if method == "POST" and parts[2:] == ["upload"]:
+            return policy.max_length + MULTIPART_OVERHEAD
+        # PUT /files/{bucket}/uploads/{upload_id}/parts/{part_number}
+        if method == "PUT" and len(parts) == 6 and parts[2] == "uploads" and parts[4] == "parts":
+            return settings.minio.upload_part_size
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.body_limit(scope["method"], scope["path"])
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() \
+                and int(content_length) > limit:
+            await self.reject(send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise BodyLimitExceeded
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            # the app answers the aborted parse with its own error, send 413 instead
+            if exceeded:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except BodyLimitExceeded:
+            pass
+
+        if exceeded and not response_started:
+            await self.reject(send)
+
+    @staticmethod
+    async def reject(send: Send) -> None:
+        body = json.dumps({"detail": UploadTooLarge.detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": UploadTooLarge.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close")
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
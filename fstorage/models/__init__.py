@@ -1,8 +1,14 @@
 from .base import Base
-from .file import File
+from .file import File, FileStatus
+from .blob import Blob
+from .upload import Upload, UploadPart
 
 
 __all__ = [
     "Base",
-    "File"
+    "File",
+    "FileStatus",
+    "Blob",
+    "Upload",
+    "UploadPart"
 ]
@@ -0,0 +1,25 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import String, Integer, BigInteger, TIMESTAMP, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class Blob(Base):
+    """Stored object shared by every File with the same content in a bucket"""
+
+    __table_args__ = (UniqueConstraint("bucket_name", "sha256"),)
+
+    id: Mapped[str] = mapped_column(
+        String(36), primary_key=True, default=lambda: str(uuid.uuid4())
+    )
+    bucket_name: Mapped[str] = mapped_column(String(40), nullable=False)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    object_name: Mapped[str] = mapped_column(String(40), unique=True, nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), default=func.now(), server_default=func.now()
+    )
@@ -1,12 +1,40 @@
 import uuid
+from datetime import datetime
+from enum import StrEnum
+from typing import Optional
 
-from sqlalchemy import String, DateTime, TIMESTAMP, func
+from sqlalchemy import Integer, String, TIMESTAMP, ForeignKey, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
 
 
+class FileStatus(StrEnum):
+    # pending: the object is being written, committed: visible, deleting: waits for the drain
+    PENDING = "pending"
+    COMMITTED = "committed"
+    DELETING = "deleting"
+
+
 class File(Base):
+    __table_args__ = (
+        # serves the per-user listing, keyset on (upload_at, id) is read straight from the index
+        Index(
+            "ix_files_user_id_bucket_name_upload_at", "user_id", "bucket_name", "upload_at", "id"
+        ),
+        # only the rows the delete drain has to look at
+        Index(
+            "ix_files_status_upload_at", "status", "upload_at",
+            postgresql_where=text("status <> 'committed'")
+        ),
+        # committed files still waiting for their variants
+        Index(
+            "ix_files_bucket_name_upload_at_underived", "bucket_name", "upload_at",
+            postgresql_where=text("variants IS NULL AND status = 'committed'")
+        ),
+    )
+
     id: Mapped[str] = mapped_column(
         String(36), unique=True, primary_key=True, default=lambda: str(uuid.uuid4())
     )
@@ -14,10 +42,36 @@ class File(Base):
     object_id: Mapped[str] = mapped_column(
         String(36), unique=True, nullable=False, index=True
     )
-    object_name: Mapped[str] = mapped_column(
-        String(40), unique=True, nullable=False
-    )
+    # not unique: deduplicated files share the object of their blob
+    object_name: Mapped[str] = mapped_column(String(40), nullable=False)
     bucket_name: Mapped[str] = mapped_column(String(40), nullable=False)
-    upload_at: Mapped[DateTime] = mapped_column(
+    blob_id: Mapped[Optional[str]] = mapped_column(
+        String(36), ForeignKey("blobs.id"), nullable=True
+    )
+    status: Mapped[str] = mapped_column(
+        String(16),
+        nullable=False,
+        default=FileStatus.COMMITTED,
+        server_default=FileStatus.COMMITTED.value
+    )
+    # variant name -> object name, {} once processed without any, null until processed
+    variants: Mapped[Optional[dict[str, str]]] = mapped_column(
+        JSONB(none_as_null=True), nullable=True
+    )
+    # set while a worker renders the variants, an older claim is taken over
+    variants_claimed_at: Mapped[Optional[datetime]] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+    # claims so far, a file whose original keeps failing to read is given up on
+    variants_attempts: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    upload_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True), default=func.now(), server_default=func.now()
     )
+
+
+# the reconciler walks a bucket in S3 key order, which is byte order
+Index(
+    "ix_files_bucket_name_object_name", File.bucket_name, File.object_name.collate("C")
+)
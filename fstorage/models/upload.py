@@ -0,0 +1,45 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, Integer, BigInteger, TIMESTAMP, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class Upload(Base):
+    """Resumable upload session backed by an S3 multipart upload"""
+
+    id: Mapped[str] = mapped_column(
+        String(36), primary_key=True, default=lambda: str(uuid.uuid4())
+    )
+    user_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    bucket_name: Mapped[str] = mapped_column(String(40), nullable=False)
+    object_name: Mapped[str] = mapped_column(String(40), unique=True, nullable=False)
+    multipart_upload_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    file_size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    part_size: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), default=func.now(), server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        default=func.now(),
+        server_default=func.now(),
+        onupdate=func.now(),
+        index=True
+    )
+    # set with the insert of the file row, the row then answers retried completions
+    completed_at: Mapped[Optional[datetime]] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+
+
+class UploadPart(Base):
+    upload_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("uploads.id", ondelete="CASCADE"), primary_key=True
+    )
+    part_number: Mapped[int] = mapped_column(Integer, primary_key=True)
+    etag: Mapped[str] = mapped_column(String(64), nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
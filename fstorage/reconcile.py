@@ -0,0 +1,51 @@
+"""
+Compare the buckets with the files table and report or repair the differences.
+
+    python reconcile.py [--bucket avatar] [--repair] [--grace 24]
+"""
+
+import json
+import asyncio
+import argparse
+from datetime import timedelta
+from dataclasses import asdict
+
+from config import settings, db_helper, buckets
+from dependencies.file import create_http_client, create_storage_executor, create_storage
+from tasks.reconcile import reconcile
+
+
+async def main(args: argparse.Namespace) -> None:
+    http_client = create_http_client()
+    storage_executor = create_storage_executor()
+    try:
+        reports = await reconcile(
+            create_storage(http_client, storage_executor),
+            args.bucket or list(buckets),
+            repair=args.repair,
+            grace=timedelta(hours=args.grace)
+        )
+        print(json.dumps([asdict(report) for report in reports], indent=2))
+    finally:
+        storage_executor.shutdown()
+        http_client.clear()
+        await db_helper.dispose()
+
+
+if __name__ == "__main__":
+    settings.logger.configure_logging()
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--bucket", action="append", choices=list(buckets),
+        help="bucket to reconcile, repeatable, all configured buckets by default"
+    )
+    parser.add_argument(
+        "--repair", action="store_true",
+        help="delete orphan objects and hand rows without an object to the delete drain"
+    )
+    parser.add_argument(
+        "--grace", type=int, default=settings.app.reconcile_grace,
+        help="hours, younger objects and rows are skipped as possibly in flight"
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,56 @@
+import logging
+
+from sqlalchemy import update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .repository import SQLAlchemyRepository
+from models.blob import Blob
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+class BlobRepository(SQLAlchemyRepository[Blob]):
+    def __init__(self, session: AsyncSession) -> None:
+        super().__init__(session=session, model=Blob)
+
+    @timed("repository.acquire_blob")
+    async def acquire(self, bucket_name: str, sha256: str) -> Blob | None:
+        """Take a reference to a live blob with this content, if there is one"""
+        try:
+            query = update(Blob).where(
+                Blob.bucket_name == bucket_name,
+                Blob.sha256 == sha256,
+                Blob.ref_count > 0
+            ).values(ref_count=Blob.ref_count + 1).returning(Blob)
+            blob = (await self.session.execute(query)).scalar_one_or_none()
+            await self.session.commit()
+            return blob
+        except Exception as e:
+            await self.session.rollback()
+            logger.error("BlobRepository failed acquire > %s", e)
+            return None
+
+    @timed("repository.release_blob")
+    async def release(self, blob_id: str) -> Blob | None:
+        """Drop a reference, returns the blob when it was the last one and the row is gone"""
+        try:
+            decrement = update(Blob).where(Blob.id == blob_id).values(
+                ref_count=Blob.ref_count - 1
+            ).returning(Blob.ref_count)
+            ref_count = (await self.session.execute(decrement)).scalar_one_or_none()
+
+            blob: Blob | None = None
+            if ref_count is not None and ref_count <= 0:
+                # a blob without references can no longer be acquired, so this never races
+                removal = delete(Blob).where(
+                    Blob.id == blob_id, Blob.ref_count <= 0
+                ).returning(Blob)
+                blob = (await self.session.execute(removal)).scalar_one_or_none()
+
+            await self.session.commit()
+            return blob
+        except Exception as e:
+            await self.session.rollback()
+            logger.error("BlobRepository failed release > %s", e)
+            return None
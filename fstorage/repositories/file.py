@@ -1,9 +1,234 @@
+import logging
+from typing import Any, AsyncIterator, Optional, Sequence
+from datetime import datetime, timezone
+
+from sqlalchemy import Row, select, update, inspect, or_, and_, func
+from sqlalchemy.orm import make_transient_to_detached
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .repository import SQLAlchemyRepository
-from models.file import File
+from models.file import File, FileStatus
+from models.blob import Blob
+from models.upload import Upload
+from cache.row_cache import RowCache
+from metrics import timed
+
+logger = logging.getLogger(__name__)
 
 
 class FileRepository(SQLAlchemyRepository[File]):
-    def __init__(self, session: AsyncSession) -> None:
-        super().__init__(session=session, model=File)
+    def __init__(
+        self,
+        session: AsyncSession,
+        row_cache: Optional[RowCache] = None,
+        read_session: Optional[AsyncSession] = None
+    ) -> None:
+        super().__init__(session=session, model=File, read_session=read_session)
+        # lookups by object_id go through the cache, every write below invalidates it
+        self.row_cache = row_cache
+
+    @staticmethod
+    def _snapshot(file_obj: File) -> dict[str, Any]:
+        return {attr.key: getattr(file_obj, attr.key) for attr in inspect(File).column_attrs}
+
+    @staticmethod
+    def _restore(row: dict[str, Any]) -> File:
+        # detached with its identity, so the session treats it as the existing row
+        file_obj = File(**row)
+        make_transient_to_detached(file_obj)
+        return file_obj
+
+    async def fetch_one(self, **filters) -> File | None:
+        object_id = filters.get("object_id")
+        if self.row_cache is None or object_id is None:
+            return await super().fetch_one(**filters)
+
+        # the row is cached whatever its status, the other filters are applied to it here
+        found, row = self.row_cache.lookup(object_id)
+        if found:
+            file_obj = self._restore(row) if row is not None else None
+        else:
+            file_obj = await super().fetch_one(object_id=object_id)
+            if file_obj is None:
+                self.row_cache.put_missing(object_id)
+            else:
+                self.row_cache.put(object_id, self._snapshot(file_obj))
+
+        if file_obj is None or any(
+            getattr(file_obj, field) != value for field, value in filters.items()
+        ):
+            return None
+        return file_obj
+
+    async def add_one(self, obj: File) -> str | None:
+        object_id = obj.object_id
+        file_id = await super().add_one(obj)
+        if self.row_cache is not None:
+            self.row_cache.invalidate(object_id)
+        return file_id
+
+    async def delete_one(self, obj: File) -> bool:
+        return await self.delete_many([obj])
+
+    async def delete_many(self, objs: Sequence[File]) -> bool:
+        # read before the call, a rollback expires the attributes
+        object_ids = [obj.object_id for obj in objs]
+        deleted = await super().delete_many(objs)
+        if self.row_cache is not None:
+            for object_id in object_ids:
+                if deleted:
+                    self.row_cache.put_missing(object_id)
+                else:
+                    self.row_cache.invalidate(object_id)
+        return deleted
+
+    @timed("repository.commit_file")
+    async def commit_file(self, file_obj: File, blob: Blob | None = None) -> bool:
+        """Flip a pending file to committed, a new blob is inserted in the same transaction"""
+        object_id = file_obj.object_id
+        try:
+            if blob is not None:
+                if inspect(blob).transient:
+                    self.session.add(blob)
+                    await self.session.flush()
+                file_obj.blob_id = blob.id
+                file_obj.object_name = blob.object_name
+            file_obj.status = FileStatus.COMMITTED
+            await self.session.commit()
+            return True
+        except Exception as e:
+            await self.session.rollback()
+            logger.error("FileRepository failed commit_file > %s", e)
+            return False
+        finally:
+            if self.row_cache is not None:
+                self.row_cache.invalidate(object_id)
+
+    @timed("repository.add_completed")
+    async def add_completed(self, obj: File, upload: Upload) -> bool:
+        """Insert the file of a resumable upload and mark the upload completed, one transaction"""
+        object_id = obj.object_id
+        try:
+            self.session.add(obj)
+            upload.completed_at = datetime.now(timezone.utc)
+            await self.session.commit()
+            return True
+        except Exception as e:
+            await self.session.rollback()
+            logger.error("FileRepository failed add_completed > %s", e)
+            return False
+        finally:
+            if self.row_cache is not None:
+                self.row_cache.invalidate(object_id)
+
+    @timed("repository.update_status")
+    async def update_status(self, file_ids: Sequence[str], status: FileStatus) -> bool:
+        if not file_ids:
+            return True
+        try:
+            query = update(File).where(File.id.in_(file_ids)).values(status=status)
+            await self.session.execute(query)
+            await self.session.commit()
+            return True
+        except Exception as e:
+            await self.session.rollback()
+            logger.error("FileRepository failed update_status > %s", e)
+            return False
+        finally:
+            if self.row_cache is not None:
+                self.row_cache.invalidate_ids(file_ids)
+
+    @timed("repository.fetch_removable")
+    async def fetch_removable(self, pending_before: datetime, limit: int) -> list[File]:
+        """Files marked for deletion and pending uploads that never got committed.
+
+        The rows stay locked until the transaction ends. Locked rows are skipped, so
+        the drains of all workers take different batches.
+        """
+        try:
+            query = select(File).where(or_(
+                File.status == FileStatus.DELETING,
+                and_(File.status == FileStatus.PENDING, File.upload_at < pending_before)
+            )).order_by(File.upload_at).limit(limit).with_for_update(skip_locked=True)
+            objs = await self.session.execute(query)
+            return list(objs.scalars().all())
+        except Exception as e:
+            await self.session.rollback()
+            logger.error("FileRepository failed fetch_removable > %s", e)
+            return []
+
+    @timed("repository.claim_underived")
+    async def claim_underived(
+        self, bucket_name: str, limit: int, claimed_before: datetime
+    ) -> list[File]:
+        """Committed files still without variants, claimed for the caller and committed.
+
+        No row lock outlives this call: the claim is the variants_claimed_at stamp, so
+        rendering happens outside any transaction. Rows locked by another claim are
+        skipped, claims older than claimed_before are taken over. Newest first, so files
+        whose original keeps failing to read never hold back fresh uploads. Each claim
+        counts an attempt; the returned rows carry the attempts made before it.
+        """
+        try:
+            query = select(File).where(
+                File.bucket_name == bucket_name,
+                File.status == FileStatus.COMMITTED,
+                File.variants.is_(None),
+                or_(
+                    File.variants_claimed_at.is_(None),
+                    File.variants_claimed_at < claimed_before
+                )
+            ).order_by(File.upload_at.desc()).limit(limit).with_for_update(skip_locked=True)
+            objs = list((await self.session.execute(query)).scalars().all())
+            if objs:
+                await self.session.execute(
+                    update(File).where(
+                        File.id.in_([file_obj.id for file_obj in objs])
+                    ).values(
+                        variants_claimed_at=func.now(),
+                        variants_attempts=File.variants_attempts + 1
+                    ).execution_options(synchronize_session=False)
+                )
+            await self.session.commit()
+            return objs
+        except Exception as e:
+            await self.session.rollback()
+            logger.error("FileRepository failed claim_underived > %s", e)
+            return []
+
+    @timed("repository.set_variants")
+    async def set_variants(self, variants: dict[str, dict[str, str]]) -> bool:
+        """Record the variants of each file id, an empty dict marks a file without any"""
+        if not variants:
+            await self.session.commit()
+            return True
+        try:
+            for file_id, file_variants in variants.items():
+                query = update(File).where(File.id == file_id).values(variants=file_variants)
+                await self.session.execute(query)
+            await self.session.commit()
+            return True
+        except Exception as e:
+            await self.session.rollback()
+            logger.error("FileRepository failed set_variants > %s", e)
+            return False
+        finally:
+            if self.row_cache is not None:
+                self.row_cache.invalidate_ids(variants)
+
+    async def stream_by_object_name(
+        self, bucket_name: str, batch_size: int = 1000
+    ) -> AsyncIterator[Row]:
+        """(id, object_name, status, upload_at) of the bucket in object key byte order"""
+        # a server-side cursor, rows arrive batch_size at a time and skip the identity map
+        query = select(
+            File.id, File.object_name, File.status, File.upload_at
+        ).where(
+            File.bucket_name == bucket_name
+        ).order_by(
+            File.object_name.collate("C")
+        ).execution_options(yield_per=batch_size)
+
+        result = await self.session.stream(query)
+        async for row in result:
+            yield row
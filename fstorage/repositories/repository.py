@@ -1,10 +1,13 @@
 import logging
+from typing import Any, Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import Executable, Result, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from abc import ABC, abstractmethod
 
+from metrics import timed
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,16 +20,49 @@ class Repository[T](ABC):
     async def fetch_one(self, **filters) -> T | None:
         raise NotImplementedError
 
+    @abstractmethod
+    async def fetch_in(self, field: str, values: Sequence, **filters) -> list[T]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def fetch_many(
+        self,
+        order_by: Sequence[str],
+        limit: int,
+        after: Sequence[Any] | None = None,
+        **filters
+    ) -> list[T]:
+        """Newest first page of rows ordered by order_by, starting after the given key"""
+        raise NotImplementedError
+
     @abstractmethod
     async def delete_one(self, obj: T) -> bool:
         raise NotImplementedError
 
+    @abstractmethod
+    async def delete_many(self, objs: Sequence[T]) -> bool:
+        raise NotImplementedError
+
 
 class SQLAlchemyRepository[T](Repository):
-    def __init__(self, session: AsyncSession, model: type[T]) -> None:
+    def __init__(
+        self, session: AsyncSession, model: type[T], read_session: Optional[AsyncSession] = None
+    ) -> None:
         self.session = session
         self.model = model
+        # fetches go to a replica when one is given, rows read there are not in self.session
+        self.read_session = read_session or session
 
+    async def _read(self, query: Executable) -> Result:
+        if self.read_session is not self.session:
+            try:
+                return await self.read_session.execute(query)
+            except Exception as e:
+                await self.read_session.rollback()
+                logger.warning("Replica read failed, reading from the primary > %s", e)
+        return await self.session.execute(query)
+
+    @timed("repository.add_one")
     async def add_one(self, obj: T) -> str | None:
         try:
             self.session.add(obj)
@@ -37,16 +73,59 @@ class SQLAlchemyRepository[T](Repository):
             logger.error("SQLAlchemyRepository failed add_one > %s", e)
             return None
 
+    @timed("repository.fetch_one")
     async def fetch_one(self, **filters) -> T | None:
         try:
             query = select(self.model).filter_by(**filters).limit(1)
-            obj = await self.session.execute(query)
+            obj = (await self._read(query)).scalar_one_or_none()
+            # read-your-writes: a row just written may not have reached the replica yet
+            if obj is None and self.read_session is not self.session:
+                obj = (await self.session.execute(query)).scalar_one_or_none()
         except Exception as e:
             await self.session.rollback()
             logger.error("SQLAlchemyRepository failed fetch_one > %s", e)
+            raise
+
+        return obj
+
+    @timed("repository.fetch_in")
+    async def fetch_in(self, field: str, values: Sequence, **filters) -> list[T]:
+        if not values:
+            return []
+        try:
+            query = select(self.model).where(
+                getattr(self.model, field).in_(values)
+            ).filter_by(**filters)
+            objs = await self._read(query)
+            return list(objs.scalars().all())
+        except Exception as e:
+            await self.session.rollback()
+            logger.error("SQLAlchemyRepository failed fetch_in > %s", e)
+            return []
 
-        return obj.scalar_one_or_none()
+    @timed("repository.fetch_many")
+    async def fetch_many(
+        self,
+        order_by: Sequence[str],
+        limit: int,
+        after: Sequence[Any] | None = None,
+        **filters
+    ) -> list[T]:
+        try:
+            columns = [getattr(self.model, field) for field in order_by]
+            query = select(self.model).filter_by(**filters)
+            # keyset pagination: seek past the last row instead of counting an OFFSET
+            if after is not None:
+                query = query.where(tuple_(*columns) < tuple_(*after))
+            query = query.order_by(*(column.desc() for column in columns)).limit(limit)
+            objs = await self._read(query)
+            return list(objs.scalars().all())
+        except Exception as e:
+            await self.session.rollback()
+            logger.error("SQLAlchemyRepository failed fetch_many > %s", e)
+            return []
 
+    @timed("repository.delete_one")
     async def delete_one(self, obj: T) -> bool:
         try:
             await self.session.delete(obj)
@@ -56,3 +135,15 @@ class SQLAlchemyRepository[T](Repository):
             await self.session.rollback()
             logger.error("SQLAlchemyRepository failed delete_one > %s", e)
             return False
+
+    @timed("repository.delete_many")
+    async def delete_many(self, objs: Sequence[T]) -> bool:
+        try:
+            for obj in objs:
+                await self.session.delete(obj)
+            await self.session.commit()
+            return True
+        except Exception as e:
+            await self.session.rollback()
+            logger.error("SQLAlchemyRepository failed delete_many > %s", e)
+            return False
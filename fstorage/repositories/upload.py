@@ -0,0 +1,37 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .repository import SQLAlchemyRepository
+from models.upload import Upload, UploadPart
+
+logger = logging.getLogger(__name__)
+
+
+class UploadRepository(SQLAlchemyRepository[Upload]):
+    def __init__(self, session: AsyncSession) -> None:
+        super().__init__(session=session, model=Upload)
+
+    async def fetch_expired(self, updated_before: datetime, limit: int) -> list[Upload]:
+        """Uploads without new parts since updated_before, completed ones included.
+
+        The rows stay locked until the transaction ends. Locked rows are skipped, so
+        collectors running at the same time take different batches.
+        """
+        try:
+            query = select(Upload).where(
+                Upload.updated_at < updated_before
+            ).order_by(Upload.updated_at).limit(limit).with_for_update(skip_locked=True)
+            objs = await self.session.execute(query)
+            return list(objs.scalars().all())
+        except Exception as e:
+            await self.session.rollback()
+            logger.error("UploadRepository failed fetch_expired > %s", e)
+            return []
+
+
+class UploadPartRepository(SQLAlchemyRepository[UploadPart]):
+    def __init__(self, session: AsyncSession) -> None:
+        super().__init__(session=session, model=UploadPart)
@@ -1,4 +1,5 @@
 from typing import Optional
+from datetime import datetime
 
 from pydantic import BaseModel
 
@@ -8,9 +9,62 @@ class ResponseUploadSchema(BaseModel):
     object_id: str
 
 
+class ResponseUploadFormSchema(BaseModel):
+    url: str
+    fields: dict[str, str]
+    object_name: str
+    expires_at: datetime
+
+
 class ResponseDeleteSchema(BaseModel):
     status: bool
 
 
 class ResponseLinkSchema(BaseModel):
     link: str
+
+
+class ResponseBatchLinkItemSchema(BaseModel):
+    object_id: str
+    link: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class ResponseBatchLinkSchema(BaseModel):
+    items: list[ResponseBatchLinkItemSchema]
+
+
+class ResponseBatchDeleteItemSchema(BaseModel):
+    object_id: str
+    status: bool
+    detail: Optional[str] = None
+
+
+class ResponseBatchDeleteSchema(BaseModel):
+    items: list[ResponseBatchDeleteItemSchema]
+
+
+class FileItemSchema(BaseModel):
+    object_id: str
+    object_name: str
+    upload_at: datetime
+
+
+class ResponseFileListSchema(BaseModel):
+    items: list[FileItemSchema]
+    next_cursor: Optional[str] = None
+
+
+class UploadPartSchema(BaseModel):
+    part_number: int
+    offset: int
+    size: int
+
+
+class ResponseUploadSessionSchema(BaseModel):
+    upload_id: str
+    file_size: int
+    part_size: int
+    part_count: int
+    received_parts: list[UploadPartSchema]
+    missing_parts: list[int]
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+
+class HealthSchema(BaseModel):
+    status: str
+
+
+class ReadinessSchema(BaseModel):
+    status: str
+    database: bool
+    storage: bool
@@ -0,0 +1,48 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class StorageExecutorStatsSchema(BaseModel):
+    max_workers: int
+    max_queue_size: int
+    running: int
+    queue_depth: int
+    waiting: int
+
+
+class LinkCacheStatsSchema(BaseModel):
+    hits: int
+    misses: int
+    size: Optional[int] = None
+    max_size: Optional[int] = None
+
+
+class RowCacheStatsSchema(BaseModel):
+    enabled: bool
+    hits: int = 0
+    negative_hits: int = 0  # lookups answered as missing without the database
+    misses: int = 0
+    hit_rate: float = 0.0
+    size: int = 0
+    max_size: int = 0
+    memory_bytes: int = 0  # estimated
+
+
+class ReplicaStatsSchema(BaseModel):
+    name: str
+    healthy: bool
+    lag: Optional[float] = None  # seconds behind the primary, unknown when unreachable
+    checked_out: int
+
+
+class DatabasePoolStatsSchema(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    checkouts: int
+    timeouts: int
+    wait_time_avg: float  # seconds
+    wait_time_max: float  # seconds
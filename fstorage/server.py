@@ -0,0 +1,59 @@
+"""
+Production launcher: python server.py
+
+Runs settings.server.workers processes (the number of CPUs by default), or a
+single process with the code reloader when SERVER_DEV is set. The database pool
+sizes are split between the processes, and upload collection, reconciliation and
+image variants run only in the one holding the leader lock. The processes share
+their metrics through settings.app.metrics_dir, a temporary directory unless set,
+so a scrape of any of them covers all.
+"""
+
+import os
+import glob
+import tempfile
+
+import uvicorn
+
+from config import settings
+
+
+def prepare_metrics_dir() -> None:
+    """Give the workers an empty directory to share metrics through"""
+    metrics_dir = settings.app.metrics_dir
+    if metrics_dir is None:
+        metrics_dir = tempfile.mkdtemp(prefix="fstorage-metrics-")
+    else:
+        os.makedirs(metrics_dir, exist_ok=True)
+        # counters of a previous run would be added to the new ones
+        for path in glob.glob(os.path.join(metrics_dir, "*.json")):
+            os.remove(path)
+    # the workers read their settings again from the environment
+    os.environ["METRICS_DIR"] = metrics_dir
+
+
+def run() -> None:
+    server = settings.server
+    if server.process_count > 1:
+        prepare_metrics_dir()
+    uvicorn.run(
+        "main:app",
+        host=server.host,
+        port=server.port,
+        reload=server.dev,
+        workers=server.process_count,
+        loop=server.loop,
+        http=server.http,
+        backlog=server.backlog,
+        timeout_keep_alive=server.keep_alive_timeout,
+        # uvicorn stops accepting connections and lets running requests, uploads
+        # included, finish before the lifespan shutdown closes the pools
+        timeout_graceful_shutdown=server.graceful_shutdown_timeout,
+        limit_concurrency=server.limit_concurrency,
+        log_config=None
+    )
+
+
+if __name__ == "__main__":
+    settings.logger.configure_logging()
+    run()
@@ -0,0 +1,145 @@
+import io
+import asyncio
+import logging
+from concurrent.futures import Executor
+from datetime import datetime, timedelta, timezone
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional dependency, only needed for image variants
+    Image = None  # type: ignore[assignment]
+
+from config.buckets import BucketPolicy, VariantSpec
+from repositories.file import FileRepository
+from storage.storage import S3Storage
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"webp": ".webp", "jpeg": ".jpg", "png": ".png"}
+MAX_PIXELS = 40_000_000  # larger images are refused before being decoded
+
+
+class UnreadableImage(Exception):
+    pass
+
+
+def variant_object_name(object_name: str, variant: str, spec: VariantSpec) -> str:
+    # the original name as prefix keeps variants right after it in key order
+    return f"{object_name}.{variant}{EXTENSIONS[spec.format]}"
+
+
+def render_variants(data: bytes, specs: dict[str, VariantSpec]) -> dict[str, bytes]:
+    """Encode every variant of the image, runs in a worker process"""
+    try:
+        with Image.open(io.BytesIO(data)) as opened:
+            if opened.width * opened.height > MAX_PIXELS:
+                raise UnreadableImage(f"{opened.width}x{opened.height} pixels")
+            image = ImageOps.exif_transpose(opened)
+            image.load()
+    except UnreadableImage:
+        raise
+    except Exception as e:
+        # anything the decoder refuses is bad input, never worth a retry
+        raise UnreadableImage(repr(e))
+
+    rendered = {}
+    for variant, spec in specs.items():
+        size = (spec.width, spec.height)
+        if spec.crop:
+            resized = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+        else:
+            resized = image.copy()
+            resized.thumbnail(size, Image.Resampling.LANCZOS)
+        if spec.format == "jpeg" and resized.mode not in ("RGB", "L"):
+            resized = resized.convert("RGB")
+        buffer = io.BytesIO()
+        resized.save(buffer, format=spec.format.upper(), quality=spec.quality)
+        rendered[variant] = buffer.getvalue()
+    return rendered
+
+
+def derivatives_supported() -> bool:
+    return Image is not None
+
+
+class DerivativeService:
+    def __init__(
+        self, file_repository: FileRepository, storage_client: S3Storage, executor: Executor
+    ) -> None:
+        self.file_repository = file_repository
+        self.storage_client = storage_client
+        self.executor = executor
+
+    async def _read(self, bucket_name: str, object_name: str, max_size: int) -> bytes | None:
+        stream = await self.storage_client.get_file_stream(bucket_name, object_name)
+        if stream is None:
+            return None
+        chunks = []
+        size = 0
+        async for chunk in stream:
+            size += len(chunk)
+            if size > max_size:
+                raise UnreadableImage(f"larger than {max_size} bytes")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def _derive(self, policy: BucketPolicy, object_name: str) -> dict[str, str] | None:
+        """Variant name -> object name, None when the original could not be read"""
+        data = await self._read(policy.name, object_name, policy.max_length)
+        if data is None:
+            return None
+
+        loop = asyncio.get_running_loop()
+        try:
+            rendered = await loop.run_in_executor(
+                self.executor, render_variants, data, policy.variants
+            )
+        except UnreadableImage as e:
+            logger.warning("No variants for %s/%s, not an image > %s", policy.name, object_name, e)
+            return {}
+
+        variants = {}
+        for variant, content in rendered.items():
+            name = variant_object_name(object_name, variant, policy.variants[variant])
+            if not await self.storage_client.upload_file(
+                io.BytesIO(content), policy.name, name, len(content)
+            ):
+                return None
+            variants[variant] = name
+        return variants
+
+    @timed("service.derive_variants")
+    async def derive_variants(
+        self, policy: BucketPolicy, limit: int, claim_timeout: timedelta, max_attempts: int
+    ) -> int:
+        """Generate the variants of files that have none yet, returns the number of files claimed"""
+        file_objs = await self.file_repository.claim_underived(
+            policy.name, limit, datetime.now(timezone.utc) - claim_timeout
+        )
+
+        # deduplicated files share one object, its variants are rendered once
+        derived: dict[str, dict[str, str] | None] = {}
+        for file_obj in file_objs:
+            if file_obj.object_name not in derived:
+                try:
+                    derived[file_obj.object_name] = await self._derive(policy, file_obj.object_name)
+                except Exception as e:
+                    logger.error("Failed deriving %s/%s > %s", policy.name, file_obj.object_name, e)
+                    derived[file_obj.object_name] = None
+
+        # files whose original could not be read keep their claim, retried once it expires,
+        # until the last attempt marks them processed without variants
+        done: dict[str, dict[str, str]] = {}
+        for file_obj in file_objs:
+            variants = derived[file_obj.object_name]
+            if variants is None and file_obj.variants_attempts + 1 >= max_attempts:
+                logger.warning(
+                    "No variants for %s/%s, gave up after %d attempts",
+                    policy.name, file_obj.object_name, max_attempts
+                )
+                variants = {}
+            if variants is not None:
+                done[file_obj.id] = variants
+        await self.file_repository.set_variants(done)
+        return len(file_objs)
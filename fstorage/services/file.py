@@ -1,97 +1,463 @@
-import io
+import json
+import time
+import base64
+import asyncio
+import hashlib
 import logging
-from datetime import timedelta
+import mimetypes
+from collections import defaultdict
+from typing import AsyncIterator, BinaryIO
+from datetime import datetime, timedelta, timezone
 
-from config import settings
+from config import buckets, object_ids as signed_ids
 from repositories.file import FileRepository
-from models.file import File
-from storage.storage import S3Storage
-from schemas.file import ResponseUploadSchema
+from models.file import File, FileStatus
+from models.blob import Blob
+from models.upload import Upload
+from repositories.blob import BlobRepository
+from storage.storage import S3Storage, StoredObject
+from cache.link_cache import LinkCache
+from metrics import timed, uploaded_bytes
+from schemas.file import ResponseUploadSchema, ResponseUploadFormSchema, \
+                            ResponseBatchLinkItemSchema, ResponseBatchDeleteItemSchema, \
+                            FileItemSchema, ResponseFileListSchema
 from exceptions.exceptions import FileNotUploaded, FileNotFound, FileNotDeleted, \
-                                    FailedLinkGeneration
+                                    FailedLinkGeneration, IncorrectFileSize, IncorrectCursor, \
+                                    IncorrectVariant
 
 logger = logging.getLogger(__name__)
 
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file: str | BinaryIO) -> str:
+    """SHA-256 of the content, read chunk by chunk so memory stays bounded"""
+    if isinstance(file, str):
+        with open(file, "rb") as f:
+            return hash_file(f)
+
+    digest = hashlib.sha256()
+    while chunk := file.read(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def encode_cursor(file_obj: File) -> str:
+    key = [file_obj.upload_at.isoformat(), file_obj.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        upload_at, file_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(upload_at), str(file_id)
+    except (ValueError, TypeError):
+        raise IncorrectCursor
+
 
 class FileService:
-    def __init__(self, file_repository: FileRepository, storage_client: S3Storage) -> None:
+    def __init__(
+        self,
+        file_repository: FileRepository,
+        blob_repository: BlobRepository,
+        storage_client: S3Storage,
+        link_cache: LinkCache
+    ) -> None:
         self.storage_client = storage_client
         self.file_repository = file_repository
+        self.blob_repository = blob_repository
+        self.link_cache = link_cache
 
+    @timed("service.upload_file")
     async def upload_file(
         self,
-        file: str | io.BytesIO,
+        file: str | BinaryIO,
         user_id: str,
         bucket_name: str,
         object_name: str,
         file_size: int
     ) -> ResponseUploadSchema:
-        status = self.storage_client.upload_file(file, bucket_name, object_name, file_size)
+        policy = buckets.get(bucket_name)
+        if policy and policy.deduplicate:
+            return await self._upload_deduplicated(
+                file, user_id, bucket_name, object_name, file_size
+            )
+
+        # the row goes in first, so a crash after the PUT leaves a pending row for the drain
+        file_obj = await self._reserve(user_id, bucket_name, object_name)
+        file_id = file_obj.id
+
+        if not await self.storage_client.upload_file(file, bucket_name, object_name, file_size):
+            await self.file_repository.update_status([file_id], FileStatus.DELETING)
+            raise FileNotUploaded
 
-        if status:
-            permanent_link = None
-            object_id = object_name.split(".")[0]
+        uploaded_bytes.inc(file_size, bucket=bucket_name)
+        if not await self.file_repository.commit_file(file_obj):
+            raise FileNotUploaded
+        return self._uploaded(user_id, bucket_name, object_name, file_obj.object_id)
 
-            file_metadata = File(
-                user_id=user_id,
-                object_id=object_id,
-                object_name=object_name,
-                bucket_name=bucket_name
+    async def _upload_deduplicated(
+        self,
+        file: str | BinaryIO,
+        user_id: str,
+        bucket_name: str,
+        object_name: str,
+        file_size: int
+    ) -> ResponseUploadSchema:
+        sha256 = await asyncio.to_thread(hash_file, file)
+        uploaded_bytes.inc(file_size, bucket=bucket_name)
+        object_id = object_name.split(".")[0]
+
+        # the same content is already stored, so the PUT is skipped
+        blob = await self.blob_repository.acquire(bucket_name, sha256)
+        if blob is not None:
+            return await self.save_metadata(
+                user_id, bucket_name, blob.object_name, object_id=object_id, blob=blob
             )
 
-            if not await self.file_repository.add_one(file_metadata):
-                self.storage_client.delete_file(bucket_name, object_name)
-                logger.error(
-                    "Failed writing metadata to db: \
-                    user_id > %s | object_id > %s | obejct_name > %s",
-                    user_id, object_id, object_name
-                )
+        file_obj = await self._reserve(user_id, bucket_name, object_name)
+        file_id = file_obj.id
+
+        if not await self.storage_client.upload_file(file, bucket_name, object_name, file_size):
+            await self.file_repository.update_status([file_id], FileStatus.DELETING)
+            raise FileNotUploaded
+
+        blob = Blob(
+            bucket_name=bucket_name,
+            sha256=sha256,
+            object_name=object_name,
+            size=file_size,
+            ref_count=1
+        )
+        if not await self.file_repository.commit_file(file_obj, blob):
+            # the same content was stored concurrently, keep that copy
+            blob = await self.blob_repository.acquire(bucket_name, sha256)
+            if blob is None:
                 raise FileNotUploaded
+            if not await self.file_repository.commit_file(file_obj, blob):
+                await self._release_object(bucket_name, blob.object_name, blob.id)
+                raise FileNotUploaded
+            await self.storage_client.delete_file(bucket_name, object_name)
 
-            bucket_settings = settings.app.file_upload_validation_settings.get(bucket_name)
-            if bucket_settings and bucket_settings.get("is_public", False):
-                permanent_link = f"{settings.minio.minio_url}/{bucket_name}/{object_name}"
+        return self._uploaded(user_id, bucket_name, blob.object_name, object_id)
 
-            logger.info(
-                "user -> %s | loaded file to bucket -> %s | object_id -> %s",
-                user_id, bucket_name, object_id
+    async def _reserve(self, user_id: str, bucket_name: str, object_name: str) -> File:
+        file_obj = File(
+            user_id=user_id,
+            object_id=object_name.split(".")[0],
+            object_name=object_name,
+            bucket_name=bucket_name,
+            status=FileStatus.PENDING
+        )
+        if not await self.file_repository.add_one(file_obj):
+            logger.error(
+                "Failed writing metadata to db: user_id > %s | obejct_name > %s",
+                user_id, object_name
             )
+            raise FileNotUploaded
+        return file_obj
 
-            return ResponseUploadSchema(
-                permanent_link=permanent_link,
-                object_id=object_id
-            )
+    @timed("service.get_upload_form")
+    async def get_upload_form(
+        self,
+        user_id: str,
+        bucket_name: str,
+        object_name: str,
+        max_size: int,
+        ttl: timedelta
+    ) -> ResponseUploadFormSchema:
+        expires_at = datetime.now(timezone.utc) + ttl
+        content_type, _ = mimetypes.guess_type(object_name)
+        fields = await self.storage_client.get_upload_form(
+            bucket_name=bucket_name,
+            object_name=object_name,
+            ttl=ttl,
+            max_size=max_size,
+            content_type=content_type,
+            metadata={"user-id": user_id}
+        )
+
+        if fields is None:
+            raise FailedLinkGeneration
+
+        return ResponseUploadFormSchema(
+            url=self.storage_client.upload_url(bucket_name),
+            fields=fields,
+            object_name=object_name,
+            expires_at=expires_at
+        )
+
+    @timed("service.complete_upload")
+    async def complete_upload(
+        self, user_id: str, bucket_name: str, object_name: str, max_size: int
+    ) -> ResponseUploadSchema:
+        object_id = object_name.split(".")[0]
+
+        # a completion sent twice, or retried after a lost response, gets the first one's result
+        file_obj = await self.file_repository.fetch_one(object_id=object_id)
+        if file_obj is not None:
+            return self._completed(file_obj, user_id, bucket_name, object_name)
+
+        stored_object = await self.storage_client.stat_file(bucket_name, object_name)
+
+        # The upload form binds the uploader, so nobody can claim someone else's object
+        if stored_object is None or stored_object.metadata.get("user-id") != user_id:
+            raise FileNotUploaded
+
+        if stored_object.size > max_size:
+            await self.storage_client.delete_file(bucket_name, object_name)
+            raise IncorrectFileSize
+
+        try:
+            response = await self.save_metadata(user_id, bucket_name, object_name)
+        except FileNotUploaded:
+            # lost the insert to a concurrent completion of the same upload
+            file_obj = await self.file_repository.fetch_one(object_id=object_id)
+            if file_obj is None:
+                raise
+            return self._completed(file_obj, user_id, bucket_name, object_name)
+
+        uploaded_bytes.inc(stored_object.size, bucket=bucket_name)
+        return response
+
+    async def fetch_completed(
+        self, user_id: str, bucket_name: str, object_name: str
+    ) -> ResponseUploadSchema:
+        """Response of an upload completed before, FileNotUploaded when it has no row"""
+        file_obj = await self.file_repository.fetch_one(object_id=object_name.split(".")[0])
+        if file_obj is None:
+            raise FileNotUploaded
+        return self._completed(file_obj, user_id, bucket_name, object_name)
+
+    def _completed(
+        self, file_obj: File, user_id: str, bucket_name: str, object_name: str
+    ) -> ResponseUploadSchema:
+        if (
+            file_obj.user_id != user_id
+            or file_obj.bucket_name != bucket_name
+            or file_obj.object_name != object_name
+            or file_obj.status != FileStatus.COMMITTED
+        ):
+            raise FileNotUploaded
+        return self._uploaded(user_id, bucket_name, object_name, file_obj.object_id)
+
+    async def save_metadata(
+        self,
+        user_id: str,
+        bucket_name: str,
+        object_name: str,
+        object_id: str | None = None,
+        blob: Blob | None = None,
+        upload: Upload | None = None
+    ) -> ResponseUploadSchema:
+        """Insert the committed file row, a resumable upload is marked completed with it"""
+        object_id = object_id or object_name.split(".")[0]
+
+        file_metadata = File(
+            user_id=user_id,
+            object_id=object_id,
+            object_name=object_name,
+            bucket_name=bucket_name,
+            blob_id=blob.id if blob else None,
+            status=FileStatus.COMMITTED
+        )
+
+        if upload is not None:
+            saved = await self.file_repository.add_completed(file_metadata, upload)
         else:
+            saved = await self.file_repository.add_one(file_metadata) is not None
+        if not saved:
+            # a shared blob gives its reference back; an own object is kept, the insert may
+            # have lost to a row that already points to it, or the client retries after a
+            # brief database error; reconcile removes it if nothing ever registers it
+            if blob is not None:
+                await self._release_object(bucket_name, object_name, blob.id)
+            logger.error(
+                "Failed writing metadata to db: \
+                user_id > %s | object_id > %s | obejct_name > %s",
+                user_id, object_id, object_name
+            )
             raise FileNotUploaded
 
-    async def get_file_link(self, bucket_name: str, object_id: str, ttl: timedelta):
-        file_obj = await self.file_repository.fetch_one(object_id=object_id)
+        return self._uploaded(user_id, bucket_name, object_name, object_id)
+
+    def _uploaded(
+        self, user_id: str, bucket_name: str, object_name: str, object_id: str
+    ) -> ResponseUploadSchema:
+        permanent_link = None
+        policy = buckets.get(bucket_name)
+        if policy and policy.is_public:
+            permanent_link = policy.permalink(object_name)
+
+        logger.info(
+            "user -> %s | loaded file to bucket -> %s | object_id -> %s",
+            user_id, bucket_name, object_id
+        )
+
+        return ResponseUploadSchema(
+            permanent_link=permanent_link,
+            object_id=object_id
+        )
+
+    @timed("service.get_file_link")
+    async def get_file_link(
+        self, bucket_name: str, object_id: str, ttl: timedelta, variant: str | None = None
+    ):
+        cache_key = object_id
+        if variant is not None:
+            policy = buckets.get(bucket_name)
+            if policy is None or variant not in policy.variants:
+                raise IncorrectVariant
+            cache_key = f"{object_id}.{variant}"
+
+        link = await self.link_cache.get(bucket_name, cache_key)
+        if link is not None:
+            return link
+
+        expires_at = time.time() + ttl.total_seconds()
+        # signed ids too, a deleted or pending file gets no link; the row cache answers
+        # repeated lookups without the database
+        file_obj = await self._fetch_committed(object_id)
 
         if file_obj is None:
             raise FileNotFound
+        object_name = file_obj.object_name
+        cacheable = True
+        if variant is not None:
+            # until the variant is rendered the original is served, and not cached
+            variants = file_obj.variants or {}
+            object_name = variants.get(variant, object_name)
+            cacheable = variant in variants
 
-        link = self.storage_client.get_file_link(
+        link = await self.storage_client.get_file_link(
             bucket_name=bucket_name,
-            object_name=file_obj.object_name,
+            object_name=object_name,
             ttl=ttl
         )
 
         if link is None:
             raise FailedLinkGeneration
 
+        if cacheable:
+            await self.link_cache.set(bucket_name, cache_key, link, expires_at)
         return link
 
+    @timed("service.get_file_links")
+    async def get_file_links(
+        self, bucket_name: str, object_ids: list[str], ttl: timedelta
+    ) -> list[ResponseBatchLinkItemSchema]:
+        links: dict[str, str] = {}
+        for object_id in object_ids:
+            link = await self.link_cache.get(bucket_name, object_id)
+            if link is not None:
+                links[object_id] = link
+
+        expires_at = time.time() + ttl.total_seconds()
+        # one query for the whole batch, signed ids included, so only committed files get links
+        missing = [
+            object_id for object_id in object_ids
+            if object_id not in links and signed_ids.is_well_formed(object_id)
+        ]
+        found: dict[str, str] = {}
+        if missing:
+            file_objs = await self.file_repository.fetch_in(
+                "object_id", missing, bucket_name=bucket_name, status=FileStatus.COMMITTED
+            )
+            found.update((file_obj.object_id, file_obj.object_name) for file_obj in file_objs)
+
+        signed = await self.storage_client.get_file_links(bucket_name, list(found.values()), ttl)
+        for object_id, object_name in found.items():
+            if object_name in signed:
+                links[object_id] = signed[object_name]
+                await self.link_cache.set(bucket_name, object_id, signed[object_name], expires_at)
+
+        items = []
+        for object_id in object_ids:
+            if object_id in links:
+                items.append(ResponseBatchLinkItemSchema(
+                    object_id=object_id, link=links[object_id]
+                ))
+            elif object_id in found:
+                items.append(ResponseBatchLinkItemSchema(
+                    object_id=object_id, detail=FailedLinkGeneration.detail
+                ))
+            else:
+                items.append(ResponseBatchLinkItemSchema(
+                    object_id=object_id, detail=FileNotFound.detail
+                ))
+        return items
+
+    @timed("service.list_files")
+    async def list_files(
+        self, user_id: str, bucket_name: str, limit: int, cursor: str | None = None
+    ) -> ResponseFileListSchema:
+        after = decode_cursor(cursor) if cursor else None
+
+        # one extra row tells whether another page exists
+        file_objs = await self.file_repository.fetch_many(
+            order_by=("upload_at", "id"),
+            limit=limit + 1,
+            after=after,
+            user_id=user_id,
+            bucket_name=bucket_name,
+            status=FileStatus.COMMITTED
+        )
+        page = file_objs[:limit]
+
+        return ResponseFileListSchema(
+            items=[
+                FileItemSchema(
+                    object_id=file_obj.object_id,
+                    object_name=file_obj.object_name,
+                    upload_at=file_obj.upload_at
+                )
+                for file_obj in page
+            ],
+            next_cursor=encode_cursor(page[-1]) if len(file_objs) > limit else None
+        )
+
+    @timed("service.stat_file")
+    async def stat_file(self, bucket_name: str, object_id: str) -> tuple[str, StoredObject]:
+        file_obj = await self._fetch_committed(object_id)
+
+        if file_obj is None or file_obj.bucket_name != bucket_name:
+            raise FileNotFound
+
+        stored_object = await self.storage_client.stat_file(bucket_name, file_obj.object_name)
+        if stored_object is None:
+            raise FileNotFound
+
+        return file_obj.object_name, stored_object
+
+    async def _fetch_committed(self, object_id: str) -> File | None:
+        # an id that was never issued has no row, probing for it stays off the database
+        if not signed_ids.is_well_formed(object_id):
+            return None
+        return await self.file_repository.fetch_one(
+            object_id=object_id, status=FileStatus.COMMITTED
+        )
+
+    async def get_file_stream(
+        self, bucket_name: str, object_name: str, offset: int, length: int
+    ) -> AsyncIterator[bytes]:
+        stream = await self.storage_client.get_file_stream(
+            bucket_name, object_name, offset=offset, length=length
+        )
+        if stream is None:
+            raise FileNotFound
+        return stream
+
+    @timed("service.delete_file")
     async def delete_file(self, user_id: str, bucket_name: str, object_id: str) -> bool:
-        file_obj = await self.file_repository.fetch_one(object_id=object_id)
+        file_obj = await self._fetch_committed(object_id)
 
         if file_obj is None:
             raise FileNotFound
 
-        if await self.file_repository.delete_one(file_obj):
-            delete_status = self.storage_client.delete_file(bucket_name, file_obj.object_name)
-            if not delete_status:
-                logger.error("File Delete from db, but not delete from minio > %s", )
-                raise FileNotDeleted
+        # the object itself is removed later by the delete drain
+        if await self.file_repository.update_status([file_obj.id], FileStatus.DELETING):
+            await self._invalidate_links(bucket_name, object_id)
             logger.info(
                 "user -> %s | delete file from bucket -> %s | object_id -> %s",
                 user_id, bucket_name, object_id
@@ -104,3 +470,117 @@ class FileService:
                 user_id, object_id, file_obj.object_name
             )
             return False
+
+    async def _invalidate_links(self, bucket_name: str, object_id: str) -> None:
+        await self.link_cache.invalidate(bucket_name, object_id)
+        policy = buckets.get(bucket_name)
+        for variant in policy.variants if policy else ():
+            await self.link_cache.invalidate(bucket_name, f"{object_id}.{variant}")
+
+    @timed("service.delete_files")
+    async def delete_files(
+        self, user_id: str, bucket_name: str, object_ids: list[str]
+    ) -> list[ResponseBatchDeleteItemSchema]:
+        file_objs = await self.file_repository.fetch_in(
+            "object_id",
+            [object_id for object_id in object_ids if signed_ids.is_well_formed(object_id)],
+            bucket_name=bucket_name,
+            status=FileStatus.COMMITTED
+        )
+        found = {file_obj.object_id for file_obj in file_objs}
+
+        deleted = await self.file_repository.update_status(
+            [file_obj.id for file_obj in file_objs], FileStatus.DELETING
+        )
+        if not deleted:
+            logger.error(
+                "Failed delete metadata from db: user_id > %s | object_ids > %s",
+                user_id, list(found)
+            )
+        elif found:
+            for object_id in found:
+                await self._invalidate_links(bucket_name, object_id)
+            logger.info(
+                "user -> %s | delete %s files from bucket -> %s",
+                user_id, len(found), bucket_name
+            )
+
+        items = []
+        for object_id in object_ids:
+            if object_id not in found:
+                items.append(ResponseBatchDeleteItemSchema(
+                    object_id=object_id, status=False, detail=FileNotFound.detail
+                ))
+            elif not deleted:
+                items.append(ResponseBatchDeleteItemSchema(
+                    object_id=object_id, status=False, detail=FileNotDeleted.detail
+                ))
+            else:
+                items.append(ResponseBatchDeleteItemSchema(object_id=object_id, status=True))
+        return items
+
+    @timed("service.drain_deleted_files")
+    async def drain_deleted_files(self, pending_before: datetime, limit: int) -> int:
+        """Remove the objects of deleted and abandoned files, returns the number of rows removed"""
+        # the batch stays locked until its rows are deleted, other workers drain other rows
+        file_objs = await self.file_repository.fetch_removable(pending_before, limit)
+
+        owned: dict[str, list[File]] = defaultdict(list)
+        # variants of a shared object are rendered from it, they go together with it
+        shared: dict[str, set[str]] = defaultdict(set)
+        removed: list[File] = []
+        for file_obj in file_objs:
+            if file_obj.blob_id is None:
+                owned[file_obj.bucket_name].append(file_obj)
+            else:
+                shared[file_obj.blob_id].update((file_obj.variants or {}).values())
+                removed.append(file_obj)
+
+        # an own object goes first, its row stays until the removal succeeds
+        for bucket_name, bucket_files in owned.items():
+            failed = await self.storage_client.delete_files(bucket_name, list({
+                object_name
+                for file_obj in bucket_files
+                for object_name in self._object_names(file_obj)
+            }))
+            if failed:
+                logger.error("Failed removing objects from minio > %s", failed)
+            removed.extend(
+                file_obj for file_obj in bucket_files
+                if failed.isdisjoint(self._object_names(file_obj))
+            )
+
+        # one commit for the whole batch, it also releases the locks
+        if not await self.file_repository.delete_many(removed):
+            logger.error("Rows kept in db, their own objects are removed > %s", len(removed))
+            return 0
+
+        # a shared row goes first: a crash before the release leaks the object, never deletes
+        # one still referenced
+        blob_ids = [
+            file_obj.blob_id for file_obj in file_objs if file_obj.blob_id is not None
+        ]
+        released: dict[str, list[str]] = defaultdict(list)
+        for blob_id in blob_ids:
+            blob = await self.blob_repository.release(blob_id)
+            if blob is not None:
+                released[blob.bucket_name].append(blob.object_name)
+                released[blob.bucket_name].extend(shared.pop(blob_id, ()))
+        for bucket_name, object_names in released.items():
+            failed = await self.storage_client.delete_files(bucket_name, object_names)
+            if failed:
+                logger.error("Failed removing objects from minio > %s", failed)
+
+        return len(removed)
+
+    @staticmethod
+    def _object_names(file_obj: File) -> list[str]:
+        return [file_obj.object_name, *(file_obj.variants or {}).values()]
+
+    async def _release_object(
+        self, bucket_name: str, object_name: str, blob_id: str | None
+    ) -> bool:
+        """Delete the object, unless it is a blob still referenced by other files"""
+        if blob_id is not None and await self.blob_repository.release(blob_id) is None:
+            return True
+        return await self.storage_client.delete_file(bucket_name, object_name)
@@ -0,0 +1,121 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from models.file import FileStatus
+from repositories.file import FileRepository
+from storage.storage import S3Storage
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_SIZE = 20
+
+
+@dataclass
+class ReconcileReport:
+    bucket_name: str
+    repair: bool
+    scanned_objects: int = 0
+    scanned_rows: int = 0
+    orphan_objects: int = 0
+    missing_objects: int = 0
+    repaired: int = 0
+    # the first few names of each kind, the totals are only counted
+    orphan_sample: list[str] = field(default_factory=list)
+    missing_sample: list[str] = field(default_factory=list)
+
+
+class ReconcileService:
+    """Merge-joins a bucket listing with the files rows, both streamed in key order"""
+
+    def __init__(
+        self,
+        file_repository: FileRepository,
+        repair_repository: FileRepository,
+        storage_client: S3Storage
+    ) -> None:
+        # the stream keeps a server-side cursor open, so repairs are written through
+        # a repository on another session
+        self.file_repository = file_repository
+        self.repair_repository = repair_repository
+        self.storage_client = storage_client
+
+    @timed("service.reconcile_bucket")
+    async def reconcile_bucket(
+        self,
+        bucket_name: str,
+        grace: timedelta,
+        repair: bool = False,
+        batch_size: int = 1000
+    ) -> ReconcileReport:
+        # anything younger than the grace period may be an upload still in flight
+        cutoff = datetime.now(timezone.utc) - grace
+        report = ReconcileReport(bucket_name=bucket_name, repair=repair)
+        orphans: list[str] = []
+        missing: list[str] = []
+
+        objects = self.storage_client.iter_objects(bucket_name, batch_size)
+        rows = self.file_repository.stream_by_object_name(bucket_name, batch_size)
+        obj = await anext(objects, None)
+        row = await anext(rows, None)
+        # variants are named after their original, so they are listed right after it
+        matched = None
+
+        while obj is not None or row is not None:
+            if row is None or (obj is not None and obj[0] < row.object_name):
+                assert obj is not None
+                object_name, stored_object = obj
+                report.scanned_objects += 1
+                if matched is not None and object_name.startswith(matched + "."):
+                    pass
+                elif stored_object.last_modified is None or stored_object.last_modified < cutoff:
+                    report.orphan_objects += 1
+                    self._sample(report.orphan_sample, object_name)
+                    orphans.append(object_name)
+                obj = await anext(objects, None)
+
+            elif obj is None or row.object_name < obj[0]:
+                report.scanned_rows += 1
+                # pending and deleting rows are expected to have no object
+                if row.status == FileStatus.COMMITTED and row.upload_at < cutoff:
+                    report.missing_objects += 1
+                    self._sample(report.missing_sample, row.object_name)
+                    missing.append(row.id)
+                row = await anext(rows, None)
+
+            else:
+                # deduplicated files share one object, so several rows can match it
+                object_name = matched = obj[0]
+                report.scanned_objects += 1
+                while row is not None and row.object_name == object_name:
+                    report.scanned_rows += 1
+                    row = await anext(rows, None)
+                obj = await anext(objects, None)
+
+            if len(orphans) >= batch_size or len(missing) >= batch_size:
+                await self._flush(report, orphans, missing)
+
+        await self._flush(report, orphans, missing)
+        logger.info(
+            "reconciled bucket -> %s | objects -> %s | rows -> %s | orphans -> %s | missing -> %s",
+            bucket_name, report.scanned_objects, report.scanned_rows,
+            report.orphan_objects, report.missing_objects
+        )
+        return report
+
+    async def _flush(self, report: ReconcileReport, orphans: list[str], missing: list[str]) -> None:
+        if report.repair and orphans:
+            failed = await self.storage_client.delete_files(report.bucket_name, orphans)
+            report.repaired += len(orphans) - len(failed)
+        # rows of lost objects go through the delete drain like any other delete
+        if report.repair and missing:
+            if await self.repair_repository.update_status(missing, FileStatus.DELETING):
+                report.repaired += len(missing)
+        orphans.clear()
+        missing.clear()
+
+    @staticmethod
+    def _sample(sample: list[str], object_name: str) -> None:
+        if len(sample) < SAMPLE_SIZE:
+            sample.append(object_name)
@@ -0,0 +1,203 @@
+import math
+import logging
+from datetime import datetime, timezone
+
+from models.upload import Upload, UploadPart
+from repositories.upload import UploadRepository, UploadPartRepository
+from services.file import FileService
+from schemas.file import ResponseUploadSchema, ResponseUploadSessionSchema, UploadPartSchema
+from metrics import timed, uploaded_bytes
+from exceptions.exceptions import FileNotUploaded, UploadNotFound, IncorrectPart, \
+                                    UploadNotCompleted
+
+logger = logging.getLogger(__name__)
+
+
+class UploadService:
+    """Resumable uploads: parts are tracked in the db, the File row is written on completion"""
+
+    def __init__(
+        self,
+        upload_repository: UploadRepository,
+        part_repository: UploadPartRepository,
+        file_service: FileService
+    ) -> None:
+        self.upload_repository = upload_repository
+        self.part_repository = part_repository
+        self.file_service = file_service
+        self.storage_client = file_service.storage_client
+
+    @staticmethod
+    def part_count(upload: Upload) -> int:
+        return max(math.ceil(upload.file_size / upload.part_size), 1)
+
+    def expected_part_size(self, upload: Upload, part_number: int) -> int:
+        if part_number < self.part_count(upload):
+            return upload.part_size
+        return upload.file_size - (part_number - 1) * upload.part_size
+
+    def _session(self, upload: Upload, parts: list[UploadPart]) -> ResponseUploadSessionSchema:
+        received = {part.part_number: part for part in parts}
+        part_count = self.part_count(upload)
+        return ResponseUploadSessionSchema(
+            upload_id=upload.id,
+            file_size=upload.file_size,
+            part_size=upload.part_size,
+            part_count=part_count,
+            received_parts=[
+                UploadPartSchema(
+                    part_number=part_number,
+                    offset=(part_number - 1) * upload.part_size,
+                    size=received[part_number].size
+                )
+                for part_number in sorted(received)
+            ],
+            missing_parts=[
+                part_number for part_number in range(1, part_count + 1)
+                if part_number not in received
+            ]
+        )
+
+    async def _fetch_upload(self, user_id: str, bucket_name: str, upload_id: str) -> Upload:
+        upload = await self.upload_repository.fetch_one(id=upload_id, bucket_name=bucket_name)
+        # someone else's upload is reported the same as a missing one
+        if upload is None or upload.user_id != user_id:
+            raise UploadNotFound
+        return upload
+
+    @timed("service.create_upload")
+    async def create_upload(
+        self, user_id: str, bucket_name: str, object_name: str, file_size: int, part_size: int
+    ) -> ResponseUploadSessionSchema:
+        multipart_upload_id = await self.storage_client.create_multipart_upload(
+            bucket_name, object_name
+        )
+        if multipart_upload_id is None:
+            raise FileNotUploaded
+
+        upload = Upload(
+            user_id=user_id,
+            bucket_name=bucket_name,
+            object_name=object_name,
+            multipart_upload_id=multipart_upload_id,
+            file_size=file_size,
+            part_size=part_size
+        )
+        if not await self.upload_repository.add_one(upload):
+            await self.storage_client.abort_multipart_upload(
+                bucket_name, object_name, multipart_upload_id
+            )
+            raise FileNotUploaded
+
+        logger.info(
+            "user -> %s | started upload to bucket -> %s | upload_id -> %s",
+            user_id, bucket_name, upload.id
+        )
+        return self._session(upload, [])
+
+    @timed("service.get_upload")
+    async def get_upload(
+        self, user_id: str, bucket_name: str, upload_id: str
+    ) -> ResponseUploadSessionSchema:
+        upload = await self._fetch_upload(user_id, bucket_name, upload_id)
+        parts = await self.part_repository.fetch_in("upload_id", [upload.id])
+        return self._session(upload, parts)
+
+    @timed("service.upload_part")
+    async def upload_part(
+        self, user_id: str, bucket_name: str, upload_id: str, part_number: int, data: bytes
+    ) -> UploadPartSchema:
+        upload = await self._fetch_upload(user_id, bucket_name, upload_id)
+        if upload.completed_at is not None:
+            raise IncorrectPart
+
+        if not 1 <= part_number <= self.part_count(upload) \
+                or len(data) != self.expected_part_size(upload, part_number):
+            raise IncorrectPart
+
+        etag = await self.storage_client.upload_part(
+            bucket_name, upload.object_name, upload.multipart_upload_id, part_number, data
+        )
+        if etag is None:
+            raise FileNotUploaded
+
+        # a re-sent part replaces the previous one, like in S3
+        part = await self.part_repository.fetch_one(upload_id=upload.id, part_number=part_number)
+        if part is None:
+            part = UploadPart(upload_id=upload.id, part_number=part_number)
+        part.etag = etag
+        part.size = len(data)
+        upload.updated_at = datetime.now(timezone.utc)
+
+        if await self.part_repository.add_one(part) is None:
+            raise FileNotUploaded
+
+        return UploadPartSchema(
+            part_number=part_number,
+            offset=(part_number - 1) * upload.part_size,
+            size=part.size
+        )
+
+    @timed("service.complete_upload")
+    async def complete_upload(
+        self, user_id: str, bucket_name: str, upload_id: str
+    ) -> ResponseUploadSchema:
+        upload = await self._fetch_upload(user_id, bucket_name, upload_id)
+        if upload.completed_at is not None:
+            # a retry after a lost response, the row stays until the collector drops it
+            return await self.file_service.fetch_completed(user_id, bucket_name, upload.object_name)
+
+        parts = sorted(
+            await self.part_repository.fetch_in("upload_id", [upload.id]),
+            key=lambda part: part.part_number
+        )
+        if [part.part_number for part in parts] != list(range(1, self.part_count(upload) + 1)):
+            raise UploadNotCompleted
+
+        if not await self.storage_client.complete_multipart_upload(
+            bucket_name,
+            upload.object_name,
+            upload.multipart_upload_id,
+            [(part.part_number, part.etag) for part in parts]
+        ):
+            # S3 forgets the upload once completed, an earlier try may have got that far
+            # and failed writing the row; the object is then already in place
+            if await self.storage_client.stat_file(bucket_name, upload.object_name) is None:
+                raise FileNotUploaded
+
+        try:
+            response = await self.file_service.save_metadata(
+                user_id, bucket_name, upload.object_name, upload=upload
+            )
+        except FileNotUploaded:
+            # lost the insert to a concurrent completion of the same upload
+            return await self.file_service.fetch_completed(user_id, bucket_name, upload.object_name)
+
+        uploaded_bytes.inc(upload.file_size, bucket=bucket_name)
+        return response
+
+    @timed("service.collect_abandoned_uploads")
+    async def collect_abandoned_uploads(self, updated_before: datetime, limit: int) -> int:
+        uploads = await self.upload_repository.fetch_expired(updated_before, limit)
+
+        # a row stays until its abort succeeds, it is the only handle to retry the abort with;
+        # a completed upload has nothing left to abort, only its row answering retries
+        aborted = []
+        for upload in uploads:
+            if upload.completed_at is not None or await self.storage_client.abort_multipart_upload(
+                upload.bucket_name, upload.object_name, upload.multipart_upload_id
+            ):
+                aborted.append(upload)
+        if len(aborted) < len(uploads):
+            logger.error(
+                "Failed aborting %s abandoned uploads, retried next round",
+                len(uploads) - len(aborted)
+            )
+
+        if aborted and not await self.upload_repository.delete_many(aborted):
+            logger.error("Failed delete abandoned uploads from db")
+            return 0
+
+        if aborted:
+            logger.info("Collected %s abandoned uploads", len(aborted))
+        return len(aborted)
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import threading
+from functools import partial
+from typing import Callable, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class StorageExecutor:
+    """Bounded thread pool for the blocking storage client calls.
+
+    At most max_workers calls run at once and at most max_queue_size more wait
+    in the pool queue. Callers beyond that wait asynchronously, without blocking
+    the event loop.
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int) -> None:
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="storage"
+        )
+        self._slots = asyncio.Semaphore(max_workers + max_queue_size)
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._running = 0
+        self._waiting = 0
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._submitted += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, partial(self._call, func, *args, **kwargs)
+            )
+        finally:
+            self._submitted -= 1
+            self._slots.release()
+
+    def _call(self, func: Callable[..., T], *args, **kwargs) -> T:
+        with self._lock:
+            self._running += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls submitted to the pool that are not yet picked up by a worker"""
+        with self._lock:
+            return max(self._submitted - self._running, 0)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            running = self._running
+        return {
+            "max_workers": self.max_workers,
+            "max_queue_size": self.max_queue_size,
+            "running": running,
+            "queue_depth": max(self._submitted - running, 0),
+            "waiting": self._waiting
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+        logger.info("Storage executor stopped")
@@ -0,0 +1,324 @@
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import logging
+import mimetypes
+import tempfile
+from datetime import datetime, timezone
+from typing import AsyncIterator, BinaryIO, Iterable, Optional, Sequence
+
+from .storage import StoredObject
+from .signed import SignedStorage
+from .executor import StorageExecutor
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+META_DIR = ".meta"
+TMP_DIR = ".tmp"
+UPLOADS_DIR = ".uploads"
+
+
+class LocalStorage(SignedStorage):
+    """Objects as plain files under root/<bucket>, for single node deployments.
+
+    Every write goes to a temporary file in the same bucket directory and is
+    renamed into place, so readers never see a partial object. Content type and
+    user metadata live next to the objects in .meta, written before the rename.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        executor: StorageExecutor,
+        base_url: str,
+        signing_key: str,
+        chunk_size: int = 1024 * 1024
+    ) -> None:
+        super().__init__(base_url, signing_key)
+        self.root = os.path.abspath(root)
+        self.executor = executor
+        self.chunk_size = chunk_size
+
+    def _bucket_dir(self, bucket_name: str) -> str:
+        return os.path.join(self.root, bucket_name)
+
+    def _path(self, bucket_name: str, object_name: str, kind: str = "") -> str:
+        # names are generated by the service, anything that could leave the bucket is refused
+        if not object_name or "/" in object_name or object_name.startswith("."):
+            raise ValueError(f"Incorrect object name {object_name!r}")
+        if kind:
+            return os.path.join(self.root, bucket_name, kind, object_name + ".json")
+        return os.path.join(self.root, bucket_name, object_name)
+
+    def _upload_dir(self, upload_id: str) -> str:
+        return os.path.join(self.root, UPLOADS_DIR, uuid.UUID(upload_id).hex)
+
+    async def ensure_buckets(self, bucket_names: Iterable[str]) -> None:
+        for bucket_name in bucket_names:
+            for directory in (META_DIR, TMP_DIR):
+                os.makedirs(os.path.join(self._bucket_dir(bucket_name), directory), exist_ok=True)
+        os.makedirs(os.path.join(self.root, UPLOADS_DIR), exist_ok=True)
+
+    async def ping(self) -> bool:
+        return os.access(self.root, os.W_OK)
+
+    def _write_sync(
+        self,
+        bucket_name: str,
+        object_name: str,
+        sources: Sequence[str | BinaryIO],
+        content_type: Optional[str],
+        metadata: dict[str, str],
+        etag: Optional[str] = None
+    ) -> None:
+        path = self._path(bucket_name, object_name)
+        tmp_dir = os.path.join(self._bucket_dir(bucket_name), TMP_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        digest = hashlib.md5()
+        with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+            try:
+                for source in sources:
+                    if isinstance(source, str):
+                        with open(source, "rb") as f:
+                            while chunk := f.read(self.chunk_size):
+                                tmp.write(chunk)
+                                digest.update(chunk)
+                        continue
+                    while chunk := source.read(self.chunk_size):
+                        tmp.write(chunk)
+                        digest.update(chunk)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
+
+        meta = {
+            "etag": etag or digest.hexdigest(),
+            "content_type": content_type,
+            "metadata": metadata
+        }
+        self._replace_json(self._path(bucket_name, object_name, META_DIR), meta, tmp_dir)
+        os.replace(tmp.name, path)
+
+    @staticmethod
+    def _replace_json(path: str, content: dict, tmp_dir: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=tmp_dir, delete=False) as tmp:
+            json.dump(content, tmp)
+        os.replace(tmp.name, path)
+
+    async def _write(
+        self,
+        bucket_name: str,
+        object_name: str,
+        source: BinaryIO,
+        content_type: Optional[str],
+        metadata: dict[str, str]
+    ) -> bool:
+        try:
+            await self.executor.run(
+                self._write_sync, bucket_name, object_name, [source], content_type, metadata
+            )
+            return True
+        except Exception as e:
+            logger.error("Unsuccessful writing file to disk: %s", e)
+            return False
+
+    @timed("storage.upload_file")
+    async def upload_file(
+        self, file: str | BinaryIO, bucket_name: str, object_name: str, file_size: int
+    ) -> bool:
+        try:
+            content_type, _ = mimetypes.guess_type(object_name)
+            await self.executor.run(
+                self._write_sync, bucket_name, object_name, [file], content_type, {}
+            )
+            return True
+        except Exception as e:
+            logger.error("Unsuccessful writing file to disk: %s", e)
+            return False
+
+    @timed("storage.create_multipart_upload")
+    async def create_multipart_upload(self, bucket_name: str, object_name: str) -> str | None:
+        try:
+            upload_id = str(uuid.uuid4())
+            await self.executor.run(os.makedirs, self._upload_dir(upload_id))
+            return upload_id
+        except Exception as e:
+            logger.error("Unsuccessful multipart upload creation on disk: %s", e)
+            return None
+
+    def _write_part_sync(self, upload_id: str, part_number: int, data: bytes) -> str:
+        path = os.path.join(self._upload_dir(upload_id), str(part_number))
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        return hashlib.md5(data).hexdigest()
+
+    @timed("storage.upload_part")
+    async def upload_part(
+        self, bucket_name: str, object_name: str, upload_id: str, part_number: int, data: bytes
+    ) -> str | None:
+        try:
+            return await self.executor.run(self._write_part_sync, upload_id, part_number, data)
+        except Exception as e:
+            logger.error("Unsuccessful part upload to disk: %s", e)
+            return None
+
+    @timed("storage.complete_multipart_upload")
+    async def complete_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str, parts: Sequence[tuple[int, str]]
+    ) -> bool:
+        try:
+            upload_dir = self._upload_dir(upload_id)
+            # the same etag S3 gives a multipart object: md5 of the part md5s and the part count
+            digest = hashlib.md5(b"".join(bytes.fromhex(etag) for _, etag in parts))
+            await self.executor.run(
+                self._write_sync,
+                bucket_name,
+                object_name,
+                [os.path.join(upload_dir, str(part_number)) for part_number, _ in parts],
+                mimetypes.guess_type(object_name)[0],
+                {},
+                f"{digest.hexdigest()}-{len(parts)}"
+            )
+            await self.executor.run(shutil.rmtree, upload_dir, True)
+            return True
+        except Exception as e:
+            logger.error("Unsuccessful multipart upload completion on disk: %s", e)
+            return False
+
+    @timed("storage.abort_multipart_upload")
+    async def abort_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str
+    ) -> bool:
+        try:
+            await self.executor.run(shutil.rmtree, self._upload_dir(upload_id), True)
+            return True
+        except Exception as e:
+            logger.error("Unsuccessful multipart upload abort on disk: %s", e)
+            return False
+
+    def _stat_sync(self, bucket_name: str, object_name: str) -> StoredObject | None:
+        try:
+            stat = os.stat(self._path(bucket_name, object_name))
+        except FileNotFoundError:
+            return None
+        try:
+            with open(self._path(bucket_name, object_name, META_DIR)) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            meta = {}
+        return StoredObject(
+            size=stat.st_size,
+            etag=meta.get("etag", ""),
+            content_type=meta.get("content_type"),
+            last_modified=datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+            metadata=meta.get("metadata", {})
+        )
+
+    @timed("storage.stat_file")
+    async def stat_file(self, bucket_name: str, object_name: str) -> StoredObject | None:
+        try:
+            return await self.executor.run(self._stat_sync, bucket_name, object_name)
+        except Exception as e:
+            logger.error("Unsuccessful file stat on disk: %s", e)
+            return None
+
+    def local_path(self, bucket_name: str, object_name: str) -> str | None:
+        try:
+            path = self._path(bucket_name, object_name)
+        except ValueError:
+            return None
+        return path if os.path.isfile(path) else None
+
+    @timed("storage.get_file_stream")
+    async def get_file_stream(
+        self, bucket_name: str, object_name: str, offset: int = 0, length: int = 0
+    ) -> AsyncIterator[bytes] | None:
+        try:
+            fd = await self.executor.run(os.open, self._path(bucket_name, object_name), os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error("Unsuccessful getting file from disk: %s", e)
+            return None
+        return self._iter_file(fd, offset, length)
+
+    async def _iter_file(self, fd: int, offset: int, length: int) -> AsyncIterator[bytes]:
+        try:
+            remaining = length or os.fstat(fd).st_size - offset
+            while remaining > 0:
+                chunk = await self.executor.run(
+                    os.pread, fd, min(self.chunk_size, remaining), offset
+                )
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            os.close(fd)
+
+    def _list_sync(self, bucket_name: str) -> list[str]:
+        return sorted(
+            name for name in os.listdir(self._bucket_dir(bucket_name))
+            if not name.startswith(".")
+        )
+
+    async def iter_objects(
+        self, bucket_name: str, batch_size: int = 1000
+    ) -> AsyncIterator[tuple[str, StoredObject]]:
+        # a flat directory has to be listed whole to be sorted, only the names are kept
+        names = await self.executor.run(self._list_sync, bucket_name)
+        for start in range(0, len(names), batch_size):
+            batch = await self.executor.run(
+                lambda batch: [(name, self._stat_sync(bucket_name, name)) for name in batch],
+                names[start:start + batch_size]
+            )
+            for object_name, stored_object in batch:
+                if stored_object is not None:
+                    yield object_name, stored_object
+
+    def _delete_sync(self, bucket_name: str, object_name: str) -> None:
+        for path in (
+            self._path(bucket_name, object_name),
+            self._path(bucket_name, object_name, META_DIR)
+        ):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @timed("storage.delete_file")
+    async def delete_file(self, bucket_name: str, object_name: str) -> bool:
+        try:
+            await self.executor.run(self._delete_sync, bucket_name, object_name)
+            return True
+        except Exception as e:
+            logger.error("Unsuccessful deleting file from disk: %s", e)
+            return False
+
+    def _delete_many_sync(self, bucket_name: str, object_names: Sequence[str]) -> set[str]:
+        failed = set()
+        for object_name in object_names:
+            try:
+                self._delete_sync(bucket_name, object_name)
+            except Exception as e:
+                logger.error("Unsuccessful deleting file from disk: %s", e)
+                failed.add(object_name)
+        return failed
+
+    @timed("storage.delete_files")
+    async def delete_files(self, bucket_name: str, object_names: Sequence[str]) -> set[str]:
+        try:
+            return await self.executor.run(self._delete_many_sync, bucket_name, object_names)
+        except Exception as e:
+            logger.error("An unexpected error occurred: %s", e)
+            return set(object_names)
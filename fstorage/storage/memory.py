@@ -0,0 +1,131 @@
+import uuid
+import hashlib
+import mimetypes
+from datetime import datetime, timezone
+from typing import AsyncIterator, BinaryIO, Iterable, Optional, Sequence
+
+from .storage import StoredObject
+from .signed import SignedStorage
+
+
+class MemoryStorage(SignedStorage):
+    """Objects kept in process memory, for tests and hermetic benchmarks"""
+
+    def __init__(self, base_url: str, signing_key: str, chunk_size: int = 1024 * 1024) -> None:
+        super().__init__(base_url, signing_key)
+        self.chunk_size = chunk_size
+        self.objects: dict[tuple[str, str], tuple[bytes, StoredObject]] = {}
+        self.multipart_uploads: dict[str, dict[int, bytes]] = {}
+
+    async def ensure_buckets(self, bucket_names: Iterable[str]) -> None:
+        pass
+
+    async def ping(self) -> bool:
+        return True
+
+    def _put(
+        self,
+        bucket_name: str,
+        object_name: str,
+        data: bytes,
+        content_type: Optional[str],
+        metadata: dict[str, str],
+        etag: Optional[str] = None
+    ) -> None:
+        self.objects[(bucket_name, object_name)] = (data, StoredObject(
+            size=len(data),
+            etag=etag or hashlib.md5(data).hexdigest(),
+            content_type=content_type,
+            last_modified=datetime.now(timezone.utc),
+            metadata=dict(metadata)
+        ))
+
+    async def _write(
+        self,
+        bucket_name: str,
+        object_name: str,
+        source: BinaryIO,
+        content_type: Optional[str],
+        metadata: dict[str, str]
+    ) -> bool:
+        self._put(bucket_name, object_name, source.read(), content_type, metadata)
+        return True
+
+    async def upload_file(
+        self, file: str | BinaryIO, bucket_name: str, object_name: str, file_size: int
+    ) -> bool:
+        if isinstance(file, str):
+            with open(file, "rb") as f:
+                return await self.upload_file(f, bucket_name, object_name, file_size)
+        content_type, _ = mimetypes.guess_type(object_name)
+        return await self._write(bucket_name, object_name, file, content_type, {})
+
+    async def create_multipart_upload(self, bucket_name: str, object_name: str) -> str | None:
+        upload_id = str(uuid.uuid4())
+        self.multipart_uploads[upload_id] = {}
+        return upload_id
+
+    async def upload_part(
+        self, bucket_name: str, object_name: str, upload_id: str, part_number: int, data: bytes
+    ) -> str | None:
+        parts = self.multipart_uploads.get(upload_id)
+        if parts is None:
+            return None
+        parts[part_number] = data
+        return hashlib.md5(data).hexdigest()
+
+    async def complete_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str, parts: Sequence[tuple[int, str]]
+    ) -> bool:
+        uploaded = self.multipart_uploads.pop(upload_id, None)
+        if uploaded is None:
+            return False
+        digest = hashlib.md5(b"".join(bytes.fromhex(etag) for _, etag in parts))
+        self._put(
+            bucket_name,
+            object_name,
+            b"".join(uploaded[part_number] for part_number, _ in parts),
+            mimetypes.guess_type(object_name)[0],
+            {},
+            etag=f"{digest.hexdigest()}-{len(parts)}"
+        )
+        return True
+
+    async def abort_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str
+    ) -> bool:
+        self.multipart_uploads.pop(upload_id, None)
+        return True
+
+    async def stat_file(self, bucket_name: str, object_name: str) -> StoredObject | None:
+        stored = self.objects.get((bucket_name, object_name))
+        return stored[1] if stored else None
+
+    async def get_file_stream(
+        self, bucket_name: str, object_name: str, offset: int = 0, length: int = 0
+    ) -> AsyncIterator[bytes] | None:
+        stored = self.objects.get((bucket_name, object_name))
+        if stored is None:
+            return None
+        data = memoryview(stored[0])[offset:offset + length if length else None]
+        return self._iter_chunks(data)
+
+    async def _iter_chunks(self, data: memoryview) -> AsyncIterator[bytes]:
+        for start in range(0, len(data), self.chunk_size):
+            yield bytes(data[start:start + self.chunk_size])
+
+    async def iter_objects(
+        self, bucket_name: str, batch_size: int = 1000
+    ) -> AsyncIterator[tuple[str, StoredObject]]:
+        for (bucket, object_name), (_, stored_object) in sorted(self.objects.items()):
+            if bucket == bucket_name:
+                yield object_name, stored_object
+
+    async def delete_file(self, bucket_name: str, object_name: str) -> bool:
+        self.objects.pop((bucket_name, object_name), None)
+        return True
+
+    async def delete_files(self, bucket_name: str, object_names: Sequence[str]) -> set[str]:
+        for object_name in object_names:
+            self.objects.pop((bucket_name, object_name), None)
+        return set()
@@ -1,34 +1,101 @@
-import io
 import logging
-from datetime import timedelta
+import mimetypes
+from itertools import islice
+from typing import AsyncIterator, BinaryIO, Iterable, Optional, Sequence
+from datetime import datetime, timedelta, timezone
 
 from minio.error import S3Error
+from minio.datatypes import PostPolicy, Part, Object
+from minio.deleteobjects import DeleteObject
 
-from .storage import S3Storage
+from .storage import S3Storage, StoredObject
+from .presign import SigV4Presigner
+from .executor import StorageExecutor
+from metrics import timed
 
 
 logger = logging.getLogger(__name__)
 
 
 class MinioS3Storage(S3Storage):
-    def __init__(self, minio_client) -> None:
+    def __init__(
+        self,
+        minio_client,
+        executor: StorageExecutor,
+        part_size: int,
+        download_chunk_size: int = 1024 * 1024,
+        endpoint_url: str = "",
+        presigner: Optional[SigV4Presigner] = None
+    ) -> None:
         self.minio_client = minio_client
+        self.endpoint_url = endpoint_url
+        # links are signed in process when a presigner is given, the client is not involved
+        self.presigner = presigner
+        self.executor = executor
+        self.part_size = part_size
+        self.download_chunk_size = download_chunk_size
+        # Buckets confirmed to exist, so uploads can skip the bucket_exists round trip
+        self._known_buckets: set[str] = set()
 
-    def upload_file(
-        self, file: str | io.BytesIO, bucket_name: str, object_name: str, file_size: int
+    async def ensure_buckets(self, bucket_names: Iterable[str]) -> None:
+        for bucket_name in bucket_names:
+            try:
+                await self._ensure_bucket(bucket_name)
+            except Exception as e:
+                logger.error("Failed to prepare bucket %s in MinIO: %s", bucket_name, e)
+
+    async def _ensure_bucket(self, bucket_name: str) -> None:
+        if not await self.executor.run(self.minio_client.bucket_exists, bucket_name):
+            await self.executor.run(self.minio_client.make_bucket, bucket_name)
+        self._known_buckets.add(bucket_name)
+
+    def _invalidate_bucket(self, bucket_name: str, error: S3Error) -> None:
+        if error.code == "NoSuchBucket":
+            self._known_buckets.discard(bucket_name)
+
+    async def ping(self) -> bool:
+        try:
+            await self.executor.run(self.minio_client.list_buckets)
+            return True
+        except S3Error:
+            # an error response still means the storage is up
+            return True
+        except Exception as e:
+            logger.error("MinIO is not reachable: %s", e)
+            return False
+
+    @timed("storage.upload_file")
+    async def upload_file(
+        self, file: str | BinaryIO, bucket_name: str, object_name: str, file_size: int
     ) -> bool:
         try:
-            if not self.minio_client.bucket_exists(bucket_name):
-                self.minio_client.make_bucket(bucket_name)
+            if bucket_name not in self._known_buckets:
+                await self._ensure_bucket(bucket_name)
 
+            # served as is by presigned links, so variants open as images in the browser
+            content_type = mimetypes.guess_type(object_name)[0] or "application/octet-stream"
             if isinstance(file, str):
-                self.minio_client.fput_obect(bucket_name, object_name, file)
+                await self.executor.run(
+                    self.minio_client.fput_object,
+                    bucket_name, object_name, file,
+                    content_type=content_type, part_size=self.part_size
+                )
             else:
-                self.minio_client.put_object(bucket_name, object_name, file, file_size)
+                # The stream is read part by part, so memory stays bounded by part_size
+                await self.executor.run(
+                    self.minio_client.put_object,
+                    bucket_name,
+                    object_name,
+                    file,
+                    length=file_size if file_size else -1,
+                    content_type=content_type,
+                    part_size=self.part_size
+                )
 
             return True
 
         except S3Error as e:
+            self._invalidate_bucket(bucket_name, e)
             logger.error("Unsuccessful file upload to MinIO: %s", e)
             return False
 
@@ -36,14 +103,108 @@ class MinioS3Storage(S3Storage):
             logger.error("An unexpected error occurred: %s", e)
             return False
 
-    def get_file_link(self, bucket_name: str, object_name: str, ttl: timedelta) -> str | None:
+    # The multipart calls below use the client's low-level API, which minio-py
+    # keeps underscored, to let clients upload parts in separate requests
+
+    @timed("storage.create_multipart_upload")
+    async def create_multipart_upload(self, bucket_name: str, object_name: str) -> str | None:
+        try:
+            if bucket_name not in self._known_buckets:
+                await self._ensure_bucket(bucket_name)
+
+            content_type, _ = mimetypes.guess_type(object_name)
+            return await self.executor.run(
+                self.minio_client._create_multipart_upload,
+                bucket_name,
+                object_name,
+                {"Content-Type": content_type or "application/octet-stream"}
+            )
+
+        except S3Error as e:
+            self._invalidate_bucket(bucket_name, e)
+            logger.error("Unsuccessful multipart upload creation in MinIO: %s", e)
+            return None
+
+        except Exception as e:
+            logger.error("An unexpected error occurred: %s", e)
+            return None
+
+    @timed("storage.upload_part")
+    async def upload_part(
+        self, bucket_name: str, object_name: str, upload_id: str, part_number: int, data: bytes
+    ) -> str | None:
+        try:
+            return await self.executor.run(
+                self.minio_client._upload_part,
+                bucket_name, object_name, data, None, upload_id, part_number
+            )
+
+        except S3Error as e:
+            logger.error("Unsuccessful part upload to MinIO: %s", e)
+            return None
+
+        except Exception as e:
+            logger.error("An unexpected error occurred: %s", e)
+            return None
+
+    @timed("storage.complete_multipart_upload")
+    async def complete_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str, parts: Sequence[tuple[int, str]]
+    ) -> bool:
+        try:
+            await self.executor.run(
+                self.minio_client._complete_multipart_upload,
+                bucket_name,
+                object_name,
+                upload_id,
+                [Part(part_number, etag) for part_number, etag in parts]
+            )
+            return True
+
+        except S3Error as e:
+            logger.error("Unsuccessful multipart upload completion in MinIO: %s", e)
+            return False
+
+        except Exception as e:
+            logger.error("An unexpected error occurred: %s", e)
+            return False
+
+    @timed("storage.abort_multipart_upload")
+    async def abort_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str
+    ) -> bool:
         try:
-            link = self.minio_client.presigned_get_object(
-                bucket_name=bucket_name,
-                object_name=object_name,
-                expires=ttl
+            await self.executor.run(
+                self.minio_client._abort_multipart_upload, bucket_name, object_name, upload_id
             )
-            return link
+            return True
+
+        except S3Error as e:
+            if e.code == "NoSuchUpload":
+                return True
+            logger.error("Unsuccessful multipart upload abort in MinIO: %s", e)
+            return False
+
+        except Exception as e:
+            logger.error("An unexpected error occurred: %s", e)
+            return False
+
+    def _presign(self, bucket_name: str, object_name: str, ttl: timedelta) -> str:
+        if self.presigner is not None:
+            return self.presigner.presign_get(bucket_name, object_name, ttl)
+        return self.minio_client.presigned_get_object(
+            bucket_name=bucket_name, object_name=object_name, expires=ttl
+        )
+
+    @timed("storage.get_file_link")
+    async def get_file_link(
+        self, bucket_name: str, object_name: str, ttl: timedelta
+    ) -> str | None:
+        try:
+            if self.presigner is not None:
+                # a few microseconds of hashing, not worth a hop to the executor
+                return self._presign(bucket_name, object_name, ttl)
+            return await self.executor.run(self._presign, bucket_name, object_name, ttl)
 
         except S3Error as e:
             logger.error("Unsuccessful getting file from MinIO: %s", e)
@@ -53,15 +214,176 @@ class MinioS3Storage(S3Storage):
             logger.error("An unexpected error occured: %s", e)
             return None
 
-    def delete_file(self, bucket_name: str, object_name: str) -> bool:
+    @timed("storage.get_file_links")
+    async def get_file_links(
+        self, bucket_name: str, object_names: Sequence[str], ttl: timedelta
+    ) -> dict[str, str]:
+        def sign_all() -> dict[str, str]:
+            links = {}
+            for object_name in object_names:
+                try:
+                    links[object_name] = self._presign(bucket_name, object_name, ttl)
+                except Exception as e:
+                    logger.error("Unsuccessful getting file %s from MinIO: %s", object_name, e)
+            return links
+
+        try:
+            if self.presigner is not None:
+                return sign_all()
+            return await self.executor.run(sign_all)
+
+        except Exception as e:
+            logger.error("An unexpected error occured: %s", e)
+            return {}
+
+    def upload_url(self, bucket_name: str) -> str:
+        return f"{self.endpoint_url}/{bucket_name}"
+
+    @timed("storage.get_upload_form")
+    async def get_upload_form(
+        self,
+        bucket_name: str,
+        object_name: str,
+        ttl: timedelta,
+        max_size: int,
+        content_type: Optional[str],
+        metadata: dict[str, str]
+    ) -> dict[str, str] | None:
         try:
-            self.minio_client.remove_object(bucket_name, object_name)
+            fields = {"key": object_name}
+            policy = PostPolicy(bucket_name, datetime.now(timezone.utc) + ttl)
+            policy.add_equals_condition("key", object_name)
+            policy.add_content_length_range_condition(1, max_size)
+            if content_type is not None:
+                policy.add_equals_condition("Content-Type", content_type)
+                fields["Content-Type"] = content_type
+            for key, value in metadata.items():
+                policy.add_equals_condition(f"x-amz-meta-{key}", value)
+                fields[f"x-amz-meta-{key}"] = value
+
+            form_data = await self.executor.run(self.minio_client.presigned_post_policy, policy)
+            return {**fields, **form_data}
+
+        except S3Error as e:
+            logger.error("Unsuccessful upload policy generation in MinIO: %s", e)
+            return None
+
+        except Exception as e:
+            logger.error("An unexpected error occurred: %s", e)
+            return None
+
+    @timed("storage.stat_file")
+    async def stat_file(self, bucket_name: str, object_name: str) -> StoredObject | None:
+        try:
+            obj = await self.executor.run(self.minio_client.stat_object, bucket_name, object_name)
+            metadata = {
+                key.lower().removeprefix("x-amz-meta-"): value
+                for key, value in (obj.metadata or {}).items()
+                if key.lower().startswith("x-amz-meta-")
+            }
+            return StoredObject(
+                size=obj.size or 0,
+                etag=obj.etag or "",
+                content_type=obj.content_type,
+                last_modified=obj.last_modified,
+                metadata=metadata
+            )
+
+        except S3Error as e:
+            self._invalidate_bucket(bucket_name, e)
+            if e.code not in ("NoSuchKey", "NoSuchBucket"):
+                logger.error("Unsuccessful file stat in MinIO: %s", e)
+            return None
+
+        except Exception as e:
+            logger.error("An unexpected error occurred: %s", e)
+            return None
+
+    @timed("storage.get_file_stream")
+    async def get_file_stream(
+        self, bucket_name: str, object_name: str, offset: int = 0, length: int = 0
+    ) -> AsyncIterator[bytes] | None:
+        try:
+            response = await self.executor.run(
+                self.minio_client.get_object,
+                bucket_name, object_name, offset=offset, length=length
+            )
+            return self._iter_response(response)
+
+        except S3Error as e:
+            self._invalidate_bucket(bucket_name, e)
+            logger.error("Unsuccessful getting file from MinIO: %s", e)
+            return None
+
+        except Exception as e:
+            logger.error("An unexpected error occurred: %s", e)
+            return None
+
+    async def _iter_response(self, response) -> AsyncIterator[bytes]:
+        # Each read holds an executor worker for one chunk only, not for the whole download
+        try:
+            while chunk := await self.executor.run(response.read, self.download_chunk_size):
+                yield chunk
+        finally:
+            response.close()
+            response.release_conn()
+
+    async def iter_objects(
+        self, bucket_name: str, batch_size: int = 1000
+    ) -> AsyncIterator[tuple[str, StoredObject]]:
+        # listing errors are raised: an empty listing must never be mistaken for an empty bucket
+        objects = self.minio_client.list_objects(bucket_name, recursive=True)
+
+        def next_batch() -> list[Object]:
+            return list(islice(objects, batch_size))
+
+        while batch := await self.executor.run(next_batch):
+            for obj in batch:
+                # a recursive listing has no directory entries, every object has a name
+                if obj.object_name is None:
+                    continue
+                yield obj.object_name, StoredObject(
+                    size=obj.size or 0,
+                    etag=obj.etag or "",
+                    last_modified=obj.last_modified
+                )
+
+    @timed("storage.delete_file")
+    async def delete_file(self, bucket_name: str, object_name: str) -> bool:
+        try:
+            await self.executor.run(self.minio_client.remove_object, bucket_name, object_name)
             return True
 
         except S3Error as e:
+            self._invalidate_bucket(bucket_name, e)
             logger.error("Unsuccessful file delete in MinIO: %s", e)
             return False
 
         except Exception as e:
             logger.error("An unexpected error occurred: %s", e)
             return False
+
+    @timed("storage.delete_files")
+    async def delete_files(self, bucket_name: str, object_names: Sequence[str]) -> set[str]:
+        def remove_all() -> set[str]:
+            # remove_objects is lazy, errors are only sent while iterating
+            errors = self.minio_client.remove_objects(
+                bucket_name, [DeleteObject(object_name) for object_name in object_names]
+            )
+            failed = set()
+            for error in errors:
+                logger.error("Unsuccessful file delete in MinIO: %s", error)
+                failed.add(error.name)
+            return failed
+
+        try:
+            return await self.executor.run(remove_all)
+
+        except S3Error as e:
+            self._invalidate_bucket(bucket_name, e)
+            logger.error("Unsuccessful files delete in MinIO: %s", e)
+            return set(object_names)
+
+        except Exception as e:
+            logger.error("An unexpected error occurred: %s", e)
+            return set(object_names)
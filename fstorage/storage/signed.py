@@ -0,0 +1,120 @@
+import hmac
+import json
+import time
+import base64
+import hashlib
+import logging
+from abc import abstractmethod
+from urllib.parse import quote
+from datetime import timedelta
+from typing import BinaryIO, Optional, Sequence
+
+from .storage import S3Storage
+
+logger = logging.getLogger(__name__)
+
+
+class SignedStorage(S3Storage):
+    """Base of the backends served by this application itself.
+
+    Temporary links and upload forms point at the /storage routes and carry an
+    HMAC signature instead of S3 credentials, so any worker sharing the key can
+    check them.
+    """
+
+    def __init__(self, base_url: str, signing_key: str) -> None:
+        self.base_url = base_url.rstrip("/")
+        self._key = signing_key.encode()
+
+    def _sign(self, *parts: str) -> str:
+        return hmac.new(self._key, "\n".join(parts).encode(), hashlib.sha256).hexdigest()
+
+    def link(self, bucket_name: str, object_name: str, ttl: timedelta) -> str:
+        expires = str(int(time.time() + ttl.total_seconds()))
+        signature = self._sign("GET", bucket_name, object_name, expires)
+        return (
+            f"{self.base_url}/storage/{bucket_name}/{quote(object_name)}"
+            f"?expires={expires}&signature={signature}"
+        )
+
+    def verify_link(
+        self, bucket_name: str, object_name: str, expires: int, signature: str
+    ) -> bool:
+        if expires < time.time():
+            return False
+        expected = self._sign("GET", bucket_name, object_name, str(expires))
+        return hmac.compare_digest(expected, signature)
+
+    async def get_file_link(
+        self, bucket_name: str, object_name: str, ttl: timedelta
+    ) -> str | None:
+        return self.link(bucket_name, object_name, ttl)
+
+    async def get_file_links(
+        self, bucket_name: str, object_names: Sequence[str], ttl: timedelta
+    ) -> dict[str, str]:
+        return {
+            object_name: self.link(bucket_name, object_name, ttl)
+            for object_name in object_names
+        }
+
+    def upload_url(self, bucket_name: str) -> str:
+        return f"{self.base_url}/storage/{bucket_name}"
+
+    async def get_upload_form(
+        self,
+        bucket_name: str,
+        object_name: str,
+        ttl: timedelta,
+        max_size: int,
+        content_type: Optional[str],
+        metadata: dict[str, str]
+    ) -> dict[str, str] | None:
+        policy = base64.urlsafe_b64encode(json.dumps({
+            "bucket": bucket_name,
+            "key": object_name,
+            "expires": int(time.time() + ttl.total_seconds()),
+            "max_size": max_size,
+            "content_type": content_type,
+            "metadata": metadata
+        }).encode()).decode()
+        return {"key": object_name, "policy": policy, "signature": self._sign("POST", policy)}
+
+    def verify_form(
+        self, bucket_name: str, policy: str, signature: str, file_size: int
+    ) -> dict | None:
+        """Conditions of a form upload when its policy is signed, unexpired and fits the file"""
+        if not hmac.compare_digest(self._sign("POST", policy), signature):
+            return None
+        conditions = json.loads(base64.urlsafe_b64decode(policy.encode()))
+        if (
+            conditions["bucket"] != bucket_name
+            or conditions["expires"] < time.time()
+            or not 0 < file_size <= conditions["max_size"]
+        ):
+            return None
+        return conditions
+
+    async def store_form(self, conditions: dict, file: BinaryIO) -> bool:
+        return await self._write(
+            conditions["bucket"],
+            conditions["key"],
+            file,
+            conditions["content_type"],
+            conditions["metadata"]
+        )
+
+    def local_path(self, bucket_name: str, object_name: str) -> str | None:
+        """Path of the object on disk, for backends that can hand the file to the server"""
+        return None
+
+    @abstractmethod
+    async def _write(
+        self,
+        bucket_name: str,
+        object_name: str,
+        source: BinaryIO,
+        content_type: Optional[str],
+        metadata: dict[str, str]
+    ) -> bool:
+        raise NotImplementedError
@@ -1,19 +1,109 @@
-import io
+from typing import AsyncIterator, BinaryIO, Iterable, Optional, Sequence
 from abc import ABC, abstractmethod
-from datetime import timedelta
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    size: int
+    etag: str
+    content_type: Optional[str] = None
+    last_modified: Optional[datetime] = None
+    metadata: dict[str, str] = field(default_factory=dict)  # user metadata without x-amz-meta-
 
 
 class S3Storage(ABC):
     @abstractmethod
-    def upload_file(
-        self, file: str | io.BytesIO, bucket_name: str, object_name: str, file_size: int
+    async def ensure_buckets(self, bucket_names: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def ping(self) -> bool:
+        """Whether the storage answers a cheap request"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def upload_file(
+        self, file: str | BinaryIO, bucket_name: str, object_name: str, file_size: int
+    ) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def create_multipart_upload(self, bucket_name: str, object_name: str) -> str | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def upload_part(
+        self, bucket_name: str, object_name: str, upload_id: str, part_number: int, data: bytes
+    ) -> str | None:
+        """Upload one part of a multipart upload, returns the part etag"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def complete_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str, parts: Sequence[tuple[int, str]]
+    ) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def abort_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str
     ) -> bool:
         raise NotImplementedError
 
     @abstractmethod
-    def get_file_link(self, bucket_name: str, object_name: str, ttl: timedelta) -> str | None:
+    async def get_file_link(
+        self, bucket_name: str, object_name: str, ttl: timedelta
+    ) -> str | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_file_links(
+        self, bucket_name: str, object_names: Sequence[str], ttl: timedelta
+    ) -> dict[str, str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def upload_url(self, bucket_name: str) -> str:
+        """Where the fields of get_upload_form are posted to"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_upload_form(
+        self,
+        bucket_name: str,
+        object_name: str,
+        ttl: timedelta,
+        max_size: int,
+        content_type: Optional[str],
+        metadata: dict[str, str]
+    ) -> dict[str, str] | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stat_file(self, bucket_name: str, object_name: str) -> StoredObject | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_file_stream(
+        self, bucket_name: str, object_name: str, offset: int = 0, length: int = 0
+    ) -> AsyncIterator[bytes] | None:
+        """Open the object (or length bytes from offset) as a stream of bounded chunks"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_objects(
+        self, bucket_name: str, batch_size: int = 1000
+    ) -> AsyncIterator[tuple[str, StoredObject]]:
+        """Every object of the bucket in key order, listed batch_size keys at a time"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_file(self, bucket_name: str, object_name: str) -> bool:
         raise NotImplementedError
 
     @abstractmethod
-    def delete_file(self, bucket_name: str, object_name: str) -> bool:
+    async def delete_files(self, bucket_name: str, object_names: Sequence[str]) -> set[str]:
+        """Delete objects in bulk, returns names of objects that were not deleted"""
         raise NotImplementedError
@@ -0,0 +1,19 @@
+import asyncio
+import logging
+
+from fastapi import FastAPI
+
+from config import settings, buckets
+
+logger = logging.getLogger(__name__)
+
+
+async def reload_bucket_policies(app: FastAPI) -> None:
+    """Pick up changed bucket policies in every worker, without a restart"""
+    while True:
+        await asyncio.sleep(settings.app.bucket_policy_reload_interval)
+        try:
+            if buckets.reload_if_changed():
+                await app.state.storage.ensure_buckets(buckets)
+        except Exception as e:
+            logger.error("Failed reloading bucket policies > %s", e)
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from fastapi import FastAPI
+
+from config import settings, db_helper, buckets
+from services.derivatives import DerivativeService
+from repositories.file import FileRepository
+
+logger = logging.getLogger(__name__)
+
+
+async def derive_variants(app: FastAPI) -> None:
+    """Render the image variants of newly committed files, off the request path.
+
+    Only the leader worker renders, its process pool runs while it holds the lead.
+    """
+    executor: ProcessPoolExecutor | None = None
+    try:
+        while True:
+            await asyncio.sleep(settings.app.derivative_interval)
+            if not db_helper.leader.held:
+                if executor is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = None
+                continue
+            if executor is None:
+                executor = ProcessPoolExecutor(max_workers=settings.app.derivative_workers)
+            for bucket_name in buckets:
+                policy = buckets.get(bucket_name)
+                if policy is None or not policy.variants:
+                    continue
+                try:
+                    async with db_helper.session_factory() as session:
+                        derivative_service = DerivativeService(
+                            FileRepository(session, app.state.row_cache),
+                            app.state.storage,
+                            executor
+                        )
+                        while await derivative_service.derive_variants(
+                            policy,
+                            settings.app.derivative_batch_size,
+                            timedelta(seconds=settings.app.derivative_claim_timeout),
+                            settings.app.derivative_max_attempts
+                        ) == settings.app.derivative_batch_size:
+                            pass
+                except Exception as e:
+                    logger.error("Failed deriving variants of %s > %s", policy.name, e)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,37 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI
+
+from config import settings, db_helper
+from services.file import FileService
+from repositories.file import FileRepository
+from repositories.blob import BlobRepository
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+async def drain_deleted_files(app: FastAPI) -> None:
+    """Remove objects of soft-deleted files and of uploads that never got committed"""
+    while True:
+        await asyncio.sleep(settings.app.file_drain_interval)
+        try:
+            pending_before = datetime.now(timezone.utc) - timedelta(
+                minutes=settings.app.pending_file_ttl
+            )
+            async with db_helper.session_factory() as session:
+                file_service = FileService(
+                    FileRepository(session, app.state.row_cache),
+                    BlobRepository(session),
+                    app.state.storage,
+                    app.state.link_cache
+                )
+                while await file_service.drain_deleted_files(
+                    pending_before, BATCH_SIZE
+                ) == BATCH_SIZE:
+                    pass
+        except Exception as e:
+            logger.error("Failed draining deleted files > %s", e)
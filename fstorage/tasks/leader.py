@@ -0,0 +1,18 @@
+import asyncio
+import logging
+
+from fastapi import FastAPI
+
+from config import settings, db_helper
+
+logger = logging.getLogger(__name__)
+
+
+async def hold_leadership(app: FastAPI) -> None:
+    """Keep exactly one worker running the singleton passes, by holding the leader lock"""
+    while True:
+        try:
+            await db_helper.leader.refresh()
+        except Exception as e:
+            logger.error("Failed refreshing the leader lock > %s", e)
+        await asyncio.sleep(settings.db.leader_check_interval)
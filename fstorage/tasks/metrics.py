@@ -0,0 +1,20 @@
+import asyncio
+import logging
+
+from fastapi import FastAPI
+
+from config import settings
+from metrics.state import collect_state
+
+logger = logging.getLogger(__name__)
+
+
+async def share_metrics(app: FastAPI) -> None:
+    """Write the metrics of this worker for the scrapes served by the others"""
+    while True:
+        await asyncio.sleep(settings.app.metrics_write_interval)
+        try:
+            collect_state(app)
+            await asyncio.to_thread(app.state.shared_metrics.write)
+        except Exception as e:
+            logger.error("Failed writing shared metrics > %s", e)
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from fastapi import FastAPI
+
+from config import settings, db_helper, buckets
+from storage.storage import S3Storage
+from services.reconcile import ReconcileService, ReconcileReport
+from repositories.file import FileRepository
+from cache.row_cache import RowCache
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile(
+    storage: S3Storage,
+    bucket_names: Iterable[str],
+    repair: bool,
+    grace: timedelta,
+    row_cache: Optional[RowCache] = None
+) -> list[ReconcileReport]:
+    reports = []
+    for bucket_name in bucket_names:
+        async with db_helper.session_factory() as stream_session, \
+                db_helper.session_factory() as repair_session:
+            reconcile_service = ReconcileService(
+                FileRepository(stream_session), FileRepository(repair_session, row_cache), storage
+            )
+            reports.append(await reconcile_service.reconcile_bucket(bucket_name, grace, repair))
+    return reports
+
+
+async def reconcile_buckets(app: FastAPI, interval: int) -> None:
+    """Compare every configured bucket with the files table each interval hours, in the leader"""
+    while True:
+        await asyncio.sleep(interval * 3600)
+        if not db_helper.leader.held:
+            continue
+        try:
+            reports = await reconcile(
+                app.state.storage,
+                buckets,
+                repair=settings.app.reconcile_repair,
+                grace=timedelta(hours=settings.app.reconcile_grace),
+                row_cache=app.state.row_cache
+            )
+            for report in reports:
+                if report.orphan_objects or report.missing_objects:
+                    logger.warning(
+                        "bucket -> %s drifted | orphan objects -> %s | missing objects -> %s",
+                        report.bucket_name, report.orphan_objects, report.missing_objects
+                    )
+        except Exception as e:
+            logger.error("Failed reconciling buckets > %s", e)
@@ -0,0 +1,20 @@
+import asyncio
+import logging
+
+from fastapi import FastAPI
+
+from config import settings, db_helper
+
+logger = logging.getLogger(__name__)
+
+
+async def check_replicas(app: FastAPI) -> None:
+    """Take lagging or unreachable replicas out of the read rotation, and back when they recover"""
+    while True:
+        await asyncio.sleep(settings.db.replica_check_interval)
+        try:
+            await db_helper.check_replicas(
+                settings.db.replica_max_lag, settings.db.replica_check_timeout
+            )
+        except Exception as e:
+            logger.error("Failed checking replicas > %s", e)
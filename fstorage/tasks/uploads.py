@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI
+
+from config import settings, db_helper
+from services.file import FileService
+from services.upload import UploadService
+from repositories.file import FileRepository
+from repositories.blob import BlobRepository
+from repositories.upload import UploadRepository, UploadPartRepository
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+
+
+async def collect_abandoned_uploads(app: FastAPI) -> None:
+    """Abort multipart uploads that got no new parts within upload_session_ttl, in the leader"""
+    while True:
+        await asyncio.sleep(settings.app.upload_gc_interval * 60)
+        if not db_helper.leader.held:
+            continue
+        try:
+            updated_before = datetime.now(timezone.utc) - timedelta(
+                hours=settings.app.upload_session_ttl
+            )
+            async with db_helper.session_factory() as session:
+                upload_service = UploadService(
+                    UploadRepository(session),
+                    UploadPartRepository(session),
+                    FileService(
+                        FileRepository(session, app.state.row_cache),
+                        BlobRepository(session),
+                        app.state.storage,
+                        app.state.link_cache
+                    )
+                )
+                while await upload_service.collect_abandoned_uploads(
+                    updated_before, BATCH_SIZE
+                ) == BATCH_SIZE:
+                    pass
+        except Exception as e:
+            logger.error("Failed collecting abandoned uploads > %s", e)
@@ -0,0 +1,66 @@
+"""add uploads tables
+
+Revision ID: 4b7d2e91c3a5
+Revises: dce60856fb03
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4b7d2e91c3a5"
+down_revision: Union[str, None] = "dce60856fb03"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "uploads",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("user_id", sa.String(length=36), nullable=False),
+        sa.Column("bucket_name", sa.String(length=40), nullable=False),
+        sa.Column("object_name", sa.String(length=40), nullable=False),
+        sa.Column("multipart_upload_id", sa.String(length=255), nullable=False),
+        sa.Column("file_size", sa.BigInteger(), nullable=False),
+        sa.Column("part_size", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("object_name"),
+    )
+    op.create_index(
+        op.f("ix_uploads_updated_at"), "uploads", ["updated_at"], unique=False
+    )
+    op.create_table(
+        "uploadparts",
+        sa.Column("upload_id", sa.String(length=36), nullable=False),
+        sa.Column("part_number", sa.Integer(), nullable=False),
+        sa.Column("etag", sa.String(length=64), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["upload_id"], ["uploads.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("upload_id", "part_number"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("uploadparts")
+    op.drop_index(op.f("ix_uploads_updated_at"), table_name="uploads")
+    op.drop_table("uploads")
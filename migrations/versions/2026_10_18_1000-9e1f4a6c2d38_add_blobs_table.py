@@ -0,0 +1,55 @@
+"""add blobs table
+
+Revision ID: 9e1f4a6c2d38
+Revises: 4b7d2e91c3a5
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9e1f4a6c2d38"
+down_revision: Union[str, None] = "4b7d2e91c3a5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "blobs",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("bucket_name", sa.String(length=40), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("object_name", sa.String(length=40), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("bucket_name", "sha256"),
+        sa.UniqueConstraint("object_name"),
+    )
+    op.add_column("files", sa.Column("blob_id", sa.String(length=36), nullable=True))
+    op.create_foreign_key(
+        op.f("files_blob_id_fkey"), "files", "blobs", ["blob_id"], ["id"]
+    )
+    # deduplicated files share the object of their blob
+    op.drop_constraint("files_object_name_key", "files", type_="unique")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_unique_constraint("files_object_name_key", "files", ["object_name"])
+    op.drop_constraint(op.f("files_blob_id_fkey"), "files", type_="foreignkey")
+    op.drop_column("files", "blob_id")
+    op.drop_table("blobs")
@@ -0,0 +1,33 @@
+"""add files listing index
+
+Revision ID: c5a83f0d71e2
+Revises: 9e1f4a6c2d38
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c5a83f0d71e2"
+down_revision: Union[str, None] = "9e1f4a6c2d38"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_files_user_id_bucket_name_upload_at",
+        "files",
+        ["user_id", "bucket_name", "upload_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_files_user_id_bucket_name_upload_at", table_name="files")
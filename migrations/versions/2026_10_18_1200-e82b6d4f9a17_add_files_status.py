@@ -0,0 +1,49 @@
+"""add files status
+
+Revision ID: e82b6d4f9a17
+Revises: c5a83f0d71e2
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e82b6d4f9a17"
+down_revision: Union[str, None] = "c5a83f0d71e2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "files",
+        sa.Column(
+            "status",
+            sa.String(length=16),
+            server_default="committed",
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_files_status_upload_at",
+        "files",
+        ["status", "upload_at"],
+        unique=False,
+        postgresql_where=sa.text("status <> 'committed'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_files_status_upload_at",
+        table_name="files",
+        postgresql_where=sa.text("status <> 'committed'"),
+    )
+    op.drop_column("files", "status")
@@ -0,0 +1,34 @@
+"""add files object name index
+
+Revision ID: 1f6c9b3e8d24
+Revises: e82b6d4f9a17
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "1f6c9b3e8d24"
+down_revision: Union[str, None] = "e82b6d4f9a17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_files_bucket_name_object_name",
+        "files",
+        ["bucket_name", sa.text('object_name COLLATE "C"')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_files_bucket_name_object_name", table_name="files")
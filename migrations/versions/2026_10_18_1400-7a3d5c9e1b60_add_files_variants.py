@@ -0,0 +1,45 @@
+"""add files variants
+
+Revision ID: 7a3d5c9e1b60
+Revises: 1f6c9b3e8d24
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7a3d5c9e1b60"
+down_revision: Union[str, None] = "1f6c9b3e8d24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "files",
+        sa.Column("variants", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    )
+    op.create_index(
+        "ix_files_bucket_name_upload_at_underived",
+        "files",
+        ["bucket_name", "upload_at"],
+        unique=False,
+        postgresql_where=sa.text("variants IS NULL AND status = 'committed'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_files_bucket_name_upload_at_underived",
+        table_name="files",
+        postgresql_where=sa.text("variants IS NULL AND status = 'committed'"),
+    )
+    op.drop_column("files", "variants")
@@ -0,0 +1,32 @@
+"""add files variants claimed at
+
+Revision ID: 3c8e2a7f5d91
+Revises: 7a3d5c9e1b60
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3c8e2a7f5d91"
+down_revision: Union[str, None] = "7a3d5c9e1b60"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "files",
+        sa.Column("variants_claimed_at", sa.TIMESTAMP(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("files", "variants_claimed_at")
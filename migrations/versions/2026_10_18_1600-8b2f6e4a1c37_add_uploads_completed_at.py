@@ -0,0 +1,32 @@
+"""add uploads completed at
+
+Revision ID: 8b2f6e4a1c37
+Revises: 3c8e2a7f5d91
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8b2f6e4a1c37"
+down_revision: Union[str, None] = "3c8e2a7f5d91"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "uploads",
+        sa.Column("completed_at", sa.TIMESTAMP(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("uploads", "completed_at")
@@ -0,0 +1,32 @@
+"""add files variants attempts
+
+Revision ID: 5d9a1c7e3f42
+Revises: 8b2f6e4a1c37
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5d9a1c7e3f42"
+down_revision: Union[str, None] = "8b2f6e4a1c37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "files",
+        sa.Column("variants_attempts", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("files", "variants_attempts")
@@ -0,0 +1,14 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fstorage"))
+
+# settings are read at import, the services under test never connect to these
+for key, value in {
+    "minio_host": "localhost", "minio_port": "9000",
+    "minio_access_key": "test", "minio_secret_key": "test-secret",
+    "db_host": "localhost", "db_port": "5432", "db_name": "postgres",
+    "db_user": "postgres", "db_passwd": "postgres", "object_id_key": "test-id-key",
+}.items():
+    os.environ.setdefault(key, value)
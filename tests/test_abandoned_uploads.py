@@ -0,0 +1,87 @@
+import asyncio
+from datetime import datetime, timezone
+
+from models.upload import Upload
+from services.file import FileService
+from services.upload import UploadService
+from storage.memory import MemoryStorage
+from cache.link_cache import MemoryLinkCache
+
+
+class FakeUploadRepository:
+    def __init__(self, uploads: list[Upload]) -> None:
+        self.uploads = uploads
+
+    async def fetch_expired(self, updated_before: datetime, limit: int) -> list[Upload]:
+        return self.uploads[:limit]
+
+    async def delete_many(self, objs: list[Upload]) -> bool:
+        self.uploads = [upload for upload in self.uploads if upload not in objs]
+        return True
+
+
+class FlakyStorage(MemoryStorage):
+    """Aborts of the upload ids in failing are refused, like an unreachable S3"""
+
+    def __init__(self, failing: set[str]) -> None:
+        super().__init__("http://localhost", "test")
+        self.failing = failing
+
+    async def abort_multipart_upload(
+        self, bucket_name: str, object_name: str, upload_id: str
+    ) -> bool:
+        return upload_id not in self.failing
+
+
+def upload(multipart_upload_id: str) -> Upload:
+    return Upload(
+        user_id="user",
+        bucket_name="video",
+        object_name=f"{multipart_upload_id}.mp4",
+        multipart_upload_id=multipart_upload_id,
+        file_size=10,
+        part_size=5
+    )
+
+
+def test_failed_abort_keeps_the_upload_row():
+    uploads = [upload("aborted"), upload("failing")]
+    upload_repository = FakeUploadRepository(uploads)
+    storage = FlakyStorage(failing={"failing"})
+    upload_service = UploadService(
+        upload_repository,
+        None,
+        FileService(None, None, storage, MemoryLinkCache(min_validity=60, max_size=10))
+    )
+
+    collected = asyncio.run(
+        upload_service.collect_abandoned_uploads(datetime.now(timezone.utc), 10)
+    )
+
+    assert collected == 1
+    assert [row.multipart_upload_id for row in upload_repository.uploads] == ["failing"]
+
+    # the next round retries the abort from the row that was kept
+    storage.failing.clear()
+    asyncio.run(upload_service.collect_abandoned_uploads(datetime.now(timezone.utc), 10))
+    assert upload_repository.uploads == []
+
+
+def test_completed_upload_row_is_dropped_without_an_abort():
+    completed = upload("completed")
+    completed.completed_at = datetime.now(timezone.utc)
+    upload_repository = FakeUploadRepository([completed])
+    # S3 forgot the upload when it completed, an abort would fail forever
+    storage = FlakyStorage(failing={"completed"})
+    upload_service = UploadService(
+        upload_repository,
+        None,
+        FileService(None, None, storage, MemoryLinkCache(min_validity=60, max_size=10))
+    )
+
+    collected = asyncio.run(
+        upload_service.collect_abandoned_uploads(datetime.now(timezone.utc), 10)
+    )
+
+    assert collected == 1
+    assert upload_repository.uploads == []
@@ -0,0 +1,72 @@
+import os
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from config.buckets import BucketRegistry
+
+AVATAR = {"max_length": 1024, "allowed_formats": [".png"], "is_public": True}
+
+
+def registry(raw: dict, **kwargs) -> BucketRegistry:
+    return BucketRegistry(
+        load_settings=lambda: raw,
+        default_link_ttl=12,
+        default_permalink_host="localhost:9000",
+        **kwargs
+    )
+
+
+def test_defaults_are_filled_in():
+    policy = registry({"avatar": AVATAR}).get("avatar")
+
+    assert policy is not None
+    assert policy.link_ttl == 12
+    assert policy.permalink("a.png") == "localhost:9000/avatar/a.png"
+    assert policy.allowed_formats == frozenset({".png"})
+    assert policy.variants == {}
+
+
+@pytest.mark.parametrize("rules", [
+    {**AVATAR, "max_length": 0},
+    {**AVATAR, "allowed_formats": ["png"]},  # no dot
+    {**AVATAR, "link_ttl": -1},
+    {**AVATAR, "unknown": True},  # a typo must not be silently ignored
+    {**AVATAR, "variants": {"Small!": {"width": 64, "height": 64}}},
+    {**AVATAR, "variants": {"small": {"width": 0, "height": 64}}},
+    {**AVATAR, "variants": {"small": {"width": 64, "height": 64, "format": "gif"}}},
+    {"allowed_formats": [".png"]},  # no max_length
+])
+def test_invalid_policy_fails_at_startup(rules):
+    with pytest.raises(ValidationError):
+        registry({"avatar": rules})
+
+
+def test_no_buckets_fails_at_startup():
+    with pytest.raises(ValueError):
+        registry({})
+
+
+def test_bad_reload_keeps_the_current_policies(tmp_path):
+    policy_file = tmp_path / "buckets.json"
+    policy_file.write_text(json.dumps({"avatar": AVATAR}))
+    buckets = registry({}, policy_file=str(policy_file))
+
+    policy_file.write_text(json.dumps({"avatar": {**AVATAR, "max_length": -1}}))
+    os.utime(policy_file, (0, 1))
+    assert not buckets.reload_if_changed()
+    assert buckets.get("avatar").max_length == 1024
+
+    policy_file.write_text(json.dumps({"video": {**AVATAR, "allowed_formats": [".mp4"]}}))
+    os.utime(policy_file, (0, 2))
+    assert buckets.reload_if_changed()
+    assert list(buckets) == ["video"] and "avatar" not in buckets
+
+
+def test_unchanged_source_is_not_reloaded(tmp_path):
+    policy_file = tmp_path / "buckets.json"
+    policy_file.write_text(json.dumps({"avatar": AVATAR}))
+    buckets = registry({}, policy_file=str(policy_file))
+
+    assert not buckets.reload_if_changed()
@@ -0,0 +1,121 @@
+import io
+import uuid
+import asyncio
+
+import pytest
+
+from models.file import File, FileStatus
+from services.file import FileService
+from storage.memory import MemoryStorage
+from cache.link_cache import MemoryLinkCache
+from exceptions.exceptions import FileNotUploaded
+
+
+class FakeFileRepository:
+    """Rows by object_id, an insert of a taken object_id fails like the unique index"""
+
+    def __init__(self) -> None:
+        self.rows: dict[str, File] = {}
+        self.inserts = 0
+
+    async def fetch_one(self, **filters) -> File | None:
+        file_obj = self.rows.get(filters.pop("object_id"))
+        if file_obj is None or any(
+            getattr(file_obj, field) != value for field, value in filters.items()
+        ):
+            return None
+        return file_obj
+
+    async def add_one(self, obj: File) -> str | None:
+        self.inserts += 1
+        if obj.object_id in self.rows:
+            return None
+        obj.id = str(uuid.uuid4())
+        self.rows[obj.object_id] = obj
+        return obj.id
+
+
+async def uploaded(storage: MemoryStorage, object_name: str, user_id: str) -> None:
+    # what a form upload leaves behind, the uploader is bound through the metadata
+    await storage._write("avatar", object_name, io.BytesIO(b"\x89PNG"), "image/png", {
+        "user-id": user_id
+    })
+
+
+def service() -> tuple[FileService, FakeFileRepository, MemoryStorage]:
+    repository = FakeFileRepository()
+    storage = MemoryStorage("http://localhost", "test")
+    return FileService(
+        repository, None, storage, MemoryLinkCache(min_validity=60, max_size=10)
+    ), repository, storage
+
+
+def test_complete_upload_twice_is_idempotent():
+    file_service, repository, storage = service()
+    object_name = f"{uuid.uuid4()}.png"
+    asyncio.run(uploaded(storage, object_name, "user"))
+
+    first = asyncio.run(file_service.complete_upload("user", "avatar", object_name, 1024))
+    second = asyncio.run(file_service.complete_upload("user", "avatar", object_name, 1024))
+
+    assert second == first
+    assert repository.inserts == 1
+    assert ("avatar", object_name) in storage.objects
+
+
+def test_complete_upload_losing_the_insert_keeps_the_object():
+    file_service, repository, storage = service()
+    object_name = f"{uuid.uuid4()}.png"
+    asyncio.run(uploaded(storage, object_name, "user"))
+
+    # the first completion inserted its row after this one looked it up
+    lookup = repository.fetch_one
+    calls = 0
+
+    async def fetch_one(**filters):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            repository.rows[filters["object_id"]] = File(
+                id=str(uuid.uuid4()), user_id="user", object_id=filters["object_id"],
+                object_name=object_name, bucket_name="avatar", status=FileStatus.COMMITTED
+            )
+            return None
+        return await lookup(**filters)
+
+    repository.fetch_one = fetch_one
+    response = asyncio.run(file_service.complete_upload("user", "avatar", object_name, 1024))
+
+    assert response.object_id == object_name.split(".")[0]
+    assert ("avatar", object_name) in storage.objects
+
+
+def test_complete_upload_of_another_users_row_fails():
+    file_service, repository, storage = service()
+    object_name = f"{uuid.uuid4()}.png"
+    asyncio.run(uploaded(storage, object_name, "user"))
+    asyncio.run(file_service.complete_upload("user", "avatar", object_name, 1024))
+
+    with pytest.raises(FileNotUploaded):
+        asyncio.run(file_service.complete_upload("intruder", "avatar", object_name, 1024))
+    assert ("avatar", object_name) in storage.objects
+
+
+def test_complete_upload_failed_insert_keeps_the_object_for_a_retry():
+    file_service, repository, storage = service()
+    object_name = f"{uuid.uuid4()}.png"
+    asyncio.run(uploaded(storage, object_name, "user"))
+
+    insert = repository.add_one
+
+    async def unavailable(obj: File) -> str | None:
+        return None
+
+    repository.add_one = unavailable
+    with pytest.raises(FileNotUploaded):
+        asyncio.run(file_service.complete_upload("user", "avatar", object_name, 1024))
+    assert ("avatar", object_name) in storage.objects
+
+    repository.add_one = insert
+    response = asyncio.run(file_service.complete_upload("user", "avatar", object_name, 1024))
+    assert response.object_id == object_name.split(".")[0]
@@ -0,0 +1,57 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from models.file import File
+from config.buckets import BucketPolicy, VariantSpec
+from services.derivatives import DerivativeService
+from storage.memory import MemoryStorage
+
+POLICY = BucketPolicy(
+    name="avatar",
+    max_length=1024,
+    allowed_formats=frozenset({".png"}),
+    link_ttl=12,
+    permalink_prefix="",
+    variants={"small": VariantSpec(width=64, height=64)}
+)
+
+
+class FakeFileRepository:
+    """Claims count an attempt and hand back the rows as they were before it"""
+
+    def __init__(self, file_obj: File) -> None:
+        self.file_obj = file_obj
+
+    async def claim_underived(
+        self, bucket_name: str, limit: int, claimed_before: datetime
+    ) -> list[File]:
+        if self.file_obj.variants is not None:
+            return []
+        claimed = File(
+            id=self.file_obj.id,
+            object_name=self.file_obj.object_name,
+            variants_attempts=self.file_obj.variants_attempts
+        )
+        self.file_obj.variants_attempts += 1
+        return [claimed]
+
+    async def set_variants(self, variants: dict[str, dict[str, str]]) -> bool:
+        if self.file_obj.id in variants:
+            self.file_obj.variants = variants[self.file_obj.id]
+        return True
+
+
+def test_missing_original_is_given_up_after_the_last_attempt():
+    # the original is gone from storage, reading it fails every time
+    file_obj = File(id="1", object_name="gone.png", variants_attempts=0)
+    repository = FakeFileRepository(file_obj)
+    service = DerivativeService(repository, MemoryStorage("http://localhost", "test"), None)
+
+    for _ in range(2):
+        asyncio.run(service.derive_variants(POLICY, 16, timedelta(minutes=5), 3))
+        assert file_obj.variants is None
+    asyncio.run(service.derive_variants(POLICY, 16, timedelta(minutes=5), 3))
+
+    assert file_obj.variants == {}
+    assert file_obj.variants_attempts == 3
+    assert asyncio.run(service.derive_variants(POLICY, 16, timedelta(minutes=5), 3)) == 0
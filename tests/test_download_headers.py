@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from api.file import parse_range, is_not_modified
+from storage.storage import StoredObject
+from exceptions.exceptions import RangeNotSatisfiable
+
+STORED = StoredObject(
+    size=1000,
+    etag="abc123",
+    last_modified=datetime(2026, 10, 18, 12, 0, 0, 500_000, tzinfo=timezone.utc)
+)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 100)),
+    ("bytes=100-", (100, 900)),
+    ("bytes=900-5000", (900, 100)),
+    ("bytes=-100", (900, 100)),
+    ("bytes=-5000", (0, 1000)),
+    ("BYTES = 0-0", (0, 1)),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "items=0-99",  # another unit
+    "bytes=0-9,20-29",  # several ranges are served whole
+    "bytes=abc-",
+    "bytes=50-10",  # a last byte before the first one is ignored
+])
+def test_parse_range_serves_the_whole_object(header):
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=-0"])
+def test_parse_range_not_satisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 1000)
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    ('"abc123"', True),
+    ('W/"abc123"', True),
+    ('"other", "abc123"', True),
+    ("*", True),
+    ('"other"', False),
+])
+def test_if_none_match(if_none_match, expected):
+    assert is_not_modified(STORED, if_none_match, None) is expected
+
+
+@pytest.mark.parametrize("if_modified_since, expected", [
+    # HTTP dates have whole seconds, the stored fraction must not count as a change
+    ("Sun, 18 Oct 2026 12:00:00 GMT", True),
+    ("Sun, 18 Oct 2026 13:00:00 GMT", True),
+    ("Sun, 18 Oct 2026 11:59:59 GMT", False),
+    ("not a date", False),
+])
+def test_if_modified_since(if_modified_since, expected):
+    assert is_not_modified(STORED, None, if_modified_since) is expected
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    assert not is_not_modified(STORED, '"other"', "Sun, 18 Oct 2026 13:00:00 GMT")
@@ -0,0 +1,74 @@
+import io
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from config import object_ids
+from models.file import File, FileStatus
+from services.file import FileService
+from storage.memory import MemoryStorage
+from cache.link_cache import MemoryLinkCache
+from exceptions.exceptions import FileNotFound
+
+TTL = timedelta(hours=1)
+
+
+class FakeFileRepository:
+    def __init__(self) -> None:
+        self.rows: dict[str, File] = {}
+
+    async def fetch_one(self, **filters) -> File | None:
+        file_obj = self.rows.get(filters.pop("object_id"))
+        if file_obj is None or any(
+            getattr(file_obj, field) != value for field, value in filters.items()
+        ):
+            return None
+        return file_obj
+
+    async def fetch_in(self, field: str, values: list, **filters) -> list[File]:
+        return [
+            file_obj for file_obj in self.rows.values()
+            if getattr(file_obj, field) in values
+            and all(getattr(file_obj, key) == value for key, value in filters.items())
+        ]
+
+    async def update_status(self, file_ids: list[str], status: FileStatus) -> bool:
+        for file_obj in self.rows.values():
+            if file_obj.id in file_ids:
+                file_obj.status = status
+        return True
+
+
+def stored_file(status: FileStatus = FileStatus.COMMITTED) -> tuple[FileService, str]:
+    repository = FakeFileRepository()
+    storage = MemoryStorage("http://localhost", "test")
+    object_name = object_ids.new_object_name("avatar", ".png")
+    object_id = object_name.split(".")[0]
+    asyncio.run(storage._write("avatar", object_name, io.BytesIO(b"\x89PNG"), "image/png", {}))
+    repository.rows[object_id] = File(
+        id=object_id, user_id="user", object_id=object_id, object_name=object_name,
+        bucket_name="avatar", status=status
+    )
+    return FileService(
+        repository, None, storage, MemoryLinkCache(min_validity=60, max_size=10)
+    ), object_id
+
+
+def test_signed_id_of_a_deleted_file_gets_no_link():
+    file_service, object_id = stored_file()
+    assert asyncio.run(file_service.get_file_link("avatar", object_id, TTL))
+
+    assert asyncio.run(file_service.delete_file("user", "avatar", object_id))
+
+    with pytest.raises(FileNotFound):
+        asyncio.run(file_service.get_file_link("avatar", object_id, TTL))
+    [item] = asyncio.run(file_service.get_file_links("avatar", [object_id], TTL))
+    assert item.link is None and item.detail == FileNotFound.detail
+
+
+def test_signed_id_of_a_pending_file_gets_no_link():
+    file_service, object_id = stored_file(FileStatus.PENDING)
+
+    with pytest.raises(FileNotFound):
+        asyncio.run(file_service.get_file_link("avatar", object_id, TTL))
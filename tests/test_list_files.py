@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import String, TIMESTAMP, create_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+from models.file import File, FileStatus
+from services.file import FileService, encode_cursor, decode_cursor
+from repositories.repository import SQLAlchemyRepository
+from exceptions.exceptions import IncorrectCursor
+
+START = datetime(2026, 10, 18, tzinfo=timezone.utc)
+
+
+class ItemBase(DeclarativeBase):
+    pass
+
+
+class Item(ItemBase):
+    __tablename__ = "items"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(36))
+    upload_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
+
+
+class SyncSession:
+    """The AsyncSession calls the repository makes, run on a synchronous sqlite session"""
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    async def execute(self, query):
+        return self.session.execute(query)
+
+    async def rollback(self) -> None:
+        self.session.rollback()
+
+
+def test_cursor_round_trip():
+    file_obj = File(id="file-id", upload_at=START)
+
+    assert decode_cursor(encode_cursor(file_obj)) == (START, "file-id")
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "WzFd", "bnVsbA=="])
+def test_bad_cursor(cursor):
+    with pytest.raises(IncorrectCursor):
+        decode_cursor(cursor)
+
+
+def test_fetch_many_seeks_past_the_last_key():
+    engine = create_engine("sqlite://")
+    ItemBase.metadata.create_all(engine)
+    with Session(engine) as session:
+        # two rows share every timestamp, the id breaks the tie
+        session.add_all(
+            Item(id=f"{i:02d}", user_id="user", upload_at=START + timedelta(minutes=i // 2))
+            for i in range(10)
+        )
+        session.add(Item(id="other", user_id="other", upload_at=START))
+        session.commit()
+        repository = SQLAlchemyRepository(SyncSession(session), Item)
+
+        pages = []
+        after = None
+        while True:
+            page = asyncio.run(repository.fetch_many(
+                order_by=("upload_at", "id"), limit=3, after=after, user_id="user"
+            ))
+            if not page:
+                break
+            pages.append([item.id for item in page])
+            after = (page[-1].upload_at, page[-1].id)
+
+    assert pages == [["09", "08", "07"], ["06", "05", "04"], ["03", "02", "01"], ["00"]]
+
+
+class FakeFileRepository:
+    """Keyset pages over a list, in the order and with the bound fetch_many uses"""
+
+    def __init__(self, file_objs: list[File]) -> None:
+        self.file_objs = file_objs
+
+    async def fetch_many(self, order_by, limit, after=None, **filters) -> list[File]:
+        rows = sorted(
+            (
+                file_obj for file_obj in self.file_objs
+                if all(getattr(file_obj, key) == value for key, value in filters.items())
+            ),
+            key=lambda file_obj: (file_obj.upload_at, file_obj.id),
+            reverse=True
+        )
+        if after is not None:
+            rows = [row for row in rows if (row.upload_at, row.id) < tuple(after)]
+        return rows[:limit]
+
+
+def test_list_files_pages_until_no_cursor():
+    file_objs = [
+        File(
+            id=f"{i:02d}", object_id=f"object-{i}", object_name=f"object-{i}.png",
+            user_id="user", bucket_name="avatar", status=FileStatus.COMMITTED,
+            upload_at=START + timedelta(minutes=i)
+        )
+        for i in range(5)
+    ]
+    file_objs[2].status = FileStatus.DELETING
+    file_service = FileService(FakeFileRepository(file_objs), None, None, None)
+
+    pages = []
+    cursor = None
+    while True:
+        response = asyncio.run(file_service.list_files("user", "avatar", 2, cursor))
+        pages.append([item.object_id for item in response.items])
+        cursor = response.next_cursor
+        if cursor is None:
+            break
+
+    assert pages == [["object-4", "object-3"], ["object-1", "object-0"]]
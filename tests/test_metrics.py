@@ -0,0 +1,61 @@
+import os
+import time
+
+from metrics.metrics import Registry, Counter, Gauge, Histogram
+from metrics.shared import SharedMetrics
+
+
+def worker(directory: str, pid: int) -> tuple[SharedMetrics, Counter, Gauge, Histogram]:
+    registry = Registry()
+    counter = registry.register(Counter("uploaded_bytes_total", "Bytes", ("bucket",)))
+    gauge = registry.register(Gauge("db_pool", "Pool", ("state",)))
+    histogram = registry.register(Histogram("duration_seconds", "Latency", buckets=(0.1, 1)))
+    return SharedMetrics(str(directory), registry, max_age=15, pid=pid), counter, gauge, histogram
+
+
+def test_counters_and_histograms_add_up_across_workers(tmp_path):
+    first, first_counter, _, first_histogram = worker(tmp_path, 1)
+    second, second_counter, _, second_histogram = worker(tmp_path, 2)
+    first_counter.inc(10, bucket="video")
+    second_counter.inc(5, bucket="video")
+    second_counter.inc(1, bucket="avatar")
+    first_histogram.observe(0.05)
+    second_histogram.observe(0.5)
+    second.write()
+
+    rendered = first.render().splitlines()
+
+    assert 'uploaded_bytes_total{bucket="video"} 15' in rendered
+    assert 'uploaded_bytes_total{bucket="avatar"} 1' in rendered
+    assert 'duration_seconds_bucket{le="0.1"} 1' in rendered
+    assert 'duration_seconds_bucket{le="1.0"} 2' in rendered
+    assert "duration_seconds_count 2" in rendered
+    assert "duration_seconds_sum 0.55" in rendered
+
+
+def test_gauges_are_labelled_by_worker_and_dropped_once_stale(tmp_path):
+    first, _, first_gauge, _ = worker(tmp_path, 1)
+    second, second_counter, second_gauge, _ = worker(tmp_path, 2)
+    first_gauge.set(3, state="checked_out")
+    second_gauge.set(7, state="checked_out")
+    second_counter.inc(4, bucket="video")
+    second.write()
+
+    rendered = first.render().splitlines()
+    assert 'db_pool{state="checked_out",pid="1"} 3' in rendered
+    assert 'db_pool{state="checked_out",pid="2"} 7' in rendered
+
+    # the second worker exited: its gauges go, its counters stay
+    stale = time.time() - 60
+    os.utime(tmp_path / "2.json", (stale, stale))
+    rendered = first.render().splitlines()
+    assert not any('pid="2"' in line for line in rendered)
+    assert 'uploaded_bytes_total{bucket="video"} 4' in rendered
+
+
+def test_single_worker_renders_without_pid():
+    registry = Registry()
+    gauge = registry.register(Gauge("db_pool", "Pool", ("state",)))
+    gauge.set(3, state="idle")
+
+    assert 'db_pool{state="idle"} 3' in registry.render().splitlines()
@@ -0,0 +1,65 @@
+import uuid
+
+import pytest
+
+from config.object_ids import ObjectIdScheme, PLACEHOLDER_KEY
+
+scheme = ObjectIdScheme("test-key")
+
+
+def test_signed_id_resolves_to_its_object_name():
+    object_name = scheme.new_object_name("avatar", ".png")
+    object_id, extension = object_name.split(".")
+
+    assert extension == "png" and len(object_id) <= 36
+    assert scheme.object_name("avatar", object_id) == object_name
+    assert scheme.is_well_formed(object_id)
+    assert scheme.is_issued("avatar", object_name)
+
+
+def test_signed_id_is_bound_to_its_bucket_and_key():
+    object_id = scheme.new_object_name("avatar", ".png").split(".")[0]
+
+    assert scheme.object_name("video", object_id) is None
+    assert ObjectIdScheme("other-key").object_name("avatar", object_id) is None
+    # another key still sees the shape of an issued id, the row lookup decides
+    assert ObjectIdScheme("other-key").is_well_formed(object_id)
+
+
+@pytest.mark.parametrize("position", [4, 10, 25, -1])
+def test_tampered_id_does_not_verify(position):
+    object_id = scheme.new_object_name("avatar", ".png").split(".")[0]
+    replacement = "a" if object_id[position] != "a" else "b"
+    tampered = object_id[:position] + replacement + object_id[position:][1:]
+
+    assert scheme.object_name("avatar", tampered) is None
+    assert not scheme.is_issued("avatar", f"{tampered}.png")
+
+
+def test_extension_is_part_of_the_signature():
+    object_id = scheme.new_object_name("avatar", ".png").split(".")[0]
+    swapped = "jpg" + object_id[3:]
+
+    assert scheme.object_name("avatar", swapped) is None
+
+
+def test_uuid_ids_for_long_extensions_unsigned_buckets_and_no_key():
+    assert uuid.UUID(scheme.new_object_name("video", ".mpeg4").split(".")[0])
+    assert uuid.UUID(scheme.new_object_name("avatar", ".png", signed=False).split(".")[0])
+
+    unkeyed = ObjectIdScheme(None)
+    object_name = unkeyed.new_object_name("avatar", ".png")
+    assert uuid.UUID(object_name.split(".")[0])
+    assert unkeyed.is_issued("avatar", object_name)
+    assert unkeyed.object_name("avatar", object_name.split(".")[0]) is None
+
+
+@pytest.mark.parametrize("object_id", ["", "../../etc/passwd", "png-short", "PNG-" + "a" * 29])
+def test_malformed_ids(object_id):
+    assert not scheme.is_well_formed(object_id)
+    assert scheme.object_name("avatar", object_id) is None
+
+
+def test_placeholder_key_is_refused():
+    with pytest.raises(ValueError):
+        ObjectIdScheme(PLACEHOLDER_KEY)
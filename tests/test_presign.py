@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from minio import Minio
+
+from storage.presign import SigV4Presigner
+
+ACCESS_KEY = "admin"
+SECRET_KEY = "admin123456"
+NOW = datetime(2026, 10, 18, 23, 59, 30, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("endpoint, secure", [
+    ("localhost:9000", False),
+    ("minio.example.com:443", True),
+    ("minio.example.com:9443", True),
+])
+@pytest.mark.parametrize("object_name", [
+    "4f1c2f8e-0d3b-4a8e-9a59-0b1d5c3e7f21.png",
+    "png-abcdefghijklmnop234567abcde.png.small.webp",
+    "with space+plus~tilde.mp4",
+    "фото.png",
+])
+@pytest.mark.parametrize("ttl", [timedelta(seconds=1), timedelta(hours=12), timedelta(days=7)])
+def test_links_match_the_minio_client(endpoint, secure, object_name, ttl):
+    # with the region set the client never asks the server for the bucket location
+    client = Minio(endpoint, ACCESS_KEY, SECRET_KEY, secure=secure, region="us-east-1")
+    presigner = SigV4Presigner(
+        f"{'https' if secure else 'http'}://{endpoint}", ACCESS_KEY, SECRET_KEY, "us-east-1"
+    )
+
+    expected = client.presigned_get_object("avatar", object_name, ttl, request_date=NOW)
+
+    assert presigner.presign_get("avatar", object_name, ttl, now=NOW.timestamp()) == expected
+
+
+def test_signing_key_follows_the_day():
+    presigner = SigV4Presigner("http://localhost:9000", ACCESS_KEY, SECRET_KEY, "us-east-1")
+    client = Minio("localhost:9000", ACCESS_KEY, SECRET_KEY, secure=False, region="us-east-1")
+    ttl = timedelta(hours=1)
+
+    for now in (NOW, NOW + timedelta(minutes=1), NOW + timedelta(days=1)):
+        assert presigner.presign_get("avatar", "a.png", ttl, now=now.timestamp()) == \
+            client.presigned_get_object("avatar", "a.png", ttl, request_date=now)
+
+
+@pytest.mark.parametrize("ttl", [timedelta(0), timedelta(days=7, seconds=1)])
+def test_out_of_range_ttl(ttl):
+    presigner = SigV4Presigner("http://localhost:9000", ACCESS_KEY, SECRET_KEY, "us-east-1")
+
+    with pytest.raises(ValueError):
+        presigner.presign_get("avatar", "a.png", ttl)
@@ -0,0 +1,102 @@
+import asyncio
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from models.file import FileStatus
+from services.reconcile import ReconcileService
+from storage.memory import MemoryStorage
+from storage.storage import StoredObject
+
+OLD = datetime.now(timezone.utc) - timedelta(days=2)
+GRACE = timedelta(days=1)
+
+Row = namedtuple("Row", "id object_name status upload_at")
+
+
+class FakeFileRepository:
+    def __init__(self, rows: list[Row]) -> None:
+        self.rows = rows
+        self.deleting: list[str] = []
+
+    async def stream_by_object_name(self, bucket_name: str, batch_size: int = 1000):
+        for row in sorted(self.rows, key=lambda row: row.object_name.encode()):
+            yield row
+
+    async def update_status(self, file_ids: list[str], status: FileStatus) -> bool:
+        self.deleting.extend(file_ids)
+        return True
+
+
+def storage(*objects: tuple[str, datetime]) -> MemoryStorage:
+    memory = MemoryStorage("http://localhost", "test")
+    for object_name, last_modified in objects:
+        memory.objects[("avatar", object_name)] = (b"", StoredObject(
+            size=0, etag="", last_modified=last_modified
+        ))
+    return memory
+
+
+def reconciled(memory: MemoryStorage, repository: FakeFileRepository, repair: bool = False):
+    service = ReconcileService(repository, repository, memory)
+    # batches of two so flushes also happen in the middle of the walk
+    return asyncio.run(service.reconcile_bucket("avatar", GRACE, repair, batch_size=2))
+
+
+def test_orphans_and_missing_objects():
+    memory = storage(
+        ("a.png", OLD),
+        ("b.png", OLD),  # no row
+        ("c.png", OLD),
+        ("e.png", datetime.now(timezone.utc)),  # no row, but may be an upload in flight
+    )
+    repository = FakeFileRepository([
+        Row("1", "a.png", FileStatus.COMMITTED, OLD),
+        Row("2", "c.png", FileStatus.COMMITTED, OLD),
+        Row("3", "d.png", FileStatus.COMMITTED, OLD),  # object lost
+        Row("4", "f.png", FileStatus.PENDING, OLD),  # pending rows have no object yet
+        Row("5", "g.png", FileStatus.COMMITTED, datetime.now(timezone.utc)),  # too young
+    ])
+
+    report = reconciled(memory, repository)
+
+    assert report.scanned_objects == 4
+    assert report.scanned_rows == 5
+    assert report.orphan_sample == ["b.png"]
+    assert report.missing_sample == ["d.png"]
+    assert report.repaired == 0
+    assert ("avatar", "b.png") in memory.objects and repository.deleting == []
+
+
+def test_shared_objects_and_variants_are_not_orphans():
+    memory = storage(
+        ("a.png", OLD),
+        ("a.png.small.webp", OLD),  # variant of a.png
+        ("a.png.medium.webp", OLD),
+        ("ab.png", OLD),  # no row, only shares a prefix with a.png
+    )
+    repository = FakeFileRepository([
+        # two deduplicated files on one object
+        Row("1", "a.png", FileStatus.COMMITTED, OLD),
+        Row("2", "a.png", FileStatus.COMMITTED, OLD),
+    ])
+
+    report = reconciled(memory, repository)
+
+    assert report.scanned_rows == 2
+    assert report.orphan_sample == ["ab.png"]
+    assert report.missing_objects == 0
+
+
+def test_repair_removes_orphans_and_marks_missing_rows_deleting():
+    memory = storage(("b.png", OLD), ("x.png", OLD), ("y.png", OLD))
+    repository = FakeFileRepository([
+        Row("1", "a.png", FileStatus.COMMITTED, OLD),
+        Row("2", "c.png", FileStatus.COMMITTED, OLD),
+    ])
+
+    report = reconciled(memory, repository, repair=True)
+
+    assert report.orphan_objects == 3 and report.missing_objects == 2
+    assert report.repaired == 5
+    assert memory.objects == {}
+    assert sorted(repository.deleting) == ["1", "2"]
@@ -0,0 +1,128 @@
+import uuid
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from models.file import File
+from models.upload import Upload, UploadPart
+from services.file import FileService
+from services.upload import UploadService
+from storage.memory import MemoryStorage
+from cache.link_cache import MemoryLinkCache
+from exceptions.exceptions import FileNotUploaded, UploadNotFound
+
+
+class FakeUploadRepository:
+    def __init__(self) -> None:
+        self.rows: dict[str, Upload] = {}
+
+    async def fetch_one(self, **filters) -> Upload | None:
+        upload = self.rows.get(filters.pop("id"))
+        if upload is None or any(
+            getattr(upload, field) != value for field, value in filters.items()
+        ):
+            return None
+        return upload
+
+    async def add_one(self, obj: Upload) -> str | None:
+        obj.id = str(uuid.uuid4())
+        self.rows[obj.id] = obj
+        return obj.id
+
+
+class FakePartRepository:
+    def __init__(self) -> None:
+        self.rows: dict[tuple[str, int], UploadPart] = {}
+
+    async def fetch_in(self, field: str, values: list, **filters) -> list[UploadPart]:
+        return [part for part in self.rows.values() if part.upload_id in values]
+
+    async def fetch_one(self, **filters) -> UploadPart | None:
+        return self.rows.get((filters["upload_id"], filters["part_number"]))
+
+    async def add_one(self, obj: UploadPart) -> str | None:
+        self.rows[(obj.upload_id, obj.part_number)] = obj
+        return ""
+
+
+class FakeFileRepository:
+    """Completions commit the file row and the upload mark together, or fail both"""
+
+    def __init__(self) -> None:
+        self.rows: dict[str, File] = {}
+        self.available = True
+
+    async def fetch_one(self, **filters) -> File | None:
+        return self.rows.get(filters["object_id"])
+
+    async def add_completed(self, obj: File, upload: Upload) -> bool:
+        if not self.available or obj.object_id in self.rows:
+            return False
+        obj.id = str(uuid.uuid4())
+        self.rows[obj.object_id] = obj
+        upload.completed_at = datetime.now(timezone.utc)
+        return True
+
+
+def service() -> tuple[UploadService, FakeFileRepository, MemoryStorage]:
+    file_repository = FakeFileRepository()
+    storage = MemoryStorage("http://localhost", "test")
+    file_service = FileService(
+        file_repository, None, storage, MemoryLinkCache(min_validity=60, max_size=10)
+    )
+    return UploadService(
+        FakeUploadRepository(), FakePartRepository(), file_service
+    ), file_repository, storage
+
+
+def uploaded(upload_service: UploadService, user_id: str = "user") -> str:
+    object_name = f"{uuid.uuid4()}.mp4"
+    session = asyncio.run(
+        upload_service.create_upload(user_id, "video", object_name, 10, 5)
+    )
+    for part_number in (1, 2):
+        asyncio.run(upload_service.upload_part(
+            user_id, "video", session.upload_id, part_number, b"12345"
+        ))
+    return session.upload_id
+
+
+def test_complete_upload_twice_returns_the_same_object():
+    upload_service, file_repository, storage = service()
+    upload_id = uploaded(upload_service)
+
+    first = asyncio.run(upload_service.complete_upload("user", "video", upload_id))
+    second = asyncio.run(upload_service.complete_upload("user", "video", upload_id))
+
+    assert second == first
+    assert list(file_repository.rows) == [first.object_id]
+
+
+def test_complete_upload_retried_after_a_failed_insert():
+    upload_service, file_repository, storage = service()
+    upload_id = uploaded(upload_service)
+
+    # S3 completed the object, then the row could not be written
+    file_repository.available = False
+    with pytest.raises(FileNotUploaded):
+        asyncio.run(upload_service.complete_upload("user", "video", upload_id))
+    assert not storage.multipart_uploads
+
+    file_repository.available = True
+    response = asyncio.run(upload_service.complete_upload("user", "video", upload_id))
+
+    assert response.object_id in file_repository.rows
+    assert ("video", file_repository.rows[response.object_id].object_name) in storage.objects
+
+
+def test_upload_of_another_user_is_not_found():
+    upload_service, _, _ = service()
+    upload_id = uploaded(upload_service)
+
+    with pytest.raises(UploadNotFound):
+        asyncio.run(upload_service.get_upload("intruder", "video", upload_id))
+    with pytest.raises(UploadNotFound):
+        asyncio.run(upload_service.upload_part("intruder", "video", upload_id, 1, b"12345"))
+    with pytest.raises(UploadNotFound):
+        asyncio.run(upload_service.complete_upload("intruder", "video", upload_id))
@@ -0,0 +1,94 @@
+import pytest
+
+from cache import row_cache
+from cache.row_cache import BloomFilter, RowCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(row_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def cache(**kwargs) -> RowCache:
+    options = {"max_size": 3, "ttl": 30, "negative_ttl": 10, "negative_capacity": 100}
+    return RowCache(**{**options, **kwargs})
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=10_000, error_rate=1e-3)
+    keys = [f"key-{i}" for i in range(10_000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    assert sum(f"other-{i}" in bloom for i in range(100_000)) < 200
+
+
+def test_row_hit_expires_after_ttl(clock):
+    rows = cache()
+    rows.put("a", {"id": "1"})
+
+    assert rows.lookup("a") == (True, {"id": "1"})
+    clock[0] += 31
+    assert rows.lookup("a") == (False, None)
+
+
+def test_least_recently_used_row_is_evicted(clock):
+    rows = cache()
+    for key in "abc":
+        rows.put(key, {"id": key})
+    rows.lookup("a")
+    rows.put("d", {"id": "d"})
+
+    assert rows.lookup("b") == (False, None)
+    assert rows.lookup("a")[1] == {"id": "a"}
+
+
+def test_missing_mark_lasts_at_most_negative_ttl(clock):
+    rows = cache()
+    rows.put_missing("a")
+
+    clock[0] += 4.9
+    assert rows.lookup("a") == (True, None)
+    # the mark moved to the older generation at the first rotation, the second drops it
+    clock[0] += 0.2
+    assert rows.lookup("a") == (True, None)
+    clock[0] += 5
+    assert rows.lookup("a") == (False, None)
+
+
+def test_full_generation_rotates_early(clock):
+    rows = cache(negative_capacity=2)
+    for key in ("a", "b", "c", "d", "e"):
+        rows.put_missing(key)
+
+    # two rotations since "a" was marked, without any time passing
+    assert rows.lookup("a") == (False, None)
+    assert rows.lookup("e") == (True, None)
+
+
+def test_invalidate_unmasks_a_missing_key(clock):
+    rows = cache()
+    rows.put_missing("a")
+    rows.invalidate("a")
+
+    assert rows.lookup("a") == (False, None)
+    # the unmask survives a rotation while the stale bit is still in the old generation
+    clock[0] += 6
+    assert rows.lookup("a") == (False, None)
+
+    rows.put_missing("a")
+    assert rows.lookup("a") == (True, None)
+
+
+def test_invalidate_ids_drops_rows_by_primary_key(clock):
+    rows = cache()
+    rows.put("object-a", {"id": "1"})
+    rows.put("object-b", {"id": "2"})
+
+    rows.invalidate_ids(["1", "unknown"])
+
+    assert rows.lookup("object-a") == (False, None)
+    assert rows.lookup("object-b")[0]
@@ -0,0 +1,32 @@
+import inspect
+
+import pytest
+
+from storage.storage import S3Storage
+from storage.signed import SignedStorage
+from storage.local import LocalStorage
+from storage.memory import MemoryStorage
+from storage.minio import MinioS3Storage
+
+
+def methods(cls: type) -> dict[str, inspect.Signature]:
+    return {
+        name: inspect.signature(inspect.unwrap(func))
+        for name, func in inspect.getmembers(cls, inspect.isfunction)
+        if name != "__init__"
+    }
+
+
+@pytest.mark.parametrize("base, backend", [
+    (S3Storage, SignedStorage),
+    (S3Storage, LocalStorage),
+    (S3Storage, MemoryStorage),
+    (S3Storage, MinioS3Storage),
+    (SignedStorage, LocalStorage),
+    (SignedStorage, MemoryStorage),
+])
+def test_backend_signatures_match_the_base(base: type, backend: type):
+    # backends are swapped by configuration, callers only know the base signatures
+    backend_methods = methods(backend)
+    for name, signature in methods(base).items():
+        assert backend_methods[name] == signature, name
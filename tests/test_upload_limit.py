@@ -0,0 +1,72 @@
+import json
+import asyncio
+
+from config import buckets
+from middlewares.upload_limit import UploadLimitMiddleware, MULTIPART_OVERHEAD
+
+CHUNK = b"x" * 1024 * 1024
+LIMIT = buckets.get("avatar").max_length + MULTIPART_OVERHEAD
+
+
+async def reading_app(scope, receive, send) -> None:
+    """Reads the whole body like a form parser, then answers 200 with the size read"""
+    size = 0
+    while True:
+        message = await receive()
+        size += len(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": str(size).encode()})
+
+
+def request(path: str, size: int, headers: list | None = None) -> tuple[list[dict], int]:
+    """Sent messages and the number of body chunks the app pulled"""
+    chunks = [CHUNK[:min(len(CHUNK), size - offset)] for offset in range(0, size, len(CHUNK))]
+    pulled = 0
+    sent: list[dict] = []
+
+    async def receive() -> dict:
+        nonlocal pulled
+        pulled += 1
+        body = chunks[pulled - 1] if pulled <= len(chunks) else b""
+        return {"type": "http.request", "body": body, "more_body": pulled < len(chunks)}
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path, "headers": headers or []}
+    asyncio.run(UploadLimitMiddleware(reading_app)(scope, receive, send))
+    return sent, pulled
+
+
+def test_chunked_body_over_the_limit_is_cut_off_with_413():
+    sent, pulled = request("/files/avatar/upload", LIMIT + len(CHUNK))
+
+    assert sent[0]["status"] == 413
+    assert json.loads(sent[1]["body"]) == {"detail": "Request body exceeds the maximum upload size"}
+    # reading stopped at the chunk that crossed the limit
+    assert pulled == LIMIT // len(CHUNK) + 1
+    assert len(sent) == 2
+
+
+def test_declared_length_over_the_limit_is_refused_unread():
+    sent, pulled = request(
+        "/files/avatar/upload", 1, headers=[(b"content-length", str(LIMIT + 1).encode())]
+    )
+
+    assert sent[0]["status"] == 413
+    assert pulled == 0
+
+
+def test_body_within_the_limit_passes():
+    sent, _ = request("/files/avatar/upload", LIMIT)
+
+    assert sent[0]["status"] == 200
+    assert sent[1]["body"] == str(LIMIT).encode()
+
+
+def test_other_routes_are_not_limited():
+    sent, _ = request("/files/avatar/links", LIMIT + 1)
+
+    assert sent[0]["status"] == 200